@@ -0,0 +1,29 @@
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "p99_ms", "throughput_per_s")
+
+
+def _index(path: str) -> dict[tuple, dict]:
+    with open(path, encoding="utf-8") as fh:
+        report = json.load(fh)
+    return {(r["name"], r["dataset"]): r for r in report["results"]}
+
+
+def main(base_path: str, new_path: str) -> None:
+    base = _index(base_path)
+    new = _index(new_path)
+    print(f"{'benchmark':<28}{'dataset':>9}" + "".join(f"{m:>22}" for m in METRICS))
+    for key in sorted(base.keys() & new.keys(), key=lambda k: (k[0], k[1] or 0)):
+        cells = []
+        for metric in METRICS:
+            before, after = base[key][metric], new[key][metric]
+            delta = (after - before) / before * 100 if before else 0.0
+            cells.append(f"{before:>9.2f} -> {after:<9.2f}{delta:+.0f}%")
+        print(f"{key[0]:<28}{key[1] or '-':>9}" + "".join(f"{c:>22}" for c in cells))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("uso: python -m benchmarks.compare base.json nuevo.json")
+    main(sys.argv[1], sys.argv[2])
@@ -0,0 +1,51 @@
+import random
+from typing import Iterator
+
+# Datos sinteticos con la forma de los leads reales: nombres y direcciones de farmacia
+# repartidos entre varias zonas, la mitad con web y un tercio con email.
+
+TOWNS = [
+    ("Madrid", "280"), ("Barcelona", "080"), ("Valencia", "460"), ("Sevilla", "410"), ("Zaragoza", "500"),
+    ("Malaga", "290"), ("Murcia", "300"), ("Palma", "070"), ("Bilbao", "480"), ("Alicante", "030"),
+    ("Cordoba", "140"), ("Valladolid", "470"), ("Vigo", "362"), ("Gijon", "332"), ("Granada", "180"),
+]
+STREETS = ["Calle Mayor", "Avenida de la Constitucion", "Plaza de Espana", "Calle Real", "Paseo del Prado", "Calle Nueva"]
+SURNAMES = ["Lopez", "Garcia", "Martinez", "Sanchez", "Perez", "Gomez", "Martin", "Jimenez", "Ruiz", "Hernandez"]
+SOURCES = ["openstreetmap", "paginas_amarillas", "google_maps"]
+
+
+def synthetic_leads(count: int, seed: int = 0, start: int = 0, town: int | None = None) -> Iterator[dict]:
+    # town fija todas las filas en una zona, como el lote de una captura real.
+    rng = random.Random(seed)
+    for i in range(start, start + count):
+        town_name, cp_prefix = TOWNS[i % len(TOWNS) if town is None else town]
+        surname = SURNAMES[rng.randrange(len(SURNAMES))]
+        website = f"https://farmacia-{surname.lower()}-{i}.es" if rng.random() < 0.5 else ""
+        yield {
+            "nombre": f"Farmacia {surname} {i}",
+            "direccion": f"{STREETS[i % len(STREETS)]} {i % 300 + 1}, {cp_prefix}{i % 50:02d} {town_name}",
+            "zona": town_name,
+            "codigo_postal": f"{cp_prefix}{i % 50:02d}",
+            "telefono": f"+34 9{rng.randrange(10**8):08d}",
+            "website": website,
+            "email": f"info@farmacia-{i}.es" if website and rng.random() < 0.66 else "",
+            "fuente": SOURCES[i % len(SOURCES)],
+        }
+
+
+def seed_leads(engine, owner_id: str, count: int, seed: int = 0, chunk_size: int = 10_000) -> None:
+    from sqlalchemy import insert
+
+    from src.core.models import Lead
+
+    batch = []
+    with engine.begin() as conn:
+        for lead in synthetic_leads(count, seed):
+            lead["owner_id"] = owner_id
+            lead["estado_envio"] = "pendiente"
+            batch.append(lead)
+            if len(batch) >= chunk_size:
+                conn.execute(insert(Lead), batch)
+                batch = []
+        if batch:
+            conn.execute(insert(Lead), batch)
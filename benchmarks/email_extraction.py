@@ -0,0 +1,51 @@
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from src.services.lead_enrichment import EMAIL_REGEX, _valid_email, extract_page
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def legacy_extract(page_html: str) -> tuple[set[str], list[str]]:
+    # Implementacion anterior de find_email_from_website: regex sobre toda la pagina y DOM completo para los enlaces.
+    soup = BeautifulSoup(page_html, "html.parser")
+    emails = set(EMAIL_REGEX.findall(page_html))
+    links = []
+    for a in soup.select("a[href]"):
+        href = a.get("href", "")
+        if href.startswith("mailto:"):
+            emails.add(href.replace("mailto:", "").strip())
+        else:
+            links.append(href)
+    return emails, links
+
+
+def _timings_ms(extract, page_html: str, rounds: int) -> list[float]:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        extract(page_html)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+
+def main(rounds: int = 20) -> None:
+    print(f"{'fixture':<22}{'KB':>7}{'legacy ms':>12}{'nuevo ms':>11}{'x':>7}  emails legacy -> nuevo")
+    for path in sorted(FIXTURES.glob("*.html")):
+        page_html = path.read_text(encoding="utf-8")
+        legacy = statistics.median(_timings_ms(legacy_extract, page_html, rounds))
+        current = statistics.median(_timings_ms(extract_page, page_html, rounds))
+        legacy_emails = sorted(e for e in legacy_extract(page_html)[0] if _valid_email(e))
+        current_emails = sorted(e for e in extract_page(page_html)[0] if _valid_email(e))
+        print(
+            f"{path.name:<22}{len(page_html) / 1024:>7.0f}{legacy:>12.2f}{current:>11.2f}{legacy / current:>7.1f}"
+            f"  {legacy_emails} -> {current_emails}"
+        )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 20)
@@ -0,0 +1,195 @@
+import json
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+# Sustitutos locales de los servicios externos. No importan nada de src: se arrancan
+# antes de cargar la configuracion para poder apuntar las URLs a ellos.
+
+PA_PAGES = 3
+PA_CARDS_PER_PAGE = 15
+OVERPASS_ELEMENTS = 60
+SERPAPI_RESULTS = 20
+SITE_PADDING_BLOCKS = 400
+
+
+def _site_home(base: str, site: int) -> str:
+    padding = "".join(
+        f'<div class="wp-block-group"><a href="{base}/site/{site}/producto/{i}/">Producto {i}</a>'
+        f'<img src="{base}/site/{site}/img/{i}@2x.jpg"></div>'
+        for i in range(SITE_PADDING_BLOCKS)
+    )
+    return (
+        f"<html><head><title>Farmacia {site}</title></head><body>"
+        f'<nav><a href="{base}/site/{site}/contacto/">Contacto</a> <a href="{base}/site/{site}/aviso-legal/">Aviso legal</a></nav>'
+        f"<main>{padding}</main></body></html>"
+    )
+
+
+def _site_contact(site: int) -> str:
+    # Solo la mitad de las webs publica email: la otra mitad recorre todas las paginas sin exito.
+    email = f'<a href="mailto:info@farmacia{site}.es">Escribenos</a>' if site % 2 == 0 else "<p>Llamanos</p>"
+    return f"<html><body><h1>Contacto</h1>{email}<p>Calle Mayor {site}, 28013 Madrid</p></body></html>"
+
+
+def _pa_page(page: int) -> str:
+    page = min(page, PA_PAGES)  # pasada la ultima pagina el sitio real repite resultados
+    cards = "".join(
+        f'<article><h2>Farmacia Amarilla {page}-{i}</h2><address>Calle Sol {i}, 2801{i % 10} Madrid</address>'
+        f'<span class="js-phone">91{page:03d}{i:04d}</span><a href="http://farmacia-pa-{page}-{i}.es">web</a></article>'
+        for i in range(PA_CARDS_PER_PAGE)
+    )
+    return f"<html><body><div class='header'>{'<p>ruido</p>' * 200}</div>{cards}</body></html>"
+
+
+def _overpass_payload() -> dict:
+    return {
+        "elements": [
+            {
+                "type": "node",
+                "id": 1000 + i,
+                "lat": 40.41 + i / 1000,
+                "lon": -3.70 + i / 1000,
+                "tags": {
+                    "amenity": "pharmacy",
+                    "name": f"Farmacia OSM {i}",
+                    "addr:street": "Calle Luna",
+                    "addr:housenumber": str(i),
+                    "addr:postcode": "28013",
+                    "addr:city": "Madrid",
+                    "phone": f"+34 91{i:07d}",
+                },
+            }
+            for i in range(OVERPASS_ELEMENTS)
+        ]
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args) -> None:
+        pass
+
+    def _reply(self, status: int, body: str, content_type: str) -> None:
+        payload = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _route(self) -> None:
+        self.server.requests += 1
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        path = urlparse(self.path).path
+        parts = [p for p in path.split("/") if p]
+        base = self.server.base_url
+
+        if path == "/serpapi/search.json":
+            results = [
+                {
+                    "title": f"Farmacia Maps {i}",
+                    "address": f"Calle Mayor {i}, 28013 Madrid",
+                    "phone": f"+34 912 00{i:04d}",
+                    "website": f"{base}/site/{i}/",
+                    "gps_coordinates": {"latitude": 40.415 + i / 2000, "longitude": -3.705 + i / 2000},
+                }
+                for i in range(SERPAPI_RESULTS)
+            ]
+            return self._reply(200, json.dumps({"local_results": results}), "application/json")
+        if path == "/nominatim/search":
+            geo = [{"boundingbox": ["40.40", "40.45", "-3.72", "-3.67"]}]
+            return self._reply(200, json.dumps(geo), "application/json")
+        if path == "/overpass/api/interpreter":
+            return self._reply(200, json.dumps(_overpass_payload()), "application/json")
+        if parts[:1] == ["pa"] and len(parts) >= 3:
+            return self._reply(200, _pa_page(int(parts[-1])), "text/html; charset=utf-8")
+        if parts[:1] == ["site"] and len(parts) >= 2:
+            site = int(parts[1])
+            if len(parts) == 2:
+                return self._reply(200, _site_home(base, site), "text/html; charset=utf-8")
+            if parts[2] == "contacto":
+                return self._reply(200, _site_contact(site), "text/html; charset=utf-8")
+            return self._reply(200, "<html><body><p>Sin datos</p></body></html>", "text/html; charset=utf-8")
+        self._reply(404, "not found", "text/plain")
+
+    def do_GET(self) -> None:
+        self._route()
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        self.rfile.read(length)
+        self._route()
+
+
+class FakeUpstreams:
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self.server.daemon_threads = True
+        self.server.latency = latency_ms / 1000
+        self.server.requests = 0
+        self.base_url = f"http://127.0.0.1:{self.server.server_port}"
+        self.server.base_url = self.base_url
+
+    def start(self) -> "FakeUpstreams":
+        threading.Thread(target=self.server.serve_forever, name="fake-upstreams", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    @property
+    def requests(self) -> int:
+        return self.server.requests
+
+
+class _SmtpHandler(socketserver.StreamRequestHandler):
+    # SMTP minimo: acepta AUTH PLAIN y cualquier remitente/destinatario y descarta el mensaje.
+    def _send(self, line: str) -> None:
+        self.wfile.write(f"{line}\r\n".encode("ascii"))
+
+    def handle(self) -> None:
+        self._send("220 bench-sink ESMTP")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.wfile.write(b"250-bench-sink\r\n250-AUTH PLAIN\r\n250 8BITMIME\r\n")
+            elif command == b"AUTH":
+                self._send("235 2.7.0 Authentication successful")
+            elif command == b"DATA":
+                self._send("354 End data with <CR><LF>.<CR><LF>")
+                while self.rfile.readline() not in (b".\r\n", b""):
+                    pass
+                self.server.messages += 1
+                self._send("250 2.0.0 OK")
+            elif command == b"QUIT":
+                self._send("221 2.0.0 Bye")
+                return
+            else:
+                self._send("250 OK")
+
+
+class SmtpSink:
+    def __init__(self) -> None:
+        self.server = socketserver.ThreadingTCPServer(("127.0.0.1", 0), _SmtpHandler)
+        self.server.daemon_threads = True
+        self.server.messages = 0
+        self.port = self.server.server_address[1]
+
+    def start(self) -> "SmtpSink":
+        threading.Thread(target=self.server.serve_forever, name="smtp-sink", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+
+    @property
+    def messages(self) -> int:
+        return self.server.messages
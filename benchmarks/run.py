@@ -0,0 +1,267 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.datasets import TOWNS, seed_leads, synthetic_leads
+from benchmarks.fakes import FakeUpstreams, SmtpSink
+
+BENCHMARKS = ("capture", "upsert", "listing", "enrichment", "render", "campaign")
+UPSERT_BATCHES = 10
+UPSERT_BATCH_SIZE = 200
+LISTING_PAGES = 20
+LISTING_PAGE_SIZE = 500
+ENRICH_SITES = 40
+RENDER_CALLS = 2000
+CAMPAIGN_LEADS = 200
+CAMPAIGN_BATCH = 50
+BENCH_USER = {"id": "bench-user", "email": "bench@example.com", "nombre": "Bench"}
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    # Nearest-rank: p99 de 100 muestras es la muestra 99.
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(name: str, dataset: int | None, latencies: list[float], items: int) -> dict:
+    ordered = sorted(latencies)
+    total = sum(ordered)
+    return {
+        "name": name,
+        "dataset": dataset,
+        "iterations": len(ordered),
+        "items": items,
+        "total_s": round(total, 4),
+        "throughput_per_s": round(items / total, 2) if total else 0.0,
+        "p50_ms": round(percentile(ordered, 50) * 1000, 3),
+        "p95_ms": round(percentile(ordered, 95) * 1000, 3),
+        "p99_ms": round(percentile(ordered, 99) * 1000, 3),
+        "max_ms": round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def _timed(fn) -> float:
+    started = time.perf_counter()
+    fn()
+    return time.perf_counter() - started
+
+
+def _configure_env(args, upstreams: FakeUpstreams, sink: SmtpSink) -> None:
+    # La configuracion se lee al importar src: todo tiene que estar en el entorno antes.
+    os.environ.update(
+        {
+            "DB_URL": args.db_url,
+            "CACHE_ENABLED": "false",
+            "CAMPAIGN_WORKERS": "0",
+            "DEDUP_FUZZY_ENABLED": "true" if args.fuzzy_dedup else "false",
+            "SERPAPI_KEY": "bench",
+            "OVERPASS_URLS": f"{upstreams.base_url}/overpass/api/interpreter",
+            "HTTP_HOST_RATE_LIMITS": "",
+            "HTTP_RETRIES": "0",
+            "GMAIL_ADDRESS": "bench@example.com",
+            "GMAIL_APP_PASSWORD": "bench",
+            "SMTP_HOST": "127.0.0.1",
+            "SMTP_PORT": str(sink.port),
+            "SMTP_SECURITY": "none",
+            "MAIL_RATE_PER_MINUTE": "0",
+        }
+    )
+
+
+def _point_collectors(base_url: str) -> None:
+    from src.services.collectors import google_maps_serpapi, openstreetmap_overpass, paginas_amarillas
+
+    google_maps_serpapi.SERPAPI_URL = f"{base_url}/serpapi/search.json"
+    openstreetmap_overpass.NOMINATIM_URL = f"{base_url}/nominatim/search"
+    paginas_amarillas.PAGINAS_AMARILLAS_URL = f"{base_url}/pa/{{query}}/{{page}}"
+
+
+def bench_capture(client, iterations: int) -> dict:
+    latencies = []
+    found = 0
+    for i in range(iterations):
+        payload = {"zona": f"Madrid {i}", "fuente": "todas", "max_items": 100}
+        started = time.perf_counter()
+        res = client.post("/capture", json=payload)
+        latencies.append(time.perf_counter() - started)
+        res.raise_for_status()
+        found += res.json()["found"]
+    return summarize("capture", None, latencies, found)
+
+
+def bench_upsert(owner_id: str, size: int) -> dict:
+    from src.api.main import _upsert_leads
+
+    latencies = []
+    for n in range(UPSERT_BATCHES):
+        start = size + n * UPSERT_BATCH_SIZE
+        batch = list(synthetic_leads(UPSERT_BATCH_SIZE, seed=start, start=start, town=n % len(TOWNS)))
+        latencies.append(_timed(lambda: _upsert_leads(batch, batch[0]["zona"], "", owner_id)))
+    return summarize("upsert", size, latencies, UPSERT_BATCHES * UPSERT_BATCH_SIZE)
+
+
+def bench_listing(client, size: int, require_email: bool) -> dict:
+    latencies = []
+    rows = 0
+    params = {"limit": LISTING_PAGE_SIZE, "require_email": require_email}
+    for _ in range(LISTING_PAGES):
+        started = time.perf_counter()
+        res = client.get("/leads", params=params)
+        latencies.append(time.perf_counter() - started)
+        res.raise_for_status()
+        rows += len(res.json())
+        cursor = res.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+        params["after_id"] = cursor
+    return summarize("listing_with_email" if require_email else "listing", size, latencies, rows)
+
+
+def bench_enrichment(base_url: str) -> dict:
+    from src.services.lead_enrichment import find_email_from_website
+
+    latencies = []
+    found = 0
+    for site in range(ENRICH_SITES):
+        started = time.perf_counter()
+        email = find_email_from_website(f"{base_url}/site/{site}/")
+        latencies.append(time.perf_counter() - started)
+        found += bool(email)
+    result = summarize("find_email_from_website", None, latencies, ENRICH_SITES)
+    result["emails_found"] = found
+    return result
+
+
+def bench_render() -> dict:
+    from src.services.template_engine import DEFAULT_TEMPLATE, SAMPLE_CONTEXT, render_email
+
+    latencies = []
+    for i in range(RENDER_CALLS):
+        context = dict(SAMPLE_CONTEXT, nombre=f"Farmacia {i}")
+        latencies.append(_timed(lambda: render_email(DEFAULT_TEMPLATE, context)))
+    return summarize("render_email", None, latencies, RENDER_CALLS)
+
+
+def bench_campaign(client, engine, sink: SmtpSink) -> dict:
+    from sqlalchemy import select
+
+    from src.core.models import Lead
+    from src.services.template_engine import DEFAULT_TEMPLATE
+
+    owner_id = BENCH_USER["id"]
+    seed_leads(engine, owner_id, CAMPAIGN_LEADS * 3, seed=99)
+    with engine.connect() as conn:
+        lead_ids = conn.execute(
+            select(Lead.id).where(Lead.owner_id == owner_id, Lead.email != "").limit(CAMPAIGN_LEADS)
+        ).scalars().all()
+
+    latencies = []
+    sent_before = sink.messages
+    for start in range(0, len(lead_ids), CAMPAIGN_BATCH):
+        payload = {
+            "template_text": DEFAULT_TEMPLATE,
+            "only_pending": False,
+            "lead_ids": lead_ids[start : start + CAMPAIGN_BATCH],
+        }
+        started = time.perf_counter()
+        res = client.post("/campaign/send", json=payload)
+        latencies.append(time.perf_counter() - started)
+        res.raise_for_status()
+    result = summarize("send_campaign", None, latencies, len(lead_ids))
+    result["smtp_messages"] = sink.messages - sent_before
+    return result
+
+
+def _git_revision() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmarks de FarmaReach contra servicios locales simulados.")
+    parser.add_argument("--sizes", default="1000,10000", help="Tamanos de dataset separados por comas (hasta 1000000)")
+    parser.add_argument("--only", default=",".join(BENCHMARKS), help=f"Subconjunto de {','.join(BENCHMARKS)}")
+    parser.add_argument("--db-url", default="", help="Base de datos de pruebas (por defecto un SQLite temporal)")
+    parser.add_argument("--upstream-latency-ms", type=float, default=0.0, help="Latencia simulada de cada servicio externo")
+    parser.add_argument("--capture-iterations", type=int, default=5)
+    parser.add_argument("--no-fuzzy-dedup", dest="fuzzy_dedup", action="store_false")
+    parser.add_argument("--out", default="", help="Fichero JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+    selected = {s.strip() for s in args.only.split(",") if s.strip()}
+    workdir = tempfile.mkdtemp(prefix="farmareach-bench-")
+    if not args.db_url:
+        args.db_url = f"sqlite:///{os.path.join(workdir, 'bench.db')}"
+
+    upstreams = FakeUpstreams(args.upstream_latency_ms).start()
+    sink = SmtpSink().start()
+    _configure_env(args, upstreams, sink)
+    _point_collectors(upstreams.base_url)
+
+    from fastapi.testclient import TestClient
+
+    from src.api.main import app, get_current_user
+    from src.core.db import engine
+
+    results = []
+    app.dependency_overrides[get_current_user] = lambda: BENCH_USER
+    with TestClient(app) as client:
+        if "capture" in selected:
+            results.append(bench_capture(client, args.capture_iterations))
+        for size in sizes:
+            owner_id = f"bench-{size}"
+            print(f"seeding {size} leads...", file=sys.stderr)
+            seed_leads(engine, owner_id, size, seed=size)
+            app.dependency_overrides[get_current_user] = lambda owner_id=owner_id: dict(BENCH_USER, id=owner_id)
+            if "listing" in selected:
+                results.append(bench_listing(client, size, require_email=False))
+                results.append(bench_listing(client, size, require_email=True))
+            if "upsert" in selected:
+                results.append(bench_upsert(owner_id, size))
+        app.dependency_overrides[get_current_user] = lambda: BENCH_USER
+        if "enrichment" in selected:
+            results.append(bench_enrichment(upstreams.base_url))
+        if "render" in selected:
+            results.append(bench_render())
+        if "campaign" in selected:
+            results.append(bench_campaign(client, engine, sink))
+
+    upstreams.stop()
+    sink.stop()
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "git_revision": _git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "db_dialect": engine.dialect.name,
+            "sizes": sizes,
+            "upstream_latency_ms": args.upstream_latency_ms,
+            "fuzzy_dedup": args.fuzzy_dedup,
+            "upstream_requests": upstreams.requests,
+        },
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as fh:
+            fh.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
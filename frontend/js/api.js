@@ -60,7 +60,7 @@ function onUnauthorized() {
   if (typeof showAuthOverlay === 'function') showAuthOverlay();
 }
 
-async function apiGet(path, params) {
+async function apiGetWithHeaders(path, params) {
   const url = new URL(path, API_BASE || window.location.origin);
   if (params) {
     Object.entries(params).forEach(([k, v]) => {
@@ -87,7 +87,11 @@ async function apiGet(path, params) {
     logApi('error', `GET ${path} failed`, { status: res.status, detail });
     throw new Error(detail);
   }
-  return res.json();
+  return { data: await res.json(), headers: res.headers };
+}
+
+async function apiGet(path, params) {
+  return (await apiGetWithHeaders(path, params)).data;
 }
 
 async function apiPost(path, body) {
@@ -140,8 +144,9 @@ function collectSearchParams() {
 async function loadLeadsFromApi() {
   const rows = await apiGet('/leads', { limit: 1000 });
   leads = rows.map(mapLeadFromApi);
+  leadSearchQuery = '';
   updateStats();
-  renderLeadsTable();
+  filterLeads();
 }
 
 async function startScraping() {
@@ -13,12 +13,25 @@ function renderLeadsTable() {
   empty.style.display = 'none';
   wrap.style.display = '';
 
-  const search = (document.getElementById('leads-search')?.value || '').toLowerCase();
+  const query = (document.getElementById('leads-search')?.value || '').trim();
+  const search = query.toLowerCase();
   const filterStatus = document.getElementById('leads-filter-status')?.value || '';
-  const filtered = leads.filter((l) =>
-    (!search || l.name.toLowerCase().includes(search) || l.ciudad.toLowerCase().includes(search) || l.email.toLowerCase().includes(search)) &&
-    (!filterStatus || l.status === filterStatus)
-  );
+  let filtered;
+  const fromServer = search && query === leadSearchQuery;
+  // El servidor solo ordena las coincidencias mas recientes (X-Search-Truncated): se pide afinar.
+  document.getElementById('leads-search-hint').style.display = fromServer && leadSearchTruncated ? '' : 'none';
+  if (fromServer) {
+    // Resultados de /leads/search (ya ordenados por relevancia); el estado local manda si el lead esta cargado.
+    const byId = new Map(leads.map((l) => [l.id, l]));
+    filtered = leadSearchResults
+      .map((l) => byId.get(l.id) || l)
+      .filter((l) => !filterStatus || l.status === filterStatus);
+  } else {
+    filtered = leads.filter((l) =>
+      (!search || l.name.toLowerCase().includes(search) || l.ciudad.toLowerCase().includes(search) || l.email.toLowerCase().includes(search)) &&
+      (!filterStatus || l.status === filterStatus)
+    );
+  }
 
   document.getElementById('leads-count-label').textContent = filtered.length + ' farmacia' + (filtered.length !== 1 ? 's' : '');
   document.getElementById('badge-count').textContent = leads.length;
@@ -47,9 +60,30 @@ function renderLeadsTable() {
 }
 
 function filterLeads() {
+  const query = (document.getElementById('leads-search')?.value || '').trim();
+  clearTimeout(leadSearchTimer);
+  if (query && query !== leadSearchQuery && authToken) {
+    // Mientras se escribe filtra lo cargado; a los 250 ms sin teclear pregunta al servidor.
+    leadSearchTimer = setTimeout(() => searchLeadsOnServer(query), 250);
+  }
   renderLeadsTable();
 }
 
+async function searchLeadsOnServer(query) {
+  const seq = ++leadSearchSeq;
+  try {
+    const { data: rows, headers } = await apiGetWithHeaders('/leads/search', { q: query, limit: 200 });
+    // Una respuesta lenta de una busqueda anterior no pisa la actual.
+    if (seq !== leadSearchSeq) return;
+    leadSearchQuery = query;
+    leadSearchResults = rows.map(mapLeadFromApi);
+    leadSearchTruncated = headers.get('X-Search-Truncated') === 'true';
+    renderLeadsTable();
+  } catch (err) {
+    logApi('warn', 'GET /leads/search failed, using local filter', { detail: err.message });
+  }
+}
+
 function toggleLead(id, cb) {
   if (cb.checked) selectedLeads.add(id);
   else selectedLeads.delete(id);
@@ -5,6 +5,11 @@ let historial = [];
 let isScraping = false;
 let isSending = false;
 let sendInterval = null;
+let leadSearchQuery = '';
+let leadSearchResults = [];
+let leadSearchTruncated = false;
+let leadSearchSeq = 0;
+let leadSearchTimer = null;
 let activeSource = 'openstreetmap';
 let toastTimeout;
 let authToken = localStorage.getItem('auth_token') || '';
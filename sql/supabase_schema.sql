@@ -14,6 +14,9 @@ create table if not exists public.leads (
   fuente varchar(64) not null,
   estado_envio varchar(32) default 'pendiente' not null,
   notas text default '' not null,
+  lat double precision,
+  lon double precision,
+  geohash varchar(12),
   created_at timestamptz default now() not null
 );
 
@@ -28,11 +31,90 @@ create table if not exists public.email_logs (
   created_at timestamptz default now() not null
 );
 
+-- Plantillas de campana por sha256 del texto: los email_logs compactos guardan
+-- template_hash + contexto en vez del cuerpo renderizado.
+create table if not exists public.email_templates (
+  hash varchar(64) primary key,
+  template_text text not null,
+  created_at timestamp default (now() at time zone 'utc') not null,
+  last_used_at timestamp default (now() at time zone 'utc')
+);
+
+create table if not exists public.campaign_jobs (
+  id bigserial primary key,
+  owner_id varchar(64) not null,
+  estado varchar(32) default 'pendiente' not null,
+  asunto varchar(255) not null,
+  template_text text not null,
+  remitente varchar(255) default '' not null,
+  firma varchar(255) default '' not null,
+  propuesta_valor varchar(500) default '' not null,
+  only_pending boolean default true not null,
+  total integer default 0 not null,
+  created_at timestamp default (now() at time zone 'utc') not null,
+  finished_at timestamp
+);
+
+create table if not exists public.campaign_tasks (
+  id bigserial primary key,
+  job_id bigint not null references public.campaign_jobs(id) on delete cascade,
+  -- Sin FK a leads (como el modelo): las tareas de un lead fusionado quedan como "omitido".
+  lead_id bigint not null,
+  estado varchar(32) default 'pendiente' not null,
+  detalle text default '' not null,
+  updated_at timestamp default (now() at time zone 'utc') not null
+);
+
 alter table public.leads
   add column if not exists owner_id varchar(64) default '' not null;
 
-create index if not exists idx_leads_estado_envio on public.leads (estado_envio);
-create index if not exists idx_leads_fuente on public.leads (fuente);
-create index if not exists idx_leads_email on public.leads (email);
-create index if not exists idx_leads_owner_id on public.leads (owner_id);
+alter table public.leads
+  add column if not exists lat double precision,
+  add column if not exists lon double precision,
+  add column if not exists geohash varchar(12);
+
+alter table public.campaign_tasks
+  drop constraint if exists campaign_tasks_lead_id_fkey;
+
+alter table public.email_templates
+  add column if not exists last_used_at timestamp default (now() at time zone 'utc');
+
+alter table public.email_logs
+  add column if not exists template_hash varchar(64),
+  add column if not exists contexto text,
+  add column if not exists cuerpo_comprimido bytea;
+
+-- Indices con la forma de las consultas: owner_id primero y orden por id desc
+-- (tambien los crea la migracion 0001_lead_query_indexes al arrancar la API).
+create index if not exists ix_leads_owner_id_desc on public.leads (owner_id, id desc);
+create index if not exists ix_leads_owner_estado_id on public.leads (owner_id, estado_envio, id desc);
+create index if not exists ix_leads_owner_fuente_id on public.leads (owner_id, fuente, id desc);
+create index if not exists ix_leads_owner_con_email on public.leads (owner_id, id desc) where email <> '';
+drop index if exists public.idx_leads_estado_envio;
+drop index if exists public.idx_leads_fuente;
+drop index if exists public.idx_leads_email;
+drop index if exists public.idx_leads_owner_id;
+create index if not exists ix_leads_owner_geohash on public.leads (owner_id, geohash) where geohash is not null;
+-- Clave natural del upsert de /capture (INSERT ... ON CONFLICT).
+create unique index if not exists ux_leads_owner_nombre_direccion on public.leads (owner_id, nombre, direccion);
 create index if not exists idx_email_logs_lead_id on public.email_logs (lead_id);
+create index if not exists ix_email_logs_created_at on public.email_logs (created_at);
+create index if not exists ix_campaign_jobs_owner_id on public.campaign_jobs (owner_id);
+create unique index if not exists ux_campaign_tasks_job_lead on public.campaign_tasks (job_id, lead_id);
+create index if not exists ix_campaign_tasks_estado_id on public.campaign_tasks (estado, id);
+
+-- Busqueda de /leads/search (migracion 0005_lead_search_index): trigramas sobre el texto sin tildes.
+create extension if not exists pg_trgm with schema extensions;
+create extension if not exists unaccent with schema extensions;
+create or replace function public.farmareach_search_text(nombre text, direccion text, zona text, email text)
+returns text language sql immutable parallel safe set search_path = public, extensions, pg_catalog as $$
+  select lower(unaccent('unaccent'::regdictionary, coalesce(nombre, '') || ' ' || coalesce(direccion, '')
+    || ' ' || coalesce(zona, '') || ' ' || coalesce(email, '')))
+$$;
+create index if not exists ix_leads_search_trgm on public.leads
+  using gin (public.farmareach_search_text(nombre, direccion, zona, email) extensions.gin_trgm_ops);
+
+create table if not exists public.schema_migrations (
+  version varchar(64) primary key,
+  applied_at timestamp default current_timestamp not null
+);
@@ -0,0 +1,54 @@
+import functools
+from typing import Callable
+
+from anyio import CapacityLimiter, to_thread
+
+from src.core.config import API_HEAVY_THREADS, API_LIGHT_THREADS, API_MODE
+
+POOL_SIZES = {"heavy": API_HEAVY_THREADS, "light": API_LIGHT_THREADS}
+
+_limiters: dict[str, CapacityLimiter] = {}
+
+
+def _limiter(pool: str) -> CapacityLimiter:
+    # CapacityLimiter necesita el event loop en marcha: se crea en la primera peticion.
+    limiter = _limiters.get(pool)
+    if limiter is None:
+        limiter = _limiters[pool] = CapacityLimiter(POOL_SIZES[pool])
+    return limiter
+
+
+def offload(pool: str) -> Callable:
+    # En modo async el handler pasa a ser async def y su cuerpo bloqueante corre en la cola
+    # indicada: una captura o un enriquecimiento largos solo ocupan hilos "heavy" y no
+    # dejan sin hilo a /leads o a la auth. En modo sync no cambia nada.
+    def decorator(func: Callable) -> Callable:
+        if API_MODE != "async":
+            return func
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await to_thread.run_sync(functools.partial(func, *args, **kwargs), limiter=_limiter(pool))
+
+        return wrapper
+
+    return decorator
+
+
+def on_event_loop(func: Callable) -> Callable:
+    # Para handlers que solo leen memoria (p. ej. /health): en modo async no esperan hilo.
+    if API_MODE != "async":
+        return func
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def pool_stats() -> dict[str, dict[str, int]]:
+    return {
+        pool: {"size": POOL_SIZES[pool], "busy": int(_limiters[pool].borrowed_tokens) if pool in _limiters else 0}
+        for pool in POOL_SIZES
+    }
@@ -0,0 +1,40 @@
+import time
+
+from src.core.metrics import request_db_queries, request_db_seconds, request_duration, track_request_db
+from src.core.profiler import profiler
+
+
+class MetricsMiddleware:
+    # ASGI puro (sin BaseHTTPMiddleware): no copia el cuerpo de la respuesta y mide hasta
+    # el ultimo byte, incluido el streaming de /leads/export.
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        # El perfil se arma por ruta exacta (/capture, /campaign/send); la plantilla aun no se conoce.
+        generation = profiler.begin(scope["path"])
+        started = time.perf_counter()
+        try:
+            with track_request_db() as db:
+                await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - started
+            if generation is not None:
+                profiler.end(generation)
+            # La plantilla (/campaign/jobs/{job_id}) y no la ruta real para no disparar la cardinalidad.
+            route = getattr(scope.get("route"), "path", "unmatched")
+            request_duration.observe(elapsed, method=scope["method"], route=route, status=str(status_code))
+            request_db_queries.observe(db[0], route=route)
+            request_db_seconds.observe(db[1], route=route)
@@ -1,40 +1,92 @@
-from fastapi import Depends, FastAPI, HTTPException, status
+from fastapi import Depends, FastAPI, HTTPException, Query, Response, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
 from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from fastapi.staticfiles import StaticFiles
-from sqlalchemy import select
+from sqlalchemy import case, func, literal_column, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from pathlib import Path
+from typing import Literal
+import csv
+import hmac
+import io
+import json
 import requests
 import logging
 
 from src.core.config import (
+    ADMIN_EMAILS,
+    API_MODE,
+    COLLECTOR_TIMEOUTS,
+    DEDUP_FUZZY_ENABLED,
+    ENRICH_BATCH_SIZE,
     GMAIL_ADDRESS,
     GMAIL_APP_PASSWORD,
-    REQUEST_TIMEOUT,
+    METRICS_TOKEN,
     SERPAPI_KEY,
     SUPABASE_ANON_KEY,
     SUPABASE_URL,
 )
-from src.core.db import get_session, init_db
+from src.api.concurrency import offload, on_event_loop, pool_stats
+from src.api.instrumentation import MetricsMiddleware
+from src.core.http_client import http_client
+from src.core.metrics import registry
+from src.core.profiler import profiler
+from src.core.db import get_session, init_db, lead_key_index_ready, warm_up_pool
 from src.core.models import EmailLog, Lead
+from src.services.campaign_jobs import (
+    campaign_context,
+    campaign_targets_query,
+    cancel_job,
+    enqueue_campaign,
+    job_progress,
+    start_workers,
+    stop_workers,
+)
+from src.services.collectors.fanout import run_collectors
 from src.services.collectors.google_maps_serpapi import search_google_maps_farmacias
 from src.services.collectors.openstreetmap_overpass import search_openstreetmap_farmacias
 from src.services.collectors.paginas_amarillas import search_paginas_amarillas_farmacias
-from src.services.lead_enrichment import find_email_from_website
-from src.services.mailer import send_gmail
-from src.services.template_engine import DEFAULT_TEMPLATE, render_email
+from src.services.dedup import dedupe_owner_leads, merge_batch, merge_into_existing
+from src.services.email_log_store import MISSING_TEMPLATE_BODY, email_body, load_templates
+from src.services.geo import encode_geohash, haversine_km, valid_coordinates
+from src.services.lead_enrichment import enrich_websites
+from src.services.lead_search import SEARCH_CANDIDATES, search_leads
+from src.services.lead_queries import (
+    LEAD_RESPONSE_COLUMNS,
+    enrich_candidates_query,
+    existing_leads_query,
+    filter_leads,
+    lead_page_query,
+    nearby_leads_query,
+)
+from src.services.mailer import MailerSession
+from src.services.send_log import SendLogWriter, flush_all
+from src.services.template_engine import (
+    DEFAULT_TEMPLATE,
+    SAMPLE_CONTEXT,
+    InvalidTemplate,
+    render_many,
+    validate_template,
+)
+from src.services.token_verifier import InvalidToken, resolve_user, token_cache
 
 from .schemas import (
     AuthResponse,
+    CampaignJobResponse,
     CampaignRequest,
     CampaignResponse,
     CaptureRequest,
     CaptureResponse,
+    DedupeResponse,
+    EmailLogResponse,
     EnrichResponse,
     HealthResponse,
     LoginRequest,
     LeadResponse,
+    NearbyLeadResponse,
+    ProfileRequest,
+    ProfileResponse,
     RegisterResponse,
     RegisterRequest,
 )
@@ -48,7 +100,9 @@ app.add_middleware(
     allow_credentials=False,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "X-Search-Truncated"],
 )
+app.add_middleware(MetricsMiddleware)
 
 FRONTEND_DIR = Path(__file__).resolve().parents[2] / "frontend"
 if FRONTEND_DIR.exists():
@@ -59,21 +113,15 @@ security = HTTPBearer(auto_error=False)
 @app.on_event("startup")
 def on_startup() -> None:
     init_db()
+    warm_up_pool()
+    _warm_up_queries()
+    start_workers()
 
 
-def _lead_to_dict(lead: Lead) -> dict:
-    return {
-        "id": lead.id,
-        "nombre": lead.nombre,
-        "direccion": lead.direccion,
-        "zona": lead.zona,
-        "codigo_postal": lead.codigo_postal,
-        "telefono": lead.telefono,
-        "website": lead.website,
-        "email": lead.email,
-        "fuente": lead.fuente,
-        "estado_envio": lead.estado_envio,
-    }
+@app.on_event("shutdown")
+def on_shutdown() -> None:
+    stop_workers()
+    flush_all()
 
 
 def _auth_error() -> HTTPException:
@@ -110,7 +158,7 @@ def _supabase_get_user(token: str) -> dict:
     _supabase_auth_check()
     url = f"{SUPABASE_URL}/auth/v1/user"
     try:
-        res = requests.get(url, headers=_supabase_headers(with_auth=token), timeout=REQUEST_TIMEOUT)
+        res = http_client.get(url, headers=_supabase_headers(with_auth=token))
     except requests.RequestException as exc:
         raise HTTPException(status_code=502, detail=f"Error conectando con Supabase: {exc}") from exc
     if not res.ok:
@@ -124,10 +172,21 @@ def _supabase_get_user(token: str) -> dict:
     }
 
 
+@offload("light")
 def get_current_user(credentials: HTTPAuthorizationCredentials | None = Depends(security)) -> dict:
     if not credentials or credentials.scheme.lower() != "bearer":
         raise _auth_error()
-    return _supabase_get_user(credentials.credentials)
+    try:
+        return resolve_user(credentials.credentials, _supabase_get_user)
+    except InvalidToken as exc:
+        logger.info("token rejected locally detail=%s", exc)
+        raise _auth_error() from exc
+
+
+def require_admin(current_user: dict = Depends(get_current_user)) -> dict:
+    if (current_user.get("email") or "").lower() not in ADMIN_EMAILS:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Solo administradores")
+    return current_user
 
 
 def _current_user_id(current_user: dict) -> str:
@@ -137,36 +196,125 @@ def _current_user_id(current_user: dict) -> str:
     return owner_id
 
 
-def _upsert_leads(leads: list[dict], zona_val: str, cp_val: str, owner_id: str) -> int:
+LEAD_INSERT_FIELDS = ("owner_id", "nombre", "direccion", "zona", "codigo_postal", "telefono", "website", "email", "fuente")
+LEAD_FILL_FIELDS = ("website", "telefono", "email")
+LEAD_GEO_FIELDS = ("lat", "lon", "geohash")
+UPSERT_CHUNK_SIZE = 500
+
+
+def _chunks(items: list, size: int):
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+def _geo_values(lead: dict) -> dict:
+    lat, lon = lead.get("lat"), lead.get("lon")
+    if not valid_coordinates(lat, lon):
+        return {"lat": None, "lon": None, "geohash": None}
+    return {"lat": float(lat), "lon": float(lon), "geohash": encode_geohash(lat, lon)}
+
+
+def _prepare_lead_rows(leads: list[dict], zona_val: str, cp_val: str, owner_id: str) -> list[dict]:
+    # Deduplica el lote por (nombre, direccion) rellenando huecos, igual que haria el upsert.
+    rows: dict[tuple[str, str], dict] = {}
+    for lead in leads:
+        lead["zona"] = lead.get("zona") or zona_val
+        lead["codigo_postal"] = lead.get("codigo_postal") or cp_val
+        lead["owner_id"] = owner_id
+        row = {field: lead.get(field) or "" for field in LEAD_INSERT_FIELDS}
+        row.update(_geo_values(lead))
+        key = (row["nombre"], row["direccion"])
+        current = rows.get(key)
+        if current is None:
+            rows[key] = row
+            continue
+        for field in LEAD_FILL_FIELDS:
+            if not current[field] and row[field]:
+                current[field] = row[field]
+        if current["geohash"] is None and row["geohash"] is not None:
+            current.update({field: row[field] for field in LEAD_GEO_FIELDS})
+    return list(rows.values())
+
+
+def _upsert_leads_on_conflict(session, rows: list[dict]) -> int:
     saved = 0
-    with get_session() as session:
-        for lead in leads:
-            lead["zona"] = lead.get("zona") or zona_val
-            lead["codigo_postal"] = lead.get("codigo_postal") or cp_val
-            lead["owner_id"] = owner_id
-            existing = session.execute(
-                select(Lead).where(
-                    Lead.owner_id == owner_id,
-                    Lead.nombre == lead["nombre"],
-                    Lead.direccion == lead.get("direccion", ""),
+    for chunk in _chunks(rows, UPSERT_CHUNK_SIZE):
+        stmt = pg_insert(Lead).values(chunk)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Lead.owner_id, Lead.nombre, Lead.direccion],
+            set_={
+                field: case(
+                    (func.coalesce(getattr(Lead, field), "") == "", getattr(stmt.excluded, field)),
+                    else_=getattr(Lead, field),
                 )
-            ).scalar_one_or_none()
-
-            if existing:
-                if not existing.website and lead.get("website"):
-                    existing.website = lead["website"]
-                if not existing.telefono and lead.get("telefono"):
-                    existing.telefono = lead["telefono"]
-                if not existing.email and lead.get("email"):
-                    existing.email = lead["email"]
-                continue
-
-            session.add(Lead(**lead))
-            saved += 1
+                for field in LEAD_FILL_FIELDS
+            }
+            | {
+                # Las coordenadas van juntas: se toman del nuevo resultado solo si el lead no tenia.
+                field: case((Lead.geohash.is_(None), getattr(stmt.excluded, field)), else_=getattr(Lead, field))
+                for field in LEAD_GEO_FIELDS
+            },
+        )
+        # xmax = 0 solo en filas recien insertadas, no en las actualizadas por el conflicto.
+        inserted = session.execute(stmt.returning(literal_column("xmax = 0"))).scalars().all()
+        saved += sum(1 for flag in inserted if flag)
     return saved
 
 
+def _upsert_leads_prefetch(session, rows: list[dict], owner_id: str) -> int:
+    existing: dict[tuple[str, str], Lead] = {}
+    names = sorted({row["nombre"] for row in rows})
+    for chunk in _chunks(names, UPSERT_CHUNK_SIZE):
+        found = session.execute(existing_leads_query(owner_id, chunk)).scalars()
+        for lead in found:
+            existing[(lead.nombre, lead.direccion or "")] = lead
+
+    new_leads = []
+    for row in rows:
+        lead = existing.get((row["nombre"], row["direccion"]))
+        if lead is None:
+            new_leads.append(Lead(**row))
+            continue
+        for field in LEAD_FILL_FIELDS:
+            if not getattr(lead, field) and row[field]:
+                setattr(lead, field, row[field])
+        if lead.geohash is None and row["geohash"] is not None:
+            for field in LEAD_GEO_FIELDS:
+                setattr(lead, field, row[field])
+
+    session.add_all(new_leads)
+    return len(new_leads)
+
+
+def _upsert_leads(leads: list[dict], zona_val: str, cp_val: str, owner_id: str) -> int:
+    rows = _prepare_lead_rows(leads, zona_val, cp_val, owner_id)
+    if DEDUP_FUZZY_ENABLED:
+        rows = merge_batch(rows)
+    if not rows:
+        return 0
+    with get_session() as session:
+        if DEDUP_FUZZY_ENABLED:
+            rows = merge_into_existing(session, rows, owner_id)
+            if not rows:
+                return 0
+        if session.get_bind().dialect.name == "postgresql" and lead_key_index_ready():
+            return _upsert_leads_on_conflict(session, rows)
+        return _upsert_leads_prefetch(session, rows, owner_id)
+
+
+def _warm_up_queries() -> None:
+    # Compila las consultas calientes antes de la primera peticion real.
+    try:
+        with get_session() as session:
+            session.execute(lead_page_query("", False, False, "", None, 0, 1)).all()
+            session.execute(campaign_targets_query("", True, None)).all()
+            session.execute(campaign_targets_query("", True, None, ids_only=True)).all()
+    except Exception as exc:
+        logging.getLogger("farmareach.db").warning("query warm-up failed detail=%s", exc)
+
+
 @app.get("/health", response_model=HealthResponse)
+@on_event_loop
 def health() -> HealthResponse:
     return HealthResponse(
         status="ok",
@@ -177,9 +325,53 @@ def health() -> HealthResponse:
             "auth_enabled": True,
             "supabase_configured": bool(SUPABASE_URL and SUPABASE_ANON_KEY),
         },
+        auth_cache=token_cache.stats(),
+        http=http_client.metrics(),
+        api_mode=API_MODE,
+        api_pools=pool_stats(),
     )
 
 
+def _api_pool_threads() -> dict:
+    return {
+        (("pool", pool), ("state", state)): value
+        for pool, stats in pool_stats().items()
+        for state, value in stats.items()
+    }
+
+
+def _auth_cache_stats() -> dict:
+    return {(("result", key),): value for key, value in token_cache.stats().items() if key != "size"}
+
+
+registry.callback("farmareach_api_pool_threads", "Hilos de las colas heavy/light (modo async).", "gauge", _api_pool_threads)
+registry.callback("farmareach_auth_cache_lookups_total", "Consultas a la cache de tokens.", "counter", _auth_cache_stats)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+@on_event_loop
+def metrics(credentials: HTTPAuthorizationCredentials | None = Depends(security)) -> PlainTextResponse:
+    if METRICS_TOKEN and (
+        credentials is None or not hmac.compare_digest(credentials.credentials, METRICS_TOKEN)
+    ):
+        raise _auth_error()
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/profile", response_model=ProfileResponse)
+@offload("light")
+def start_profile(payload: ProfileRequest, current_user: dict = Depends(require_admin)) -> ProfileResponse:
+    profiler.arm(payload.route, payload.requests, payload.interval_ms / 1000)
+    logger.info("profiler armed by=%s route=%s requests=%s", current_user.get("email"), payload.route, payload.requests)
+    return ProfileResponse(**profiler.report())
+
+
+@app.get("/admin/profile", response_model=ProfileResponse)
+@offload("light")
+def get_profile(current_user: dict = Depends(require_admin)) -> ProfileResponse:
+    return ProfileResponse(**profiler.report())
+
+
 @app.get("/")
 def frontend_index():
     index_path = FRONTEND_DIR / "index.html"
@@ -197,6 +389,7 @@ def frontend_verify():
 
 
 @app.post("/auth/register", response_model=RegisterResponse)
+@offload("light")
 def register(payload: RegisterRequest) -> RegisterResponse:
     email = payload.email.strip().lower()
     logger.info("register request received email=%s", email)
@@ -210,7 +403,7 @@ def register(payload: RegisterRequest) -> RegisterResponse:
         "data": {"nombre": payload.nombre.strip()},
     }
     try:
-        res = requests.post(url, headers=_supabase_headers(), json=body, timeout=REQUEST_TIMEOUT)
+        res = http_client.post(url, headers=_supabase_headers(), json=body)
     except requests.RequestException as exc:
         logger.exception("register network error email=%s", email)
         raise HTTPException(status_code=502, detail=f"Error conectando con Supabase: {exc}") from exc
@@ -227,6 +420,7 @@ def register(payload: RegisterRequest) -> RegisterResponse:
 
 
 @app.post("/auth/login", response_model=AuthResponse)
+@offload("light")
 def login(payload: LoginRequest) -> AuthResponse:
     email = payload.email.strip().lower()
     logger.info("login request received email=%s", email)
@@ -237,7 +431,7 @@ def login(payload: LoginRequest) -> AuthResponse:
         "password": payload.password,
     }
     try:
-        res = requests.post(url, headers=_supabase_headers(), json=body, timeout=REQUEST_TIMEOUT)
+        res = http_client.post(url, headers=_supabase_headers(), json=body)
     except requests.RequestException as exc:
         logger.exception("login network error email=%s", email)
         raise HTTPException(status_code=502, detail=f"Error conectando con Supabase: {exc}") from exc
@@ -264,17 +458,20 @@ def login(payload: LoginRequest) -> AuthResponse:
 
 
 @app.get("/auth/me")
+@offload("light")
 def me(current_user: dict = Depends(get_current_user)) -> dict:
     return current_user
 
 
 @app.get("/template/default")
+@offload("light")
 def get_default_template(current_user: dict = Depends(get_current_user)) -> dict:
     _ = current_user
     return {"template": DEFAULT_TEMPLATE}
 
 
 @app.post("/capture", response_model=CaptureResponse)
+@offload("heavy")
 def capture_leads(payload: CaptureRequest, current_user: dict = Depends(get_current_user)) -> CaptureResponse:
     owner_id = _current_user_id(current_user)
     criterio = " ".join(
@@ -283,30 +480,55 @@ def capture_leads(payload: CaptureRequest, current_user: dict = Depends(get_curr
     if not criterio:
         raise HTTPException(status_code=400, detail="Indica al menos una zona o codigo postal")
 
-    results = []
+    has_point = payload.lat is not None and payload.lon is not None
+    # Con coordenadas, Google Maps se centra en el punto y OSM consulta el radio sin geocodificar.
+    center = (payload.lat, payload.lon, payload.radius_km) if has_point else None
+    location = f"@{payload.lat},{payload.lon},14z" if has_point else ""
     warnings = []
+    jobs = {}
     if payload.fuente in ("google_maps", "ambas", "todas"):
         if not SERPAPI_KEY:
             warnings.append("SERPAPI_KEY no configurada: se omite Google Maps")
-        results.extend(search_google_maps_farmacias(criterio)[: payload.max_items])
+        jobs["google_maps"] = lambda: search_google_maps_farmacias(criterio, location)
     if payload.fuente in ("paginas_amarillas", "ambas", "todas"):
-        source_q = payload.zona or payload.codigo_postal
-        results.extend(search_paginas_amarillas_farmacias(source_q)[: payload.max_items])
+        pa_q = payload.zona or payload.codigo_postal
+        if pa_q:
+            jobs["paginas_amarillas"] = lambda: search_paginas_amarillas_farmacias(pa_q, payload.max_items)
+        else:
+            warnings.append("Paginas Amarillas necesita zona o codigo postal: se omite")
     if payload.fuente in ("openstreetmap", "todas"):
-        source_q = payload.zona or payload.codigo_postal or criterio
-        results.extend(search_openstreetmap_farmacias(source_q)[: payload.max_items])
+        osm_q = payload.zona or payload.codigo_postal or (criterio if not has_point else "")
+        jobs["openstreetmap"] = lambda: search_openstreetmap_farmacias(
+            osm_q, payload.max_items, center, COLLECTOR_TIMEOUTS["openstreetmap"]
+        )
+
+    by_source, source_warnings, latencies = run_collectors(jobs, COLLECTOR_TIMEOUTS)
+    warnings.extend(source_warnings)
+    results = []
+    for source in jobs:
+        results.extend(by_source.get(source, [])[: payload.max_items])
 
     saved = _upsert_leads(results, payload.zona, payload.codigo_postal, owner_id) if results else 0
-    return CaptureResponse(criterio=criterio, found=len(results), saved=saved, results=results, warnings=warnings)
+    return CaptureResponse(
+        criterio=criterio,
+        found=len(results),
+        saved=saved,
+        results=results,
+        warnings=warnings,
+        latencies_ms=latencies,
+    )
 
 
 @app.get("/leads", response_model=list[LeadResponse])
+@offload("light")
 def get_leads(
+    response: Response,
     only_pending: bool = False,
     require_email: bool = False,
     fuente: str = "",
     skip: int = 0,
     limit: int = 500,
+    after_id: int | None = None,
     current_user: dict = Depends(get_current_user),
 ) -> list[LeadResponse]:
     owner_id = _current_user_id(current_user)
@@ -315,76 +537,225 @@ def get_leads(
     if limit < 1 or limit > 1000:
         raise HTTPException(status_code=400, detail="limit debe estar entre 1 y 1000")
 
+    query = lead_page_query(owner_id, only_pending, require_email, fuente, after_id, skip, limit)
+    with get_session() as session:
+        rows = session.execute(query).all()
+
+    if len(rows) == limit:
+        response.headers["X-Next-Cursor"] = str(rows[-1].id)
+    return [LeadResponse.model_construct(**row._mapping) for row in rows]
+
+
+@app.get("/leads/search", response_model=list[LeadResponse])
+@offload("light")
+def get_search_leads(
+    response: Response,
+    q: str = Query(default="", max_length=200),
+    skip: int = Query(default=0, ge=0),
+    limit: int = Query(default=50, ge=1, le=SEARCH_CANDIDATES),
+    current_user: dict = Depends(get_current_user),
+) -> list[LeadResponse]:
+    # Typeahead de la tabla: por relevancia, sin tildes y por prefijo en nombre/direccion/zona/email.
+    owner_id = _current_user_id(current_user)
+    if skip + limit > SEARCH_CANDIDATES:
+        raise HTTPException(status_code=400, detail=f"skip + limit no puede pasar de {SEARCH_CANDIDATES}")
     with get_session() as session:
-        query = select(Lead).where(Lead.owner_id == owner_id)
-        if only_pending:
-            query = query.where(Lead.estado_envio == "pendiente")
-        if require_email:
-            query = query.where(Lead.email != "")
-        if fuente:
-            query = query.where(Lead.fuente == fuente)
+        rows, truncated = search_leads(session, owner_id, q, skip, limit)
+    if truncated:
+        response.headers["X-Search-Truncated"] = "true"
+    return [LeadResponse.model_construct(**row._mapping) for row in rows]
+
+
+@app.get("/leads/nearby", response_model=list[NearbyLeadResponse])
+@offload("light")
+def get_nearby_leads(
+    lat: float = Query(ge=-90, le=90),
+    lon: float = Query(ge=-180, le=180),
+    radius_km: float = Query(default=2, gt=0, le=100),
+    limit: int = Query(default=100, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user),
+) -> list[NearbyLeadResponse]:
+    owner_id = _current_user_id(current_user)
+    with get_session() as session:
+        rows = session.execute(nearby_leads_query(owner_id, lat, lon, radius_km)).all()
+
+    nearby = []
+    for row in rows:
+        distance = haversine_km(lat, lon, row.lat, row.lon)
+        if distance <= radius_km:
+            nearby.append((distance, row))
+    nearby.sort(key=lambda item: item[0])
+    return [
+        NearbyLeadResponse.model_construct(**row._mapping, distance_km=round(distance, 3))
+        for distance, row in nearby[:limit]
+    ]
+
+
+EXPORT_CHUNK_ROWS = 1000
+
 
-        rows = session.execute(query.order_by(Lead.id.desc()).offset(skip).limit(limit)).scalars().all()
-        return [LeadResponse(**_lead_to_dict(row)) for row in rows]
+def _stream_leads_export(query, fmt: str):
+    columns = [col.key for col in LEAD_RESPONSE_COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(columns)
+
+    with get_session() as session:
+        # yield_per activa stream_results: cursor de servidor en Postgres, memoria constante.
+        result = session.execute(query, execution_options={"yield_per": EXPORT_CHUNK_ROWS})
+        for partition in result.partitions():
+            for row in partition:
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False))
+                    buffer.write("\n")
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+@app.get("/leads/export")
+@offload("light")
+def export_leads(
+    formato: Literal["csv", "ndjson"] = "csv",
+    only_pending: bool = False,
+    require_email: bool = False,
+    fuente: str = "",
+    current_user: dict = Depends(get_current_user),
+) -> StreamingResponse:
+    owner_id = _current_user_id(current_user)
+    query = filter_leads(owner_id, only_pending, require_email, fuente)
+    media_type = "text/csv; charset=utf-8" if formato == "csv" else "application/x-ndjson"
+    return StreamingResponse(
+        _stream_leads_export(query + (lambda q: q.order_by(Lead.id.desc())), formato),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="farmareach-leads.{formato}"'},
+    )
+
+
+@app.get("/leads/{lead_id}/email-logs", response_model=list[EmailLogResponse])
+@offload("light")
+def get_lead_email_logs(
+    lead_id: int,
+    limit: int = 50,
+    current_user: dict = Depends(get_current_user),
+) -> list[EmailLogResponse]:
+    owner_id = _current_user_id(current_user)
+    if limit < 1 or limit > 500:
+        raise HTTPException(status_code=400, detail="limit debe estar entre 1 y 500")
+    with get_session() as session:
+        lead = session.get(Lead, lead_id)
+        if lead is None or lead.owner_id != owner_id:
+            raise HTTPException(status_code=404, detail="Lead no encontrado")
+        logs = session.execute(
+            select(EmailLog).where(EmailLog.lead_id == lead_id).order_by(EmailLog.id.desc()).limit(limit)
+        ).scalars().all()
+        # Los logs compactos se reconstruyen aqui: plantilla + contexto o cuerpo descomprimido.
+        templates = load_templates(session, logs)
+        return [
+            EmailLogResponse(
+                id=log.id,
+                lead_id=log.lead_id,
+                destinatario=log.destinatario,
+                asunto=log.asunto,
+                cuerpo=email_body(log, templates, placeholder=MISSING_TEMPLATE_BODY),
+                estado=log.estado,
+                detalle=log.detalle or "",
+                created_at=log.created_at,
+            )
+            for log in logs
+        ]
+
+
+@app.post("/leads/dedupe", response_model=DedupeResponse)
+@offload("heavy")
+def dedupe_leads(current_user: dict = Depends(get_current_user)) -> DedupeResponse:
+    return DedupeResponse(**dedupe_owner_leads(_current_user_id(current_user)))
+
+
+def _save_enriched_emails(found: list[tuple[list[int], str]]) -> int:
+    enriched = 0
+    with get_session() as session:
+        for lead_ids, email in found:
+            # email == "" evita pisar un email puesto mientras se rastreaba.
+            res = session.execute(
+                update(Lead).where(Lead.id.in_(lead_ids), Lead.email == "").values(email=email)
+            )
+            enriched += res.rowcount or 0
+    return enriched
 
 
 @app.post("/leads/enrich-emails", response_model=EnrichResponse)
+@offload("heavy")
 def enrich_missing_emails(current_user: dict = Depends(get_current_user)) -> EnrichResponse:
     owner_id = _current_user_id(current_user)
-    enriched = 0
     with get_session() as session:
-        rows = session.execute(
-            select(Lead).where(Lead.owner_id == owner_id, Lead.email == "", Lead.website != "")
-        ).scalars().all()
-        for lead in rows:
-            email = find_email_from_website(lead.website)
-            if email:
-                lead.email = email
-                enriched += 1
+        rows = session.execute(enrich_candidates_query(owner_id)).all()
+
+    # El rastreo va sin sesion abierta; los resultados se escriben en lotes cortos.
+    leads_by_website: dict[str, list[int]] = {}
+    for lead_id, website in rows:
+        leads_by_website.setdefault(website, []).append(lead_id)
+
+    enriched = 0
+    pending: list[tuple[list[int], str]] = []
+    pending_leads = 0
+    for website, email in enrich_websites(leads_by_website):
+        if not email:
+            continue
+        pending.append((leads_by_website[website], email))
+        pending_leads += len(leads_by_website[website])
+        if pending_leads >= ENRICH_BATCH_SIZE:
+            enriched += _save_enriched_emails(pending)
+            pending, pending_leads = [], 0
+    if pending:
+        enriched += _save_enriched_emails(pending)
 
     return EnrichResponse(candidates=len(rows), enriched=enriched)
 
 
+def _validate_campaign_templates(payload: CampaignRequest) -> None:
+    sample = {
+        **SAMPLE_CONTEXT,
+        "remitente": payload.remitente,
+        "firma": payload.firma,
+        "propuesta_valor": payload.propuesta_valor,
+    }
+    for label, text in (("asunto", payload.asunto), ("plantilla", payload.template_text)):
+        try:
+            validate_template(text, sample)
+        except InvalidTemplate as exc:
+            raise HTTPException(status_code=400, detail=f"Error en {label}: {exc}") from exc
+
+
 @app.post("/campaign/send", response_model=CampaignResponse)
+@offload("heavy")
 def send_campaign(payload: CampaignRequest, current_user: dict = Depends(get_current_user)) -> CampaignResponse:
     owner_id = _current_user_id(current_user)
+    _validate_campaign_templates(payload)
     sent = 0
     errors = 0
 
     with get_session() as session:
-        query = select(Lead).where(Lead.owner_id == owner_id, Lead.email != "")
-        if payload.only_pending:
-            query = query.where(Lead.estado_envio == "pendiente")
-        if payload.lead_ids:
-            query = query.where(Lead.id.in_(payload.lead_ids))
-        targets = session.execute(query.order_by(Lead.id.desc())).scalars().all()
-
-        for lead in targets:
-            context = {
-                "nombre": lead.nombre,
-                "zona": lead.zona or lead.codigo_postal or "tu zona",
-                "codigo_postal": lead.codigo_postal,
-                "remitente": payload.remitente,
-                "firma": payload.firma,
-                "propuesta_valor": payload.propuesta_valor,
-            }
-            cuerpo = render_email(payload.template_text, context)
-            asunto_render = render_email(payload.asunto, context)
-
-            ok, detail = send_gmail(lead.email, asunto_render, cuerpo, payload.remitente)
+        query = campaign_targets_query(owner_id, payload.only_pending, payload.lead_ids)
+        targets = [
+            (lead.id, lead.email, campaign_context(lead, payload.remitente, payload.firma, payload.propuesta_valor))
+            for lead in session.execute(query).scalars()
+        ]
+    contexts = [context for _, _, context in targets]
+    rendered = zip(render_many(payload.template_text, contexts), render_many(payload.asunto, contexts))
+
+    # La sesion de lectura ya esta cerrada: los envios se registran por lotes con commits
+    # propios en vez de en una unica transaccion que crece con toda la campana.
+    with SendLogWriter(payload.template_text) as log, MailerSession() as mailer:
+        for (lead_id, email, context), (cuerpo, asunto_render) in zip(targets, rendered):
+            ok, detail = mailer.send(email, asunto_render, cuerpo, payload.remitente)
             status = "enviado" if ok else "error"
-
-            lead.estado_envio = status
-            session.add(
-                EmailLog(
-                    lead_id=lead.id,
-                    destinatario=lead.email,
-                    asunto=asunto_render,
-                    cuerpo=cuerpo,
-                    estado=status,
-                    detalle=detail,
-                )
-            )
+            log.record(lead_id, email, asunto_render, cuerpo, context, status, detail)
 
             if ok:
                 sent += 1
@@ -392,3 +763,30 @@ def send_campaign(payload: CampaignRequest, current_user: dict = Depends(get_cur
                 errors += 1
 
     return CampaignResponse(total=sent + errors, sent=sent, errors=errors)
+
+
+@app.post("/campaign/jobs", response_model=CampaignJobResponse)
+@offload("light")
+def enqueue_campaign_job(payload: CampaignRequest, current_user: dict = Depends(get_current_user)) -> CampaignJobResponse:
+    owner_id = _current_user_id(current_user)
+    _validate_campaign_templates(payload)
+    job_id = enqueue_campaign(owner_id, payload)
+    return CampaignJobResponse(**job_progress(job_id, owner_id))
+
+
+@app.get("/campaign/jobs/{job_id}", response_model=CampaignJobResponse)
+@offload("light")
+def get_campaign_job(job_id: int, current_user: dict = Depends(get_current_user)) -> CampaignJobResponse:
+    progress = job_progress(job_id, _current_user_id(current_user))
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Campana no encontrada")
+    return CampaignJobResponse(**progress)
+
+
+@app.post("/campaign/jobs/{job_id}/cancel", response_model=CampaignJobResponse)
+@offload("light")
+def cancel_campaign_job(job_id: int, current_user: dict = Depends(get_current_user)) -> CampaignJobResponse:
+    progress = cancel_job(job_id, _current_user_id(current_user))
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Campana no encontrada")
+    return CampaignJobResponse(**progress)
@@ -1,3 +1,4 @@
+from datetime import datetime
 from typing import Literal
 
 from pydantic import BaseModel, Field
@@ -9,6 +10,10 @@ class CaptureRequest(BaseModel):
     fuente: Literal["google_maps", "paginas_amarillas", "openstreetmap", "ambas", "todas"] = "ambas"
     query_extra: str = ""
     max_items: int = Field(default=20, ge=5, le=100)
+    # Con lat/lon las fuentes buscan alrededor del punto en vez de geocodificar la zona.
+    lat: float | None = Field(default=None, ge=-90, le=90)
+    lon: float | None = Field(default=None, ge=-180, le=180)
+    radius_km: float = Field(default=3, gt=0, le=50)
 
 
 class CaptureResponse(BaseModel):
@@ -17,6 +22,7 @@ class CaptureResponse(BaseModel):
     saved: int
     results: list[dict]
     warnings: list[str] = []
+    latencies_ms: dict[str, float] = {}
 
 
 class LeadResponse(BaseModel):
@@ -30,6 +36,23 @@ class LeadResponse(BaseModel):
     email: str
     fuente: str
     estado_envio: str
+    lat: float | None = None
+    lon: float | None = None
+
+
+class NearbyLeadResponse(LeadResponse):
+    distance_km: float
+
+
+class EmailLogResponse(BaseModel):
+    id: int
+    lead_id: int
+    destinatario: str
+    asunto: str
+    cuerpo: str
+    estado: str
+    detalle: str
+    created_at: datetime | None = None
 
 
 class EnrichResponse(BaseModel):
@@ -37,6 +60,12 @@ class EnrichResponse(BaseModel):
     enriched: int
 
 
+class DedupeResponse(BaseModel):
+    leads: int
+    groups: int
+    merged: int
+
+
 class CampaignRequest(BaseModel):
     asunto: str = "Propuesta para {{ nombre }}"
     remitente: str = "Equipo Comercial"
@@ -53,9 +82,42 @@ class CampaignResponse(BaseModel):
     errors: int
 
 
+class CampaignJobResponse(BaseModel):
+    id: int
+    estado: str
+    total: int
+    sent: int
+    errors: int
+    skipped: int
+    remaining: int
+
+
 class HealthResponse(BaseModel):
     status: str
     capabilities: dict[str, bool]
+    auth_cache: dict[str, int] = {}
+    http: dict[str, dict] = {}
+    api_mode: str = "sync"
+    api_pools: dict[str, dict] = {}
+
+
+class ProfileRequest(BaseModel):
+    route: Literal["/capture", "/campaign/send", "/leads/enrich-emails", "/leads/dedupe", "/leads"] = "/capture"
+    requests: int = Field(default=5, ge=1, le=100)
+    interval_ms: float = Field(default=10, ge=1, le=1000)
+
+
+class ProfileResponse(BaseModel):
+    status: str
+    route: str
+    requests: int
+    completed: int
+    interval_ms: float
+    samples: int
+    duration_s: float
+    top_self: list[dict] = []
+    top_cumulative: list[dict] = []
+    collapsed: list[str] = []
 
 
 class ErrorResponse(BaseModel):
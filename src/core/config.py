@@ -6,11 +6,113 @@ load_dotenv()
 SUPABASE_URL = os.getenv("SUPABASE_URL", "")
 SUPABASE_ANON_KEY = os.getenv("SUPABASE_ANON_KEY", "")
 SUPABASE_SERVICE_ROLE_KEY = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
+SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")
+AUTH_CACHE_MAX_ENTRIES = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "1024"))
+AUTH_CACHE_TTL_SECONDS = int(os.getenv("AUTH_CACHE_TTL_SECONDS", "300"))
+AUTH_RECHECK_SECONDS = int(os.getenv("AUTH_RECHECK_SECONDS", "60"))
+AUTH_JWKS_TTL_SECONDS = int(os.getenv("AUTH_JWKS_TTL_SECONDS", "3600"))
 SERPAPI_KEY = os.getenv("SERPAPI_KEY", "")
 GMAIL_ADDRESS = os.getenv("GMAIL_ADDRESS", "")
 GMAIL_APP_PASSWORD = os.getenv("GMAIL_APP_PASSWORD", "")
+SMTP_HOST = os.getenv("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "465"))
+SMTP_SECURITY = os.getenv("SMTP_SECURITY", "ssl").lower()
+MAIL_RATE_PER_MINUTE = int(os.getenv("MAIL_RATE_PER_MINUTE", "60"))
+MAIL_MAX_PER_CONNECTION = int(os.getenv("MAIL_MAX_PER_CONNECTION", "100"))
+MAIL_IDLE_CHECK_SECONDS = float(os.getenv("MAIL_IDLE_CHECK_SECONDS", "30"))
 DB_URL = os.getenv("DB_URL", "sqlite:///farmacia_leads.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+DB_CONNECT_TIMEOUT = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+# "auto" lo activa con el puerto 6543 (pooler de Supabase en modo transaccion).
+DB_PGBOUNCER = os.getenv("DB_PGBOUNCER", "auto").lower()
+DB_QUERY_CACHE_SIZE = int(os.getenv("DB_QUERY_CACHE_SIZE", "1200"))
 REQUEST_TIMEOUT = int(os.getenv("REQUEST_TIMEOUT", "15"))
+# Si se define, /metrics exige "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# Emails (separados por comas) que pueden usar los endpoints /admin.
+ADMIN_EMAILS = {email.strip().lower() for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+# "sync": handlers en el threadpool por defecto de Starlette. "async": handlers async que
+# reparten el trabajo bloqueante en dos colas acotadas (pesada y ligera).
+API_MODE = os.getenv("API_MODE", "sync").lower()
+API_HEAVY_THREADS = int(os.getenv("API_HEAVY_THREADS", "4"))
+API_LIGHT_THREADS = int(os.getenv("API_LIGHT_THREADS", "16"))
+HTTP_POOL_HOSTS = int(os.getenv("HTTP_POOL_HOSTS", "32"))
+HTTP_POOL_MAXSIZE = int(os.getenv("HTTP_POOL_MAXSIZE", "16"))
+HTTP_RETRIES = int(os.getenv("HTTP_RETRIES", "2"))
+HTTP_RETRY_BACKOFF = float(os.getenv("HTTP_RETRY_BACKOFF", "0.5"))
+# Tope (s) a la espera que pide un Retry-After antes de reintentar.
+HTTP_RETRY_AFTER_MAX = float(os.getenv("HTTP_RETRY_AFTER_MAX", "10"))
+# Hosts con etiqueta propia en las metricas (ademas de Supabase y los mirrors de Overpass); el resto va a "other".
+HTTP_METRIC_HOSTS = {
+    host.strip()
+    for host in os.getenv("HTTP_METRIC_HOSTS", "serpapi.com,www.paginasamarillas.es,nominatim.openstreetmap.org").split(",")
+    if host.strip()
+}
+# Hosts (los de mas trafico) que resume GET /health en "http".
+HEALTH_HTTP_TOP_HOSTS = int(os.getenv("HEALTH_HTTP_TOP_HOSTS", "10"))
+# Formato host=peticiones_por_segundo separado por comas. Nominatim exige como mucho 1 req/s.
+HTTP_HOST_RATE_LIMITS = {
+    host.strip(): float(rate)
+    for host, _, rate in (
+        item.partition("=")
+        for item in os.getenv("HTTP_HOST_RATE_LIMITS", "nominatim.openstreetmap.org=1").split(",")
+        if "=" in item
+    )
+}
+DEDUP_FUZZY_ENABLED = os.getenv("DEDUP_FUZZY_ENABLED", "true").lower() in ("1", "true", "yes")
+COLLECTOR_MAX_WORKERS = int(os.getenv("COLLECTOR_MAX_WORKERS", "6"))
+COLLECTOR_DEFAULT_TIMEOUT = float(os.getenv("COLLECTOR_DEFAULT_TIMEOUT", "45"))
+COLLECTOR_TIMEOUTS = {
+    "google_maps": float(os.getenv("COLLECTOR_TIMEOUT_GOOGLE_MAPS", "30")),
+    "paginas_amarillas": float(os.getenv("COLLECTOR_TIMEOUT_PAGINAS_AMARILLAS", "30")),
+    "openstreetmap": float(os.getenv("COLLECTOR_TIMEOUT_OPENSTREETMAP", "75")),
+}
+ENRICH_MAX_WORKERS = int(os.getenv("ENRICH_MAX_WORKERS", "16"))
+ENRICH_PER_HOST_LIMIT = int(os.getenv("ENRICH_PER_HOST_LIMIT", "2"))
+ENRICH_MAX_PAGES_PER_SITE = int(os.getenv("ENRICH_MAX_PAGES_PER_SITE", "6"))
+ENRICH_BATCH_SIZE = int(os.getenv("ENRICH_BATCH_SIZE", "50"))
+ENRICH_MAX_PAGE_BYTES = int(os.getenv("ENRICH_MAX_PAGE_BYTES", str(2 * 1024 * 1024)))
+CAMPAIGN_WORKERS = int(os.getenv("CAMPAIGN_WORKERS", "1"))
+CAMPAIGN_WORKER_POLL_SECONDS = float(os.getenv("CAMPAIGN_WORKER_POLL_SECONDS", "2"))
+CAMPAIGN_STALE_SECONDS = int(os.getenv("CAMPAIGN_STALE_SECONDS", "300"))
+CAMPAIGN_SWEEP_SECONDS = float(os.getenv("CAMPAIGN_SWEEP_SECONDS", "60"))
+# /campaign/send escribe EmailLog y estado_envio cada SEND_LOG_BATCH_SIZE envios o cada SEND_LOG_FLUSH_SECONDS.
+SEND_LOG_BATCH_SIZE = int(os.getenv("SEND_LOG_BATCH_SIZE", "50"))
+SEND_LOG_FLUSH_SECONDS = float(os.getenv("SEND_LOG_FLUSH_SECONDS", "5"))
+# "template": plantilla (una vez) + contexto por email; "compressed": cuerpo con zlib; "full": cuerpo tal cual.
+EMAIL_LOG_STORAGE = os.getenv("EMAIL_LOG_STORAGE", "template").lower()
+EMAIL_LOG_COMPACT_DAYS = int(os.getenv("EMAIL_LOG_COMPACT_DAYS", "30"))
+# 0 desactiva el archivado: los logs mas antiguos se vuelcan a ficheros .ndjson.gz y se borran de la base.
+EMAIL_LOG_ARCHIVE_DAYS = int(os.getenv("EMAIL_LOG_ARCHIVE_DAYS", "0"))
+EMAIL_LOG_ARCHIVE_DIR = os.getenv("EMAIL_LOG_ARCHIVE_DIR", "email_log_archive")
+TEMPLATE_CACHE_SIZE = int(os.getenv("TEMPLATE_CACHE_SIZE", "128"))
+CACHE_ENABLED = os.getenv("CACHE_ENABLED", "true").lower() in ("1", "true", "yes")
+CACHE_DB_PATH = os.getenv("CACHE_DB_PATH", "farmareach_cache.db")
+CACHE_MAX_BYTES = int(os.getenv("CACHE_MAX_BYTES", str(50 * 1024 * 1024)))
+CACHE_STALE_TTL_SECONDS = int(os.getenv("CACHE_STALE_TTL_SECONDS", str(7 * 24 * 3600)))
+CACHE_TTL_GEOCODE = int(os.getenv("CACHE_TTL_GEOCODE", str(30 * 24 * 3600)))
+CACHE_TTL_OVERPASS = int(os.getenv("CACHE_TTL_OVERPASS", str(24 * 3600)))
+CACHE_TTL_SERPAPI = int(os.getenv("CACHE_TTL_SERPAPI", str(24 * 3600)))
+CACHE_TTL_PAGINAS_AMARILLAS = int(os.getenv("CACHE_TTL_PAGINAS_AMARILLAS", str(24 * 3600)))
+CACHE_TTL_ENRICH_FOUND = int(os.getenv("CACHE_TTL_ENRICH_FOUND", str(30 * 24 * 3600)))
+CACHE_TTL_ENRICH_EMPTY = int(os.getenv("CACHE_TTL_ENRICH_EMPTY", str(7 * 24 * 3600)))
+CACHE_TTL_ENRICH_ERROR = int(os.getenv("CACHE_TTL_ENRICH_ERROR", str(24 * 3600)))
+OVERPASS_URLS = [
+    url.strip()
+    for url in os.getenv(
+        "OVERPASS_URLS",
+        "https://overpass-api.de/api/interpreter,https://overpass.kumi.systems/api/interpreter",
+    ).split(",")
+    if url.strip()
+]
+OSM_TILE_MAX_DEG = float(os.getenv("OSM_TILE_MAX_DEG", "0.15"))
+OSM_MAX_TILES = int(os.getenv("OSM_MAX_TILES", "36"))
+OSM_TILE_WORKERS = int(os.getenv("OSM_TILE_WORKERS", "4"))
+PA_MAX_PAGES = int(os.getenv("PA_MAX_PAGES", "10"))
 USER_AGENT = os.getenv(
     "USER_AGENT",
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 Chrome/130.0.0.0 Safari/537.36",
@@ -1,34 +1,159 @@
+import logging
+import time
 from contextlib import contextmanager
 
-from sqlalchemy import create_engine, inspect, text
+from sqlalchemy import create_engine, event, inspect, text
+from sqlalchemy.engine import URL, make_url
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
 
-from src.core.config import DB_URL
+from src.core.config import (
+    DB_CONNECT_TIMEOUT,
+    DB_MAX_OVERFLOW,
+    DB_PGBOUNCER,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    DB_QUERY_CACHE_SIZE,
+    DB_URL,
+)
+from src.core.metrics import record_query, registry
+from src.core.migrations import run_migrations
 from src.core.models import Base
 
-engine = create_engine(DB_URL, echo=False, future=True)
+
+def _uses_pgbouncer(url: URL) -> bool:
+    if DB_PGBOUNCER == "auto":
+        return url.get_backend_name() == "postgresql" and url.port == 6543
+    return DB_PGBOUNCER in ("1", "true", "yes")
+
+
+def _engine_options(url: URL) -> dict:
+    options = {"echo": False, "future": True, "query_cache_size": DB_QUERY_CACHE_SIZE}
+    if url.get_backend_name() == "sqlite":
+        return options
+    if url.get_backend_name() == "postgresql":
+        # Keepalives TCP: el pooler de Supabase corta conexiones ociosas sin avisar.
+        options["connect_args"] = {
+            "connect_timeout": DB_CONNECT_TIMEOUT,
+            "application_name": "farmareach",
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
+        }
+    if _uses_pgbouncer(url):
+        # PgBouncer ya reparte las conexiones al servidor; un pool local solo
+        # retendria conexiones ociosas que el pooler cierra por su cuenta.
+        options["poolclass"] = NullPool
+        return options
+    options.update(
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        pool_pre_ping=DB_POOL_PRE_PING,
+    )
+    return options
+
+
+engine = create_engine(DB_URL, **_engine_options(make_url(DB_URL)))
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _query_started(conn, cursor, statement, parameters, context, executemany) -> None:
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _query_finished(conn, cursor, statement, parameters, context, executemany) -> None:
+    started = conn.info["query_started"].pop()
+    record_query(statement, time.perf_counter() - started)
+
+
+@event.listens_for(engine, "handle_error")
+def _query_failed(context) -> None:
+    # Una consulta fallida no pasa por after_cursor_execute: se cuenta igual y se saca su inicio.
+    conn = context.connection
+    if conn is not None and context.statement and conn.info.get("query_started"):
+        record_query(context.statement, time.perf_counter() - conn.info["query_started"].pop())
+
+
+def _pool_connections() -> dict:
+    pool = engine.pool
+    if not hasattr(pool, "size"):
+        return {}
+    return {(("state", "checked_out"),): pool.checkedout(), (("state", "size"),): pool.size()}
+
+
+registry.callback("farmareach_db_pool_connections", "Conexiones del pool de la base de datos.", "gauge", _pool_connections)
 SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False, future=True)
+logger = logging.getLogger("farmareach.db")
+
+# Se activa cuando existe el indice unico (owner_id, nombre, direccion) que
+# necesita el upsert con ON CONFLICT.
+_lead_key_index_ready = False
 
 
 def init_db() -> None:
     Base.metadata.create_all(bind=engine)
     _ensure_schema_compat()
+    run_migrations(engine)
+
+
+def lead_key_index_ready() -> bool:
+    return _lead_key_index_ready
+
+
+def _try_ddl(statement: str) -> bool:
+    # Cada DDL opcional va en su propia transaccion: en Postgres un fallo
+    # dejaria abortada la transaccion y arrastraria al resto de sentencias.
+    try:
+        with engine.begin() as conn:
+            conn.execute(text(statement))
+        return True
+    except Exception as exc:
+        # Index creation can vary across DB engines/versions.
+        logger.warning("schema compat statement failed sql=%s detail=%s", statement, exc)
+        return False
 
 
 def _ensure_schema_compat() -> None:
+    global _lead_key_index_ready
+
     inspector = inspect(engine)
     if "leads" not in inspector.get_table_names():
         return
 
     columns = {col["name"] for col in inspector.get_columns("leads")}
-    with engine.begin() as conn:
-        if "owner_id" not in columns:
+    if "owner_id" not in columns:
+        with engine.begin() as conn:
             conn.execute(text("ALTER TABLE leads ADD COLUMN owner_id VARCHAR(64) NOT NULL DEFAULT ''"))
-        try:
-            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_leads_owner_id ON leads (owner_id)"))
-        except Exception:
-            # Index creation can vary across DB engines/versions.
-            pass
+    # Falla si ya hay duplicados historicos; en ese caso el upsert usa el camino sin ON CONFLICT
+    # y la busqueda por (owner_id, nombre) se apoya en un indice no unico.
+    _lead_key_index_ready = _try_ddl(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_leads_owner_nombre_direccion ON leads (owner_id, nombre, direccion)"
+    )
+    if not _lead_key_index_ready:
+        _try_ddl("CREATE INDEX IF NOT EXISTS ix_leads_owner_nombre_direccion ON leads (owner_id, nombre, direccion)")
+
+
+def warm_up_pool() -> None:
+    # Abre DB_POOL_SIZE conexiones al arrancar para que las primeras peticiones no paguen el handshake TLS.
+    if engine.dialect.name == "sqlite" or not hasattr(engine.pool, "size"):
+        return
+    conns = []
+    try:
+        for _ in range(engine.pool.size()):
+            conn = engine.connect()
+            conns.append(conn)
+            conn.execute(text("SELECT 1"))
+    except Exception as exc:
+        logger.warning("db pool warm-up failed detail=%s", exc)
+    finally:
+        for conn in conns:
+            conn.close()
 
 
 @contextmanager
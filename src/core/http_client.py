@@ -0,0 +1,116 @@
+import threading
+import time
+from http.cookiejar import DefaultCookiePolicy
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from src.core.config import (
+    HEALTH_HTTP_TOP_HOSTS,
+    HTTP_HOST_RATE_LIMITS,
+    HTTP_METRIC_HOSTS,
+    HTTP_POOL_HOSTS,
+    HTTP_POOL_MAXSIZE,
+    HTTP_RETRIES,
+    HTTP_RETRY_AFTER_MAX,
+    HTTP_RETRY_BACKOFF,
+    OVERPASS_URLS,
+    REQUEST_TIMEOUT,
+    SUPABASE_URL,
+    USER_AGENT,
+)
+from src.core.metrics import external_request_duration, external_request_errors
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+OTHER_HOSTS = "other"
+
+
+class _CappedRetry(Retry):
+    # Un Retry-After de minutos dejaria el hilo del collector dormido mucho mas que su presupuesto.
+    def get_retry_after(self, response):
+        retry_after = super().get_retry_after(response)
+        return min(retry_after, HTTP_RETRY_AFTER_MAX) if retry_after is not None else None
+
+
+class _HostLimiter:
+    def __init__(self, per_second: float) -> None:
+        self.interval = 1.0 / per_second
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class HttpClient:
+    # Una sola Session: urllib3 mantiene un pool keep-alive por host (HTTP_POOL_HOSTS hosts,
+    # HTTP_POOL_MAXSIZE conexiones cada uno) y reintenta 429/5xx con backoff en metodos idempotentes.
+    def __init__(self) -> None:
+        retry = _CappedRetry(
+            total=HTTP_RETRIES,
+            backoff_factor=HTTP_RETRY_BACKOFF,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_MAXSIZE, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = USER_AGENT
+        # La Session se comparte entre usuarios y webs rastreadas: no se guarda ninguna cookie.
+        self.session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+        # Etiqueta "host" acotada: cada web rastreada seria una serie nueva en /metrics.
+        self._metric_hosts = set(HTTP_METRIC_HOSTS) | set(HTTP_HOST_RATE_LIMITS)
+        self._metric_hosts.update(urlparse(url).hostname or "" for url in [SUPABASE_URL, *OVERPASS_URLS] if url)
+        self._limiters = {host: _HostLimiter(rate) for host, rate in HTTP_HOST_RATE_LIMITS.items() if rate > 0}
+
+    def request(self, method: str, url: str, metric_label: str | None = None, **kwargs) -> requests.Response:
+        # metric_label agrupa en una sola serie el trafico a hosts arbitrarios (p. ej. "enrichment").
+        host = urlparse(url).hostname or ""
+        label = metric_label or (host if host in self._metric_hosts else OTHER_HOSTS)
+        limiter = self._limiters.get(host)
+        if limiter is not None:
+            limiter.wait()
+        kwargs.setdefault("timeout", REQUEST_TIMEOUT)
+
+        started = time.monotonic()
+        ok = False
+        try:
+            response = self.session.request(method, url, **kwargs)
+            ok = response.status_code < 500
+            return response
+        finally:
+            external_request_duration.observe(time.monotonic() - started, host=label)
+            if not ok:
+                external_request_errors.inc(host=label)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request("POST", url, **kwargs)
+
+    def metrics(self, top: int = HEALTH_HTTP_TOP_HOSTS) -> dict[str, dict]:
+        # Resumen de los `top` hosts con mas trafico para /health; buckets y el resto, en /metrics.
+        errors = external_request_errors.snapshot()
+        series = sorted(external_request_duration.snapshot().items(), key=lambda item: item[1]["count"], reverse=True)
+        summary = {}
+        for (host,), stats in series[:top]:
+            count = stats["count"]
+            summary[host] = {
+                "requests": count,
+                "errors": int(errors.get((host,), 0)),
+                "avg_ms": round(stats["sum"] / count * 1000, 1) if count else 0.0,
+                "max_ms": round(stats["max"] * 1000, 1),
+            }
+        return summary
+
+http_client = HttpClient()
@@ -0,0 +1,225 @@
+import math
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+def _label_key(labelnames: tuple[str, ...], labels: dict) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs: list[tuple[str, str]]) -> str:
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self._values: dict[tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self.snapshot().items()):
+            lines.append(f"{self.name}{_format_labels(list(zip(self.labelnames, key)))} {_format_value(value)}")
+        return lines
+
+
+class _Series:
+    __slots__ = ("buckets", "count", "total", "max")
+
+    def __init__(self, size: int) -> None:
+        self.buckets = [0] * size
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+
+class Histogram:
+    def __init__(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> None:
+        self.name = name
+        self.help = help_text
+        self.labelnames = labelnames
+        self.bounds = tuple(buckets) + (math.inf,)
+        self._series: dict[tuple[str, ...], _Series] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = _Series(len(self.bounds))
+            series.count += 1
+            series.total += value
+            series.max = max(series.max, value)
+            for idx, bound in enumerate(self.bounds):
+                if value <= bound:
+                    series.buckets[idx] += 1
+                    break
+
+    def snapshot(self) -> dict[tuple[str, ...], dict]:
+        with self._lock:
+            return {
+                key: {"buckets": list(s.buckets), "count": s.count, "sum": s.total, "max": s.max}
+                for key, s in self._series.items()
+            }
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self.snapshot().items()):
+            pairs = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.bounds, series["buckets"]):
+                cumulative += count
+                labels = _format_labels(pairs + [("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(pairs)} {_format_value(series['sum'])}")
+            lines.append(f"{self.name}_count{_format_labels(pairs)} {series['count']}")
+        return lines
+
+
+class _Callback:
+    # Metricas que se leen al exportar (tamano del pool de DB, cache de auth...).
+    def __init__(self, name: str, help_text: str, kind: str, fn: Callable[[], dict[tuple[tuple[str, str], ...], float]]):
+        self.name = name
+        self.help = help_text
+        self.kind = kind
+        self.fn = fn
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for labels, value in sorted(self.fn().items()):
+            lines.append(f"{self.name}{_format_labels(list(labels))} {_format_value(value)}")
+        return lines
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help_text: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(
+        self, name: str, help_text: str, labelnames: tuple[str, ...] = (), buckets: tuple[float, ...] = LATENCY_BUCKETS
+    ) -> Histogram:
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def callback(self, name: str, help_text: str, kind: str, fn: Callable) -> None:
+        self._register(_Callback(name, help_text, kind, fn))
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            try:
+                lines.extend(metric.render())
+            except Exception:
+                # Una callback rota no debe tumbar el resto de /metrics.
+                continue
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+request_duration = registry.histogram(
+    "farmareach_http_request_duration_seconds", "Latencia de cada endpoint de la API.", ("method", "route", "status")
+)
+request_db_queries = registry.histogram(
+    "farmareach_request_db_queries",
+    "Consultas SQL ejecutadas por peticion.",
+    ("route",),
+    buckets=(0, 1, 2, 5, 10, 25, 50, 100, 250, 1000),
+)
+request_db_seconds = registry.histogram(
+    "farmareach_request_db_seconds", "Tiempo en base de datos por peticion.", ("route",)
+)
+db_queries = registry.counter("farmareach_db_queries_total", "Consultas SQL ejecutadas.", ("statement",))
+db_query_duration = registry.histogram(
+    "farmareach_db_query_duration_seconds", "Latencia de cada consulta SQL.", ("statement",)
+)
+external_request_duration = registry.histogram(
+    "farmareach_external_request_duration_seconds",
+    "Latencia de las llamadas HTTP salientes por host.",
+    ("host",),
+    buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+external_request_errors = registry.counter(
+    "farmareach_external_request_errors_total", "Llamadas HTTP salientes fallidas (excepcion o 5xx).", ("host",)
+)
+collector_duration = registry.histogram(
+    "farmareach_collector_duration_seconds", "Duracion de cada fuente en /capture.", ("source",)
+)
+collector_runs = registry.counter(
+    "farmareach_collector_runs_total", "Ejecuciones de cada fuente por resultado.", ("source", "outcome")
+)
+smtp_send_duration = registry.histogram(
+    "farmareach_smtp_send_duration_seconds", "Latencia de cada envio SMTP.", ("outcome",)
+)
+
+SQL_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# [consultas, segundos] de la peticion en curso. El middleware lo crea y los hilos
+# del threadpool heredan el contexto, asi que las consultas del handler suman aqui.
+_request_db: ContextVar[list | None] = ContextVar("farmareach_request_db", default=None)
+
+
+def statement_kind(sql: str) -> str:
+    head = sql.lstrip()[:8].split(None, 1)
+    kind = head[0].upper() if head else ""
+    return kind if kind in SQL_STATEMENTS else "OTHER"
+
+
+def record_query(sql: str, seconds: float) -> None:
+    kind = statement_kind(sql)
+    db_queries.inc(statement=kind)
+    db_query_duration.observe(seconds, statement=kind)
+    holder = _request_db.get()
+    if holder is not None:
+        holder[0] += 1
+        holder[1] += seconds
+
+
+@contextmanager
+def track_request_db():
+    holder = [0, 0.0]
+    token = _request_db.set(holder)
+    try:
+        yield holder
+    finally:
+        _request_db.reset(token)
@@ -0,0 +1,183 @@
+import logging
+from typing import Callable
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import IntegrityError
+
+logger = logging.getLogger("farmareach.migrations")
+
+
+def add_column(table: str, column: str, ddl_type: str, **dialect_types: str) -> Callable[[Connection], None]:
+    # SQLite no admite ADD COLUMN IF NOT EXISTS, y en una base nueva create_all ya crea la columna.
+    def migrate(conn: Connection) -> None:
+        if column in {col["name"] for col in inspect(conn).get_columns(table)}:
+            return
+        column_type = dialect_types.get(conn.dialect.name, ddl_type)
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}"))
+
+    return migrate
+
+
+SQLITE_LEAD_SEARCH = (
+    # Copia de las columnas buscables en una tabla FTS5 (rowid = leads.id) mantenida por triggers.
+    # remove_diacritics ignora tildes. Sin indice de prefijo FTS5 junta en memoria todas las
+    # coincidencias de "farm"*; con prefix 2..8 las recorre en orden y el LIMIT corta. detail=column
+    # (sin posiciones, no hay busqueda por frase) compensa el tamano de esos indices.
+    # owner lleva hex(owner_id): un solo token por cuenta que FTS5 cruza con los terminos buscados.
+    "CREATE VIRTUAL TABLE IF NOT EXISTS leads_fts USING fts5("
+    "owner, nombre, direccion, zona, email, tokenize='unicode61 remove_diacritics 2', "
+    "detail=column, prefix='2 3 4 5 6 7 8')",
+    "CREATE TRIGGER IF NOT EXISTS leads_fts_insert AFTER INSERT ON leads BEGIN "
+    "INSERT INTO leads_fts (rowid, owner, nombre, direccion, zona, email) "
+    "VALUES (new.id, hex(new.owner_id), new.nombre, new.direccion, new.zona, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS leads_fts_update AFTER UPDATE OF owner_id, nombre, direccion, zona, email ON leads BEGIN "
+    "DELETE FROM leads_fts WHERE rowid = old.id; "
+    "INSERT INTO leads_fts (rowid, owner, nombre, direccion, zona, email) "
+    "VALUES (new.id, hex(new.owner_id), new.nombre, new.direccion, new.zona, new.email); END",
+    "CREATE TRIGGER IF NOT EXISTS leads_fts_delete AFTER DELETE ON leads BEGIN "
+    "DELETE FROM leads_fts WHERE rowid = old.id; END",
+    "DELETE FROM leads_fts",
+    "INSERT INTO leads_fts (rowid, owner, nombre, direccion, zona, email) "
+    "SELECT id, hex(owner_id), nombre, direccion, zona, email FROM leads",
+)
+POSTGRES_LEAD_SEARCH = (
+    # Indice de trigramas sobre el texto sin tildes: sirve LIKE '%...%' en cualquier posicion.
+    # Supabase instala las extensiones en el esquema "extensions": gin_trgm_ops se resuelve por search_path.
+    "SET LOCAL search_path = public, extensions",
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE EXTENSION IF NOT EXISTS unaccent",
+    "CREATE OR REPLACE FUNCTION farmareach_search_text(nombre text, direccion text, zona text, email text) "
+    "RETURNS text LANGUAGE sql IMMUTABLE PARALLEL SAFE SET search_path = public, extensions, pg_catalog AS $$ "
+    "SELECT lower(unaccent('unaccent'::regdictionary, coalesce(nombre, '') || ' ' || coalesce(direccion, '') "
+    "|| ' ' || coalesce(zona, '') || ' ' || coalesce(email, ''))) $$",
+    "CREATE INDEX IF NOT EXISTS ix_leads_search_trgm ON leads "
+    "USING gin (farmareach_search_text(nombre, direccion, zona, email) gin_trgm_ops)",
+)
+
+
+def lead_search_index(conn: Connection) -> None:
+    statements = POSTGRES_LEAD_SEARCH if conn.dialect.name == "postgresql" else SQLITE_LEAD_SEARCH
+    try:
+        # Savepoint: sin permisos para CREATE EXTENSION o sin FTS5 la migracion sigue y
+        # /leads/search usa la busqueda sin indice.
+        with conn.begin_nested():
+            for statement in statements:
+                conn.execute(text(statement))
+    except Exception as exc:
+        logger.warning("lead search index unavailable detail=%s", exc)
+
+
+def drop_campaign_task_lead_fk(conn: Connection) -> None:
+    # El modelo no declara la FK: en Postgres el ON DELETE CASCADE de sql/supabase_schema.sql
+    # borraba las tareas de los leads fusionados por /leads/dedupe y cambiaba el progreso del job.
+    if conn.dialect.name == "postgresql":
+        conn.execute(text("ALTER TABLE IF EXISTS campaign_tasks DROP CONSTRAINT IF EXISTS campaign_tasks_lead_id_fkey"))
+
+
+# Migraciones de esquema en orden. Cada una se aplica una sola vez, en su propia
+# transaccion, y queda registrada en schema_migrations. Las sentencias SQL tienen que
+# valer tanto en SQLite como en Postgres; lo que dependa del motor va en una funcion.
+MIGRATIONS: tuple[tuple[str, tuple[str | Callable[[Connection], None], ...]], ...] = (
+    (
+        "0001_lead_query_indexes",
+        (
+            # Todas las consultas de leads filtran por owner_id y ordenan por id desc.
+            "CREATE INDEX IF NOT EXISTS ix_leads_owner_id_desc ON leads (owner_id, id DESC)",
+            "CREATE INDEX IF NOT EXISTS ix_leads_owner_estado_id ON leads (owner_id, estado_envio, id DESC)",
+            "CREATE INDEX IF NOT EXISTS ix_leads_owner_fuente_id ON leads (owner_id, fuente, id DESC)",
+            "CREATE INDEX IF NOT EXISTS ix_leads_owner_con_email ON leads (owner_id, id DESC) WHERE email <> ''",
+            "CREATE INDEX IF NOT EXISTS idx_email_logs_lead_id ON email_logs (lead_id)",
+        ),
+    ),
+    (
+        "0002_drop_single_column_lead_indexes",
+        (
+            # Quedan cubiertos por los compuestos de 0001 y solo encarecian cada insert.
+            "DROP INDEX IF EXISTS ix_leads_owner_id",
+            "DROP INDEX IF EXISTS idx_leads_owner_id",
+            "DROP INDEX IF EXISTS idx_leads_estado_envio",
+            "DROP INDEX IF EXISTS idx_leads_fuente",
+            "DROP INDEX IF EXISTS idx_leads_email",
+        ),
+    ),
+    (
+        "0003_compact_email_logs",
+        (
+            # El cuerpo puede guardarse como plantilla (email_templates) + contexto o comprimido.
+            add_column("email_logs", "template_hash", "VARCHAR(64)"),
+            add_column("email_logs", "contexto", "TEXT"),
+            add_column("email_logs", "cuerpo_comprimido", "BLOB", postgresql="BYTEA"),
+            "CREATE INDEX IF NOT EXISTS ix_email_logs_created_at ON email_logs (created_at)",
+        ),
+    ),
+    (
+        "0004_lead_coordinates",
+        (
+            add_column("leads", "lat", "FLOAT"),
+            add_column("leads", "lon", "FLOAT"),
+            add_column("leads", "geohash", "VARCHAR(12)"),
+            # Busqueda por radio: un rango de geohash por celda que cubre el circulo.
+            "CREATE INDEX IF NOT EXISTS ix_leads_owner_geohash ON leads (owner_id, geohash) WHERE geohash IS NOT NULL",
+        ),
+    ),
+    (
+        "0005_lead_search_index",
+        (lead_search_index,),
+    ),
+    (
+        "0006_campaign_tasks_without_lead_fk",
+        (drop_campaign_task_lead_fk,),
+    ),
+    (
+        "0007_email_templates_last_used",
+        (add_column("email_templates", "last_used_at", "TIMESTAMP"),),
+    ),
+)
+
+_SCHEMA_MIGRATIONS_DDL = (
+    "CREATE TABLE IF NOT EXISTS schema_migrations ("
+    "version VARCHAR(64) PRIMARY KEY, applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP NOT NULL)"
+)
+
+
+def applied_versions(engine: Engine) -> set[str]:
+    if "schema_migrations" not in inspect(engine).get_table_names():
+        return set()
+    with engine.connect() as conn:
+        return set(conn.execute(text("SELECT version FROM schema_migrations")).scalars())
+
+
+def run_migrations(engine: Engine) -> list[str]:
+    with engine.begin() as conn:
+        conn.execute(text(_SCHEMA_MIGRATIONS_DDL))
+    done = applied_versions(engine)
+
+    applied = []
+    for version, statements in MIGRATIONS:
+        if version in done:
+            continue
+        try:
+            with engine.begin() as conn:
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(text(statement))
+                conn.execute(text("INSERT INTO schema_migrations (version) VALUES (:version)"), {"version": version})
+        except IntegrityError:
+            # Otra instancia la aplico a la vez; las sentencias son idempotentes.
+            continue
+        logger.info("schema migration applied version=%s", version)
+        applied.append(version)
+    return applied
+
+
+if __name__ == "__main__":
+    from src.core.db import engine, init_db
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    done = applied_versions(engine)
+    for version, _ in MIGRATIONS:
+        print(f"{version}: {'aplicada' if version in done else 'pendiente'}")
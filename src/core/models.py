@@ -1,4 +1,4 @@
-﻿from sqlalchemy import Column, DateTime, Integer, String, Text, func
+﻿from sqlalchemy import Boolean, Column, DateTime, Float, Index, Integer, LargeBinary, String, Text, func
 from sqlalchemy.orm import declarative_base
 
 Base = declarative_base()
@@ -6,9 +6,12 @@ Base = declarative_base()
 
 class Lead(Base):
     __tablename__ = "leads"
+    __table_args__ = (
+        Index("ux_leads_owner_nombre_direccion", "owner_id", "nombre", "direccion", unique=True),
+    )
 
     id = Column(Integer, primary_key=True)
-    owner_id = Column(String(64), nullable=False, default="", index=True)
+    owner_id = Column(String(64), nullable=False, default="")
     nombre = Column(String(255), nullable=False)
     direccion = Column(String(500), default="")
     zona = Column(String(255), default="")
@@ -19,6 +22,10 @@ class Lead(Base):
     fuente = Column(String(64), nullable=False)
     estado_envio = Column(String(32), default="pendiente")
     notas = Column(Text, default="")
+    lat = Column(Float, nullable=True)
+    lon = Column(Float, nullable=True)
+    # Geohash de lat/lon (src/services/geo.py); indexado junto a owner_id para /leads/nearby.
+    geohash = Column(String(12), nullable=True)
     created_at = Column(DateTime, server_default=func.now())
 
 
@@ -29,7 +36,54 @@ class EmailLog(Base):
     lead_id = Column(Integer, nullable=False)
     destinatario = Column(String(255), nullable=False)
     asunto = Column(String(255), nullable=False)
-    cuerpo = Column(Text, nullable=False)
+    # Vacio cuando el cuerpo se guarda compacto: plantilla + contexto o cuerpo_comprimido.
+    cuerpo = Column(Text, nullable=False, default="")
     estado = Column(String(32), nullable=False)
     detalle = Column(Text, default="")
+    template_hash = Column(String(64), nullable=True)
+    contexto = Column(Text, nullable=True)
+    cuerpo_comprimido = Column(LargeBinary, nullable=True)
     created_at = Column(DateTime, server_default=func.now())
+
+
+class EmailTemplate(Base):
+    # Plantillas de campana direccionadas por contenido (sha256 del texto).
+    __tablename__ = "email_templates"
+
+    hash = Column(String(64), primary_key=True)
+    template_text = Column(Text, nullable=False)
+    created_at = Column(DateTime, server_default=func.now())
+    # Lo actualiza cada store_template: la limpieza de archive_old_logs solo borra plantillas sin uso reciente.
+    last_used_at = Column(DateTime, server_default=func.now())
+
+
+class CampaignJob(Base):
+    __tablename__ = "campaign_jobs"
+
+    id = Column(Integer, primary_key=True)
+    owner_id = Column(String(64), nullable=False, index=True)
+    estado = Column(String(32), nullable=False, default="pendiente")
+    asunto = Column(String(255), nullable=False)
+    template_text = Column(Text, nullable=False)
+    remitente = Column(String(255), default="")
+    firma = Column(String(255), default="")
+    propuesta_valor = Column(String(500), default="")
+    only_pending = Column(Boolean, nullable=False, default=True)
+    total = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, server_default=func.now())
+    finished_at = Column(DateTime, nullable=True)
+
+
+class CampaignTask(Base):
+    __tablename__ = "campaign_tasks"
+    __table_args__ = (
+        Index("ux_campaign_tasks_job_lead", "job_id", "lead_id", unique=True),
+        Index("ix_campaign_tasks_estado_id", "estado", "id"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(Integer, nullable=False)
+    lead_id = Column(Integer, nullable=False)
+    estado = Column(String(32), nullable=False, default="pendiente")
+    detalle = Column(Text, default="")
+    updated_at = Column(DateTime, server_default=func.now())
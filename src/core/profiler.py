@@ -0,0 +1,157 @@
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Hilos parados esperando trabajo o red del event loop: no aportan nada al perfil.
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+}
+TOP_FUNCTIONS = 25
+TOP_STACKS = 200
+
+
+def _frame_label(frame) -> str:
+    path = frame.f_code.co_filename
+    if path.startswith(ROOT_DIR):
+        path = os.path.relpath(path, ROOT_DIR)
+    else:
+        path = os.path.basename(path)
+    return f"{path}:{frame.f_code.co_name}"
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+class SamplingProfiler:
+    # Muestrea las pilas de todos los hilos mientras hay en curso alguna peticion armada.
+    # Los collectors y el envio SMTP corren en otros hilos, asi que se muestrea el proceso
+    # entero y no solo el hilo del handler; con peticiones concurrentes de otras rutas
+    # el perfil incluye tambien su trabajo.
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self._generation = 0
+        self._reset(route="", requests=0, interval=0.01)
+
+    def _reset(self, route: str, requests: int, interval: float) -> None:
+        self.route = route
+        self.requested = requests
+        self.interval = interval
+        self.remaining = requests
+        self.in_flight = 0
+        self.completed = 0
+        self.samples = 0
+        self.started_at = 0.0
+        self.finished_at = 0.0
+        self._stacks: Counter = Counter()
+
+    def arm(self, route: str, requests: int, interval: float) -> None:
+        with self._lock:
+            # Las peticiones de un armado anterior que sigan en curso no cuentan en este.
+            self._generation += 1
+            self._reset(route, requests, interval)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+                self._thread.start()
+
+    def begin(self, route: str) -> int | None:
+        with self._lock:
+            if route != self.route or self.remaining <= 0:
+                return None
+            self.remaining -= 1
+            self.in_flight += 1
+            if not self.started_at:
+                self.started_at = time.time()
+            return self._generation
+
+    def end(self, generation: int) -> None:
+        with self._lock:
+            if generation != self._generation:
+                return
+            self.in_flight -= 1
+            self.completed += 1
+            if self.remaining <= 0 and self.in_flight <= 0:
+                self.finished_at = time.time()
+
+    def _active(self) -> bool:
+        return self.remaining > 0 or self.in_flight > 0
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while True:
+            with self._lock:
+                if not self._active():
+                    self._thread = None
+                    return
+                sampling = self.in_flight > 0
+                interval = self.interval
+            if sampling:
+                self._sample(own)
+            time.sleep(interval)
+
+    def _sample(self, own: int) -> None:
+        stacks = []
+        for ident, frame in sys._current_frames().items():
+            if ident == own or _is_idle(frame):
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            stacks.append(";".join(reversed(labels)))
+        with self._lock:
+            self.samples += 1
+            self._stacks.update(stacks)
+
+    def status(self) -> str:
+        if not self.requested:
+            return "idle"
+        if self._active():
+            return "running" if self.started_at else "armed"
+        return "done"
+
+    def report(self) -> dict:
+        with self._lock:
+            stacks = dict(self._stacks)
+            result = {
+                "status": self.status(),
+                "route": self.route,
+                "requests": self.requested,
+                "completed": self.completed,
+                "interval_ms": round(self.interval * 1000, 3),
+                "samples": self.samples,
+                "duration_s": round((self.finished_at or time.time()) - self.started_at, 3) if self.started_at else 0.0,
+            }
+
+        # "self" = la funcion estaba en lo alto de la pila; "cumulative" = aparecia en ella.
+        own: Counter = Counter()
+        cumulative: Counter = Counter()
+        for stack, count in stacks.items():
+            frames = stack.split(";")
+            own[frames[-1]] += count
+            for label in set(frames):
+                cumulative[label] += count
+        total = sum(stacks.values()) or 1
+        result["top_self"] = [
+            {"function": label, "samples": count, "pct": round(count * 100 / total, 1)}
+            for label, count in own.most_common(TOP_FUNCTIONS)
+        ]
+        result["top_cumulative"] = [
+            {"function": label, "samples": count, "pct": round(count * 100 / total, 1)}
+            for label, count in cumulative.most_common(TOP_FUNCTIONS)
+        ]
+        # Formato "collapsed" de flamegraph.pl / speedscope: "raiz;...;hoja muestras".
+        result["collapsed"] = [
+            f"{stack} {count}" for stack, count in Counter(stacks).most_common(TOP_STACKS)
+        ]
+        return result
+
+
+profiler = SamplingProfiler()
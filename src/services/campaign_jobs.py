@@ -0,0 +1,283 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, insert, lambda_stmt, select, update
+
+from src.core.config import (
+    CAMPAIGN_STALE_SECONDS,
+    CAMPAIGN_SWEEP_SECONDS,
+    CAMPAIGN_WORKER_POLL_SECONDS,
+    CAMPAIGN_WORKERS,
+)
+from src.core.db import get_session
+from src.core.models import CampaignJob, CampaignTask, EmailLog, Lead
+from src.services.email_log_store import log_values, store_template
+from src.services.lead_queries import HAS_EMAIL
+from src.services.mailer import MailerSession
+from src.services.template_engine import render_email
+
+logger = logging.getLogger("farmareach.campaigns")
+
+ACTIVE_JOB_STATES = ("pendiente", "en_curso")
+OPEN_TASK_STATES = ("pendiente", "enviando")
+CLAIM_BATCH = 20
+
+_stop = threading.Event()
+_threads: list[threading.Thread] = []
+_sweep_lock = threading.Lock()
+_last_sweep: float | None = None
+
+
+def campaign_context(lead: Lead, remitente: str, firma: str, propuesta_valor: str) -> dict:
+    return {
+        "nombre": lead.nombre,
+        "zona": lead.zona or lead.codigo_postal or "tu zona",
+        "codigo_postal": lead.codigo_postal,
+        "remitente": remitente,
+        "firma": firma,
+        "propuesta_valor": propuesta_valor,
+    }
+
+
+def campaign_targets_query(owner_id: str, only_pending: bool, lead_ids: list[int] | None, ids_only: bool = False):
+    # lambda_stmt: la sentencia se construye y compila una vez por combinacion de filtros.
+    if ids_only:
+        query = lambda_stmt(lambda: select(Lead.id).where(Lead.owner_id == owner_id, HAS_EMAIL))
+    else:
+        query = lambda_stmt(lambda: select(Lead).where(Lead.owner_id == owner_id, HAS_EMAIL))
+    if only_pending:
+        query += lambda q: q.where(Lead.estado_envio == "pendiente")
+    if lead_ids:
+        query += lambda q: q.where(Lead.id.in_(lead_ids))
+    return query + (lambda q: q.order_by(Lead.id.desc()))
+
+
+def enqueue_campaign(owner_id: str, payload) -> int:
+    with get_session() as session:
+        targets_query = campaign_targets_query(owner_id, payload.only_pending, payload.lead_ids, ids_only=True)
+        lead_ids = session.execute(targets_query).scalars().all()
+        job = CampaignJob(
+            owner_id=owner_id,
+            estado="pendiente" if lead_ids else "completado",
+            asunto=payload.asunto,
+            template_text=payload.template_text,
+            remitente=payload.remitente,
+            firma=payload.firma,
+            propuesta_valor=payload.propuesta_valor,
+            only_pending=payload.only_pending,
+            total=len(lead_ids),
+        )
+        session.add(job)
+        session.flush()
+        if lead_ids:
+            session.execute(
+                insert(CampaignTask),
+                [{"job_id": job.id, "lead_id": lead_id, "estado": "pendiente"} for lead_id in lead_ids],
+            )
+        return job.id
+
+
+def job_progress(job_id: int, owner_id: str) -> dict | None:
+    with get_session() as session:
+        job = session.get(CampaignJob, job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        counts = dict(
+            session.execute(
+                select(CampaignTask.estado, func.count())
+                .where(CampaignTask.job_id == job_id)
+                .group_by(CampaignTask.estado)
+            ).all()
+        )
+        return {
+            "id": job.id,
+            "estado": job.estado,
+            "total": job.total,
+            "sent": counts.get("enviado", 0),
+            "errors": counts.get("error", 0),
+            "skipped": counts.get("omitido", 0) + counts.get("cancelado", 0),
+            "remaining": sum(counts.get(state, 0) for state in OPEN_TASK_STATES),
+        }
+
+
+def cancel_job(job_id: int, owner_id: str) -> dict | None:
+    with get_session() as session:
+        job = session.get(CampaignJob, job_id)
+        if job is None or job.owner_id != owner_id:
+            return None
+        if job.estado in ACTIVE_JOB_STATES:
+            job.estado = "cancelado"
+            job.finished_at = datetime.utcnow()
+            # Las tareas ya reclamadas ("enviando") terminan su envio en curso.
+            session.execute(
+                update(CampaignTask)
+                .where(CampaignTask.job_id == job_id, CampaignTask.estado == "pendiente")
+                .values(estado="cancelado", updated_at=func.now())
+            )
+    return job_progress(job_id, owner_id)
+
+
+def recover_interrupted_tasks() -> int:
+    # Una tarea que se quedo en "enviando" pudo salir o no por SMTP. No se
+    # reintenta nunca: preferimos un error visible a enviar el email dos veces.
+    cutoff = datetime.utcnow() - timedelta(seconds=CAMPAIGN_STALE_SECONDS)
+    with get_session() as session:
+        stale = session.execute(
+            select(CampaignTask.id, CampaignTask.job_id).where(
+                CampaignTask.estado == "enviando", CampaignTask.updated_at < cutoff
+            )
+        ).all()
+        if not stale:
+            return 0
+        res = session.execute(
+            update(CampaignTask)
+            .where(CampaignTask.id.in_([task_id for task_id, _ in stale]), CampaignTask.estado == "enviando")
+            .values(estado="error", detalle="Envio interrumpido; no se reintenta para evitar duplicados", updated_at=func.now())
+            .execution_options(synchronize_session=False)
+        )
+        recovered = res.rowcount or 0
+        # Si la tarea interrumpida era la ultima abierta, nadie mas cerraria el job.
+        for job_id in sorted({job_id for _, job_id in stale}):
+            _finish_job_if_done(session, job_id)
+    if recovered:
+        logger.warning("campaign tasks marked as interrupted count=%s", recovered)
+    return recovered
+
+
+def _sweep_due() -> bool:
+    # Un solo hilo por intervalo repasa las tareas colgadas: un reinicio rapido deja
+    # tareas en "enviando" que aun no superaban CAMPAIGN_STALE_SECONDS al arrancar.
+    global _last_sweep
+    with _sweep_lock:
+        now = time.monotonic()
+        if _last_sweep is not None and now - _last_sweep < CAMPAIGN_SWEEP_SECONDS:
+            return False
+        _last_sweep = now
+        return True
+
+
+def _claim_next_task() -> int | None:
+    with get_session() as session:
+        candidates = session.execute(
+            select(CampaignTask.id)
+            .join(CampaignJob, CampaignJob.id == CampaignTask.job_id)
+            .where(CampaignTask.estado == "pendiente", CampaignJob.estado.in_(ACTIVE_JOB_STATES))
+            .order_by(CampaignTask.id)
+            .limit(CLAIM_BATCH)
+        ).scalars().all()
+        for task_id in candidates:
+            # UPDATE condicional: solo un worker (hilo o proceso) gana cada tarea.
+            res = session.execute(
+                update(CampaignTask)
+                .where(CampaignTask.id == task_id, CampaignTask.estado == "pendiente")
+                .values(estado="enviando", updated_at=func.now())
+            )
+            if res.rowcount == 1:
+                return task_id
+    return None
+
+
+def _set_job_state(session, job_id: int, from_states: tuple[str, ...], **values) -> None:
+    # Condicional sobre el estado actual en DB para no pisar una cancelacion concurrente.
+    session.execute(
+        update(CampaignJob).where(CampaignJob.id == job_id, CampaignJob.estado.in_(from_states)).values(**values)
+    )
+
+
+def _finish_job_if_done(session, job_id: int) -> None:
+    open_tasks = session.execute(
+        select(func.count())
+        .select_from(CampaignTask)
+        .where(CampaignTask.job_id == job_id, CampaignTask.estado.in_(OPEN_TASK_STATES))
+    ).scalar_one()
+    if open_tasks == 0:
+        _set_job_state(session, job_id, ACTIVE_JOB_STATES, estado="completado", finished_at=datetime.utcnow())
+
+
+def _process_task(task_id: int, mailer: MailerSession) -> None:
+    with get_session() as session:
+        task = session.get(CampaignTask, task_id)
+        job = session.get(CampaignJob, task.job_id)
+        lead = session.get(Lead, task.lead_id)
+
+        if lead is None or not lead.email:
+            task.estado, task.detalle = "error", "Lead sin email"
+        elif job.only_pending and lead.estado_envio != "pendiente":
+            task.estado, task.detalle = "omitido", f"Lead en estado {lead.estado_envio}"
+        else:
+            _set_job_state(session, job.id, ("pendiente",), estado="en_curso")
+            context = campaign_context(lead, job.remitente, job.firma, job.propuesta_valor)
+            try:
+                cuerpo = render_email(job.template_text, context)
+                asunto_render = render_email(job.asunto, context)
+            except Exception as exc:
+                task.estado, task.detalle = "error", f"Error en la plantilla: {exc}"
+            else:
+                ok, detail = mailer.send(lead.email, asunto_render, cuerpo, job.remitente)
+                status = "enviado" if ok else "error"
+                task.estado, task.detalle = status, detail
+                lead.estado_envio = status
+                session.add(
+                    EmailLog(
+                        lead_id=lead.id,
+                        destinatario=lead.email,
+                        asunto=asunto_render,
+                        estado=status,
+                        detalle=detail,
+                        **log_values(cuerpo, context, store_template(session, job.template_text)),
+                    )
+                )
+        task.updated_at = func.now()
+        session.flush()
+        _finish_job_if_done(session, job.id)
+
+
+def run_worker(stop: threading.Event) -> None:
+    # Cada worker reutiliza su conexion SMTP mientras haya cola y la suelta al quedarse sin trabajo.
+    with MailerSession() as mailer:
+        while not stop.is_set():
+            try:
+                if _sweep_due():
+                    recover_interrupted_tasks()
+                task_id = _claim_next_task()
+                if task_id is None:
+                    mailer.close()
+                    stop.wait(CAMPAIGN_WORKER_POLL_SECONDS)
+                    continue
+                _process_task(task_id, mailer)
+            except Exception:
+                logger.exception("campaign worker iteration failed")
+                stop.wait(CAMPAIGN_WORKER_POLL_SECONDS)
+
+
+def start_workers(count: int = CAMPAIGN_WORKERS) -> None:
+    if _threads or count <= 0:
+        return
+    _stop.clear()
+    for idx in range(count):
+        thread = threading.Thread(target=run_worker, args=(_stop,), name=f"campaign-worker-{idx}", daemon=True)
+        thread.start()
+        _threads.append(thread)
+
+
+def stop_workers(timeout: float = 10) -> None:
+    _stop.set()
+    for thread in _threads:
+        thread.join(timeout)
+    _threads.clear()
+
+
+if __name__ == "__main__":
+    # Worker dedicado: python -m src.services.campaign_jobs (con CAMPAIGN_WORKERS=0 en la API).
+    from src.core.db import init_db
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    start_workers(max(1, CAMPAIGN_WORKERS))
+    try:
+        while not _stop.wait(1):
+            pass
+    except KeyboardInterrupt:
+        stop_workers()
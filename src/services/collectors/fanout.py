@@ -0,0 +1,59 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from typing import Callable
+
+from src.core.config import COLLECTOR_DEFAULT_TIMEOUT, COLLECTOR_MAX_WORKERS
+from src.core.metrics import collector_duration, collector_runs
+
+logger = logging.getLogger("farmareach.collectors")
+
+# Pool compartido entre peticiones: limita cuantas llamadas externas hay en vuelo
+# aunque lleguen varios /capture a la vez.
+_executor = ThreadPoolExecutor(max_workers=COLLECTOR_MAX_WORKERS, thread_name_prefix="collector")
+
+
+def _timed(name: str, fn: Callable[[], list[dict]]) -> tuple[list[dict], float]:
+    # Se mide en el hilo del collector: una fuente que vence su presupuesto sigue
+    # contando su duracion real cuando por fin termina.
+    started = time.monotonic()
+    try:
+        return fn(), (time.monotonic() - started) * 1000
+    finally:
+        collector_duration.observe(time.monotonic() - started, source=name)
+
+
+def run_collectors(
+    jobs: dict[str, Callable[[], list[dict]]],
+    timeouts: dict[str, float],
+) -> tuple[dict[str, list[dict]], list[str], dict[str, float]]:
+    started = time.monotonic()
+    futures = {name: _executor.submit(_timed, name, fn) for name, fn in jobs.items()}
+
+    results: dict[str, list[dict]] = {}
+    warnings: list[str] = []
+    latencies: dict[str, float] = {}
+    for name, future in futures.items():
+        budget = timeouts.get(name, COLLECTOR_DEFAULT_TIMEOUT)
+        remaining = max(0.0, started + budget - time.monotonic())
+        try:
+            leads, elapsed_ms = future.result(timeout=remaining)
+        except FutureTimeout:
+            # El hilo no se puede interrumpir; su resultado se descarta cuando llegue.
+            future.cancel()
+            latencies[name] = round((time.monotonic() - started) * 1000, 1)
+            warnings.append(f"{name}: sin respuesta en {budget:g}s, se omiten sus resultados")
+            logger.warning("collector timeout source=%s budget=%s", name, budget)
+            collector_runs.inc(source=name, outcome="timeout")
+            continue
+        except Exception as exc:
+            latencies[name] = round((time.monotonic() - started) * 1000, 1)
+            warnings.append(f"{name}: error en la busqueda ({exc})")
+            logger.exception("collector failed source=%s", name)
+            collector_runs.inc(source=name, outcome="error")
+            continue
+        collector_runs.inc(source=name, outcome="ok")
+        results[name] = leads
+        latencies[name] = round(elapsed_ms, 1)
+    return results, warnings, latencies
@@ -1,12 +1,11 @@
-import requests
+from src.core.config import CACHE_TTL_SERPAPI, SERPAPI_KEY
+from src.core.http_client import http_client
+from src.services.response_cache import normalize_query, response_cache
 
-from src.core.config import REQUEST_TIMEOUT, SERPAPI_KEY
+SERPAPI_URL = "https://serpapi.com/search.json"
 
 
-def search_google_maps_farmacias(query: str, location: str = "") -> list[dict]:
-    if not SERPAPI_KEY:
-        return []
-
+def _fetch_local_results(query: str, location: str) -> list | None:
     params = {
         "engine": "google_maps",
         "q": query,
@@ -17,16 +16,29 @@ def search_google_maps_farmacias(query: str, location: str = "") -> list[dict]:
         params["ll"] = location
 
     try:
-        resp = requests.get("https://serpapi.com/search.json", params=params, timeout=REQUEST_TIMEOUT)
+        resp = http_client.get(SERPAPI_URL, params=params)
         resp.raise_for_status()
+        return resp.json().get("local_results", [])
     except Exception:
+        return None
+
+
+def search_google_maps_farmacias(query: str, location: str = "") -> list[dict]:
+    if not SERPAPI_KEY:
         return []
 
-    data = resp.json()
-    results = data.get("local_results", [])
+    results = response_cache.cached_call(
+        "serpapi",
+        (normalize_query(query), location),
+        lambda: _fetch_local_results(query, location),
+        CACHE_TTL_SERPAPI,
+    )
+    if not results:
+        return []
 
     leads = []
     for item in results:
+        gps = item.get("gps_coordinates") or {}
         leads.append(
             {
                 "nombre": item.get("title", "").strip(),
@@ -37,6 +49,8 @@ def search_google_maps_farmacias(query: str, location: str = "") -> list[dict]:
                 "codigo_postal": "",
                 "email": "",
                 "fuente": "google_maps",
+                "lat": gps.get("latitude"),
+                "lon": gps.get("longitude"),
             }
         )
     return [l for l in leads if l["nombre"]]
@@ -1,14 +1,27 @@
+import math
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from concurrent.futures import TimeoutError as FutureTimeout
+from itertools import islice
+from typing import Iterator
 from urllib.parse import urlencode
 
-import requests
-
-from src.core.config import REQUEST_TIMEOUT, USER_AGENT
+from src.core.config import (
+    CACHE_TTL_GEOCODE,
+    CACHE_TTL_OVERPASS,
+    OSM_MAX_TILES,
+    OSM_TILE_MAX_DEG,
+    OSM_TILE_WORKERS,
+    OVERPASS_URLS,
+    REQUEST_TIMEOUT,
+    USER_AGENT,
+)
+from src.core.http_client import http_client
+from src.services.geo import bounding_box
+from src.services.response_cache import normalize_query, response_cache
 
 NOMINATIM_URL = "https://nominatim.openstreetmap.org/search"
-OVERPASS_URLS = [
-    "https://overpass-api.de/api/interpreter",
-    "https://overpass.kumi.systems/api/interpreter",
-]
 
 
 def _build_address(tags: dict) -> str:
@@ -28,55 +41,73 @@ def _pick(*values: str) -> str:
     return ""
 
 
-def search_openstreetmap_farmacias(zona_o_cp: str) -> list[dict]:
-    query = (zona_o_cp or "").strip()
-    if not query:
-        return []
-
-    headers = {"User-Agent": USER_AGENT}
-
+def _fetch_geocode(query: str, headers: dict) -> list | None:
     try:
         geo_params = {
             "q": query,
             "format": "jsonv2",
             "limit": 1,
         }
-        geo_resp = requests.get(
-            f"{NOMINATIM_URL}?{urlencode(geo_params)}",
-            headers=headers,
-            timeout=REQUEST_TIMEOUT,
-        )
+        geo_resp = http_client.get(f"{NOMINATIM_URL}?{urlencode(geo_params)}", headers=headers)
         geo_resp.raise_for_status()
-        geo_data = geo_resp.json()
+        return geo_resp.json()
     except Exception:
-        return []
+        return None
 
-    if not geo_data:
-        return []
 
-    bbox = geo_data[0].get("boundingbox", [])
-    if len(bbox) != 4:
-        return []
+class _MirrorHealth:
+    # Ordena los mirrors por salud: los que fallan quedan en cuarentena un tiempo creciente.
+    def __init__(self, urls: list[str]) -> None:
+        self.urls = list(urls)
+        self._failures = {url: 0 for url in self.urls}
+        self._cooldown_until = {url: 0.0 for url in self.urls}
+        self._latency = {url: 0.0 for url in self.urls}
+        self._turn = 0
+        self._lock = threading.Lock()
 
-    south = float(bbox[0])
-    north = float(bbox[1])
-    west = float(bbox[2])
-    east = float(bbox[3])
+    def ordered(self) -> list[str]:
+        now = time.monotonic()
+        with self._lock:
+            self._turn += 1
+            # Se rota el punto de partida para repartir teselas entre mirrors igual de sanos.
+            rotated = self.urls[self._turn % len(self.urls) :] + self.urls[: self._turn % len(self.urls)]
+            return sorted(
+                rotated,
+                key=lambda url: (self._cooldown_until[url] > now, self._failures[url], self._latency[url] > 20),
+            )
 
-    overpass_query = f"""
-    [out:json][timeout:25];
-    (
-      node[\"amenity\"=\"pharmacy\"]({south},{west},{north},{east});
-      way[\"amenity\"=\"pharmacy\"]({south},{west},{north},{east});
-      relation[\"amenity\"=\"pharmacy\"]({south},{west},{north},{east});
-    );
-    out center tags;
-    """
+    def report(self, url: str, ok: bool, latency: float) -> None:
+        with self._lock:
+            self._latency[url] = latency
+            if ok:
+                self._failures[url] = 0
+                self._cooldown_until[url] = 0.0
+                return
+            self._failures[url] += 1
+            self._cooldown_until[url] = time.monotonic() + min(300, 15 * 2 ** (self._failures[url] - 1))
+
+    def snapshot(self) -> dict[str, dict]:
+        now = time.monotonic()
+        with self._lock:
+            return {
+                url: {
+                    "failures": self._failures[url],
+                    "cooling_down": self._cooldown_until[url] > now,
+                    "last_latency_s": round(self._latency[url], 2),
+                }
+                for url in self.urls
+            }
+
+
+mirror_health = _MirrorHealth(OVERPASS_URLS)
+_tile_executor = ThreadPoolExecutor(max_workers=OSM_TILE_WORKERS, thread_name_prefix="overpass")
 
-    data = {}
-    for overpass_url in OVERPASS_URLS:
+
+def _fetch_overpass(overpass_query: str, headers: dict) -> dict | None:
+    for overpass_url in mirror_health.ordered():
+        started = time.monotonic()
         try:
-            overpass_resp = requests.post(
+            overpass_resp = http_client.post(
                 overpass_url,
                 data=overpass_query,
                 headers=headers,
@@ -84,37 +115,154 @@ def search_openstreetmap_farmacias(zona_o_cp: str) -> list[dict]:
             )
             overpass_resp.raise_for_status()
             data = overpass_resp.json()
-            if data.get("elements"):
-                break
         except Exception:
+            mirror_health.report(overpass_url, False, time.monotonic() - started)
             continue
-
-    if not data:
-        return []
-
-    leads = []
-    for element in data.get("elements", []):
-        tags = element.get("tags", {})
-        nombre = tags.get("name", "").strip()
-        if not nombre:
+        # Overpass responde 200 con "remark" cuando la consulta se corta por timeout o memoria.
+        if "runtime error" in (data.get("remark") or ""):
+            mirror_health.report(overpass_url, False, time.monotonic() - started)
             continue
+        mirror_health.report(overpass_url, True, time.monotonic() - started)
+        return data
+    return None
 
-        direccion = _build_address(tags)
-        telefono = _pick(tags.get("contact:phone", ""), tags.get("phone", ""))
-        website = _pick(tags.get("contact:website", ""), tags.get("website", ""))
-        email = _pick(tags.get("contact:email", ""), tags.get("email", ""))
-
-        leads.append(
-            {
-                "nombre": nombre,
-                "direccion": direccion,
-                "telefono": telefono,
-                "website": website,
-                "zona": query,
-                "codigo_postal": "",
-                "email": email,
-                "fuente": "openstreetmap",
-            }
+
+def _split_bbox(south: float, west: float, north: float, east: float) -> list[tuple[float, float, float, float]]:
+    rows = max(1, math.ceil((north - south) / OSM_TILE_MAX_DEG))
+    cols = max(1, math.ceil((east - west) / OSM_TILE_MAX_DEG))
+    while rows * cols > OSM_MAX_TILES:
+        # Zonas enormes: teselas mas grandes antes que miles de consultas.
+        if rows >= cols:
+            rows = math.ceil(rows / 2)
+        else:
+            cols = math.ceil(cols / 2)
+    lat_step = (north - south) / rows
+    lon_step = (east - west) / cols
+    return [
+        (
+            round(south + r * lat_step, 6),
+            round(west + c * lon_step, 6),
+            round(south + (r + 1) * lat_step, 6),
+            round(west + (c + 1) * lon_step, 6),
         )
+        for r in range(rows)
+        for c in range(cols)
+    ]
+
+
+def _overpass_query(tile: tuple[float, float, float, float]) -> str:
+    south, west, north, east = tile
+    return f"""
+    [out:json][timeout:25];
+    (
+      node[\"amenity\"=\"pharmacy\"]({south},{west},{north},{east});
+      way[\"amenity\"=\"pharmacy\"]({south},{west},{north},{east});
+      relation[\"amenity\"=\"pharmacy\"]({south},{west},{north},{east});
+    );
+    out center tags;
+    """
+
+
+def _fetch_tile(tile: tuple[float, float, float, float], headers: dict) -> list[dict]:
+    data = response_cache.cached_call(
+        "overpass",
+        tuple(round(v, 4) for v in tile),
+        lambda: _fetch_overpass(_overpass_query(tile), headers),
+        CACHE_TTL_OVERPASS,
+    )
+    return (data or {}).get("elements", [])
+
+
+def _element_to_lead(element: dict, query: str) -> dict | None:
+    tags = element.get("tags", {})
+    nombre = tags.get("name", "").strip()
+    if not nombre:
+        return None
+
+    direccion = _build_address(tags)
+    telefono = _pick(tags.get("contact:phone", ""), tags.get("phone", ""))
+    website = _pick(tags.get("contact:website", ""), tags.get("website", ""))
+    email = _pick(tags.get("contact:email", ""), tags.get("email", ""))
+    # Los nodos traen lat/lon; ways y relations, el centro que pide "out center".
+    point = element.get("center") or element
+
+    return {
+        "nombre": nombre,
+        "direccion": direccion,
+        "telefono": telefono,
+        "website": website,
+        "zona": query,
+        "codigo_postal": "",
+        "email": email,
+        "fuente": "openstreetmap",
+        "lat": point.get("lat"),
+        "lon": point.get("lon"),
+    }
+
+
+def _geocode_bbox(query: str, headers: dict) -> tuple[float, float, float, float] | None:
+    geo_data = response_cache.cached_call(
+        "nominatim",
+        (normalize_query(query),),
+        lambda: _fetch_geocode(query, headers),
+        CACHE_TTL_GEOCODE,
+    )
+    if not geo_data:
+        return None
+
+    bbox = geo_data[0].get("boundingbox", [])
+    if len(bbox) != 4:
+        return None
+
+    south = float(bbox[0])
+    north = float(bbox[1])
+    west = float(bbox[2])
+    east = float(bbox[3])
+    return south, west, north, east
+
+
+def iter_openstreetmap_farmacias(
+    zona_o_cp: str, center: tuple[float, float, float] | None = None, timeout: float | None = None
+) -> Iterator[dict]:
+    # center = (lat, lon, radio_km): se busca alrededor del punto sin pasar por Nominatim.
+    # timeout = presupuesto del collector; al vencer se cancelan las teselas aun en cola.
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    query = (zona_o_cp or "").strip()
+    if not query and center is None:
+        return
+
+    headers = {"User-Agent": USER_AGENT}
+    bbox = bounding_box(*center) if center is not None else _geocode_bbox(query, headers)
+    if bbox is None:
+        return
+    south, west, north, east = bbox
+
+    futures = [_tile_executor.submit(_fetch_tile, tile, headers) for tile in _split_bbox(south, west, north, east)]
+    seen: set[tuple[str, int]] = set()
+    remaining = max(0.0, deadline - time.monotonic()) if deadline is not None else None
+    try:
+        for future in as_completed(futures, timeout=remaining):
+            # Las teselas se solapan en los bordes: se deduplica por tipo e id de OSM.
+            for element in future.result():
+                key = (element.get("type", ""), element.get("id", 0))
+                if key in seen:
+                    continue
+                seen.add(key)
+                lead = _element_to_lead(element, query)
+                if lead:
+                    yield lead
+    except FutureTimeout:
+        # run_collectors ya descarta la fuente; asi las teselas pendientes no siguen ocupando el pool.
+        return
+    finally:
+        for future in futures:
+            future.cancel()
+
 
-    return leads
+def search_openstreetmap_farmacias(
+    zona_o_cp: str,
+    max_items: int | None = None,
+    center: tuple[float, float, float] | None = None,
+    timeout: float | None = None,
+) -> list[dict]:
+    return list(islice(iter_openstreetmap_farmacias(zona_o_cp, center, timeout), max_items))
@@ -1,25 +1,35 @@
-﻿from urllib.parse import quote_plus
+﻿from concurrent.futures import ThreadPoolExecutor
+from importlib.util import find_spec
+from itertools import islice
+from typing import Iterator
+from urllib.parse import quote_plus
 
-import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
-from src.core.config import REQUEST_TIMEOUT, USER_AGENT
+from src.core.config import CACHE_TTL_PAGINAS_AMARILLAS, PA_MAX_PAGES
+from src.core.http_client import http_client
+from src.services.response_cache import normalize_query, response_cache
 
+PAGINAS_AMARILLAS_URL = "https://www.paginasamarillas.es/search/farmacia/all-ma/{query}/all-is/all-ci/all-ba/all-pu/all-nc/{page}"
+# lxml es opcional: si esta instalado parsea bastante mas rapido que html.parser.
+HTML_PARSER = "lxml" if find_spec("lxml") else "html.parser"
 
-# Basado en la estructura publica de resultados de paginasamarillas.es
-# Puede requerir ajustes si el HTML cambia.
-def search_paginas_amarillas_farmacias(zona_o_cp: str) -> list[dict]:
-    query = quote_plus(f"farmacia {zona_o_cp}")
-    url = f"https://www.paginasamarillas.es/search/farmacia/all-ma/{query}/all-is/all-ci/all-ba/all-pu/all-nc/1"
-    headers = {"User-Agent": USER_AGENT}
 
+def _fetch_page(zona_o_cp: str, page: int) -> str | None:
+    url = PAGINAS_AMARILLAS_URL.format(query=quote_plus(f"farmacia {zona_o_cp}"), page=page)
     try:
-        resp = requests.get(url, headers=headers, timeout=REQUEST_TIMEOUT)
+        resp = http_client.get(url)
         resp.raise_for_status()
+        return resp.text
     except Exception:
-        return []
+        return None
 
-    soup = BeautifulSoup(resp.text, "html.parser")
+
+# Basado en la estructura publica de resultados de paginasamarillas.es
+# Puede requerir ajustes si el HTML cambia.
+def _parse_page(html: str, zona_o_cp: str) -> list[dict]:
+    # Solo interesan las tarjetas de resultado: no se construye el arbol del resto del documento.
+    soup = BeautifulSoup(html, HTML_PARSER, parse_only=SoupStrainer("article"))
     cards = soup.select("article")
 
     leads = []
@@ -52,3 +62,63 @@ def search_paginas_amarillas_farmacias(zona_o_cp: str) -> list[dict]:
 
     return leads
 
+
+
+def _load_page(zona_o_cp: str, page: int) -> list[dict] | None:
+    # Se cachean los leads ya extraidos, no el HTML completo de la pagina.
+    def _fetch() -> list[dict] | None:
+        html = _fetch_page(zona_o_cp, page)
+        if html is None:
+            return None
+        return _parse_page(html, zona_o_cp)
+
+    return response_cache.cached_call(
+        "paginas_amarillas",
+        (normalize_query(zona_o_cp), page),
+        _fetch,
+        CACHE_TTL_PAGINAS_AMARILLAS,
+    )
+
+
+def iter_paginas_amarillas_farmacias(
+    zona_o_cp: str, max_pages: int = PA_MAX_PAGES, max_items: int | None = None
+) -> Iterator[dict]:
+    prefetcher = ThreadPoolExecutor(max_workers=1, thread_name_prefix="paginas-amarillas")
+    seen: set[tuple[str, str]] = set()
+    yielded = 0
+    try:
+        page = 1
+        pending = prefetcher.submit(_load_page, zona_o_cp, page)
+        while pending is not None:
+            leads = pending.result()
+            if not leads:
+                break
+            pending = None
+            has_next = page < max_pages
+            # Mientras se consumen los leads de esta pagina ya se esta descargando la siguiente,
+            # salvo que esta pagina pueda cubrir lo que queda de max_items.
+            if has_next and (max_items is None or yielded + len(leads) < max_items):
+                pending = prefetcher.submit(_load_page, zona_o_cp, page + 1)
+
+            new_leads = 0
+            for lead in leads:
+                key = (lead["nombre"], lead["direccion"])
+                if key in seen:
+                    continue
+                seen.add(key)
+                new_leads += 1
+                yielded += 1
+                yield lead
+            # Pasada la ultima pagina el sitio repite resultados en vez de devolver vacio.
+            if not new_leads:
+                break
+            if pending is None and has_next:
+                # Sin prefetch pero el consumidor sigue pidiendo: la pagina se baja ahora.
+                pending = prefetcher.submit(_load_page, zona_o_cp, page + 1)
+            page += 1
+    finally:
+        prefetcher.shutdown(wait=False, cancel_futures=True)
+
+
+def search_paginas_amarillas_farmacias(zona_o_cp: str, max_items: int | None = None) -> list[dict]:
+    return list(islice(iter_paginas_amarillas_farmacias(zona_o_cp, max_items=max_items), max_items))
@@ -0,0 +1,324 @@
+import re
+import unicodedata
+from urllib.parse import urlparse
+
+from sqlalchemy import case, delete, func, or_, select, update
+
+from src.core.db import get_session
+from src.core.models import CampaignTask, EmailLog, Lead
+from src.services.geo import encode_geohash, haversine_km, valid_coordinates
+from src.services.lead_queries import geohash_in_cell
+
+LEAD_FILL_FIELDS = ("website", "telefono", "email", "codigo_postal")
+GEO_FIELDS = ("lat", "lon", "geohash")
+# Celda de bloqueo (~150 m) y distancias que confirman o descartan que dos resultados son la misma farmacia.
+GEO_BLOCK_PRECISION = 7
+GEO_AREA_PRECISION = 5
+SAME_PLACE_KM = 0.05
+DIFFERENT_PLACE_KM = 1.0
+STATUS_PRIORITY = {"enviado": 2, "error": 1}
+
+NAME_STOPWORDS = {
+    "farmacia", "farmacias", "farmaceutica", "farmaceutico", "ldo", "lda", "licenciado", "licenciada",
+    "de", "del", "la", "el", "los", "las", "y", "sl", "slu", "cb", "sa",
+}
+ADDRESS_ABBREVIATIONS = {
+    "c": "calle", "cl": "calle", "cll": "calle", "calle": "calle",
+    "av": "avenida", "avd": "avenida", "avda": "avenida", "avenida": "avenida",
+    "pza": "plaza", "pl": "plaza", "plz": "plaza", "plaza": "plaza",
+    "p": "paseo", "ps": "paseo", "pso": "paseo", "paseo": "paseo",
+    "ctra": "carretera", "crta": "carretera", "carretera": "carretera",
+    "trav": "travesia", "tr": "travesia", "ronda": "ronda", "rda": "ronda",
+    "cno": "camino", "cmno": "camino", "urb": "urbanizacion", "bo": "barrio",
+}
+ADDRESS_NOISE = {"n", "no", "num", "numero", "local", "bajo", "esq", "de", "del", "la", "el", "s"}
+# Dominios que no identifican a una farmacia concreta.
+GENERIC_DOMAINS = {
+    "facebook.com", "instagram.com", "google.com", "goo.gl", "business.site", "linktr.ee",
+    "wa.me", "twitter.com", "x.com", "paginasamarillas.es", "wixsite.com", "blogspot.com",
+}
+POSTCODE_REGEX = re.compile(r"\b(0[1-9]|[1-4]\d|5[0-2])\d{3}\b")
+
+
+def strip_accents(value: str) -> str:
+    text = unicodedata.normalize("NFKD", value or "")
+    return "".join(ch for ch in text if not unicodedata.combining(ch))
+
+
+def _tokens(value: str) -> list[str]:
+    # NFKD convierte "º" en "o", asi que "nº" y "bº" llegan como "no" y "bo".
+    return re.sub(r"[^a-z0-9]+", " ", strip_accents(value).lower()).split()
+
+
+def normalize_name(value: str) -> str:
+    return " ".join(t for t in _tokens(value) if t not in NAME_STOPWORDS)
+
+
+def normalize_address(value: str) -> str:
+    tokens = []
+    for token in _tokens((value or "").replace("/", " ")):
+        token = ADDRESS_ABBREVIATIONS.get(token, token)
+        if token in ADDRESS_NOISE or POSTCODE_REGEX.fullmatch(token):
+            continue
+        tokens.append(token)
+    return " ".join(tokens)
+
+
+def extract_postcode(*values: str) -> str:
+    for value in values:
+        match = POSTCODE_REGEX.search(value or "")
+        if match:
+            return match.group(0)
+    return ""
+
+
+def normalize_phone(value: str) -> str:
+    digits = re.sub(r"\D", "", value or "")
+    if digits.startswith("0034"):
+        digits = digits[4:]
+    elif digits.startswith("34") and len(digits) == 11:
+        digits = digits[2:]
+    return digits if len(digits) >= 6 else ""
+
+
+def website_domain(value: str) -> str:
+    if not value:
+        return ""
+    url = value if value.startswith(("http://", "https://")) else f"https://{value}"
+    host = (urlparse(url).hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if not host or any(host == d or host.endswith(f".{d}") for d in GENERIC_DOMAINS):
+        return ""
+    return host
+
+
+def house_number(address: str) -> str:
+    # Primer numero de la direccion ya normalizada (sin CP): "calle mayor 12 2o" -> "12".
+    for token in address.split():
+        if token.isdigit():
+            return token.lstrip("0") or "0"
+    return ""
+
+
+def _trigrams(value: str) -> frozenset[str]:
+    if not value:
+        return frozenset()
+    padded = f"  {value} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+def similarity(a: frozenset[str], b: frozenset[str]) -> float:
+    # Maximo entre Jaccard y contencion: "lopez" frente a "lopez garcia" debe puntuar alto.
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return max(shared / len(a | b), shared / min(len(a), len(b)))
+
+
+def lead_signature(lead: dict) -> dict:
+    name = normalize_name(lead.get("nombre", ""))
+    address = normalize_address(lead.get("direccion", ""))
+    lat, lon = lead.get("lat"), lead.get("lon")
+    point = (lat, lon) if valid_coordinates(lat, lon) else None
+    return {
+        "point": point,
+        "cell": encode_geohash(lat, lon, GEO_BLOCK_PRECISION) if point else "",
+        "name": name,
+        "name_grams": _trigrams(name),
+        "address_grams": _trigrams(address),
+        "number": house_number(address),
+        "postcode": extract_postcode(lead.get("codigo_postal", ""), lead.get("direccion", "")),
+        "phone": normalize_phone(lead.get("telefono", "")),
+        "domain": website_domain(lead.get("website", "")),
+    }
+
+
+def _blocking_keys(sig: dict) -> list[str]:
+    keys = []
+    if sig["phone"]:
+        keys.append(f"tel:{sig['phone']}")
+    if sig["domain"]:
+        keys.append(f"dom:{sig['domain']}")
+    if sig["cell"]:
+        keys.append(f"geo:{sig['cell']}")
+    if sig["postcode"]:
+        keys.append(f"cp:{sig['postcode']}")
+    elif sig["name"]:
+        keys.append(f"nm:{sig['name'].split()[0]}")
+    return keys
+
+
+def match_score(a: dict, b: dict) -> float:
+    # Un nombre que solo tenia stopwords ("Farmacia") no identifica nada: sin nombre no hay fusion.
+    if not a["name"] or not b["name"]:
+        return 0.0
+    name_sim = similarity(a["name_grams"], b["name_grams"])
+    both_addresses = bool(a["address_grams"] and b["address_grams"])
+    address_sim = similarity(a["address_grams"], b["address_grams"]) if both_addresses else 0.0
+    address_ok = address_sim >= 0.5 or not both_addresses
+    distance = haversine_km(*a["point"], *b["point"]) if a["point"] and b["point"] else None
+
+    if a["phone"] and a["phone"] == b["phone"] and name_sim >= 0.35:
+        return 0.9 + name_sim / 10
+    # Mismo nombre en la misma calle con otro numero son dos locales (Calle Mayor 1 / Calle Mayor 40).
+    if a["number"] and b["number"] and a["number"] != b["number"]:
+        return 0.0
+    # Coordenadas de fuentes distintas para el mismo local caen a pocos metros; a mas de
+    # un kilometro son otra farmacia aunque nombre y web coincidan (cadenas, franquicias).
+    if distance is not None and distance > DIFFERENT_PLACE_KM:
+        return 0.0
+    if distance is not None and distance <= SAME_PLACE_KM and name_sim >= 0.5:
+        return 0.85 + name_sim / 10
+    # Las cadenas comparten dominio: ademas del dominio hace falta que cuadre la direccion.
+    if a["domain"] and a["domain"] == b["domain"] and name_sim >= 0.6 and address_sim >= 0.5:
+        return 0.8 + name_sim / 10
+    # Con coordenadas en los dos, nombre y CP solos no bastan si estan a mas de SAME_PLACE_KM.
+    if distance is not None and distance > SAME_PLACE_KM:
+        return 0.0
+    same_area = bool(a["postcode"] and a["postcode"] == b["postcode"])
+    if (same_area or not (a["postcode"] and b["postcode"])) and name_sim >= 0.75 and address_ok:
+        return 0.6 + name_sim / 10 + address_sim / 10
+    return 0.0
+
+
+class DedupIndex:
+    def __init__(self) -> None:
+        self._signatures: dict[int, dict] = {}
+        self._blocks: dict[str, list[int]] = {}
+
+    def add(self, record_id: int, lead: dict) -> None:
+        sig = lead_signature(lead)
+        self._signatures[record_id] = sig
+        for key in _blocking_keys(sig):
+            self._blocks.setdefault(key, []).append(record_id)
+
+    def find(self, lead: dict) -> int | None:
+        sig = lead_signature(lead)
+        candidates = {rid for key in _blocking_keys(sig) for rid in self._blocks.get(key, ())}
+        best_id, best_score = None, 0.0
+        for rid in candidates:
+            score = match_score(sig, self._signatures[rid])
+            if score > best_score:
+                best_id, best_score = rid, score
+        return best_id
+
+
+def _fill_missing(target: dict, source: dict) -> None:
+    for field in LEAD_FILL_FIELDS:
+        if not target.get(field) and source.get(field):
+            target[field] = source[field]
+    if target.get("geohash") is None and source.get("geohash") is not None:
+        for field in GEO_FIELDS:
+            target[field] = source[field]
+
+
+def merge_batch(rows: list[dict]) -> list[dict]:
+    # Fusiona dentro del lote los resultados de distintas fuentes que son la misma farmacia.
+    index = DedupIndex()
+    merged: list[dict] = []
+    for row in rows:
+        match = index.find(row)
+        if match is not None:
+            _fill_missing(merged[match], row)
+            continue
+        index.add(len(merged), row)
+        merged.append(row)
+    return merged
+
+
+MATCH_COLUMNS = (
+    Lead.id, Lead.nombre, Lead.direccion, Lead.codigo_postal, Lead.telefono, Lead.website, Lead.email,
+    Lead.lat, Lead.lon, Lead.geohash,
+)
+
+
+def merge_into_existing(session, rows: list[dict], owner_id: str) -> list[dict]:
+    # Solo se comparan leads de la misma zona/CP (o celda geohash de ~5 km) que el lote:
+    # es donde caen los duplicados de una captura.
+    zonas = {row["zona"] for row in rows if row.get("zona")}
+    cps = {row["codigo_postal"] for row in rows if row.get("codigo_postal")}
+    cells = {row["geohash"][:GEO_AREA_PRECISION] for row in rows if row.get("geohash")}
+    if not zonas and not cps and not cells:
+        return rows
+
+    area = []
+    if zonas:
+        area.append(Lead.zona.in_(zonas))
+    if cps:
+        area.append(Lead.codigo_postal.in_(cps))
+    for cell in sorted(cells):
+        area.append(geohash_in_cell(cell))
+    existing = session.execute(select(*MATCH_COLUMNS).where(Lead.owner_id == owner_id, or_(*area))).all()
+    if not existing:
+        return rows
+
+    index = DedupIndex()
+    for row in existing:
+        index.add(row.id, row._mapping)
+
+    remaining = []
+    for row in rows:
+        lead_id = index.find(row)
+        if lead_id is None:
+            remaining.append(row)
+            continue
+        values = {
+            field: case((func.coalesce(getattr(Lead, field), "") == "", row[field]), else_=getattr(Lead, field))
+            for field in LEAD_FILL_FIELDS
+            if row.get(field)
+        }
+        if row.get("geohash"):
+            values.update(
+                {field: case((Lead.geohash.is_(None), row[field]), else_=getattr(Lead, field)) for field in GEO_FIELDS}
+            )
+        if values:
+            session.execute(update(Lead).where(Lead.id == lead_id).values(values))
+    return remaining
+
+
+def dedupe_owner_leads(owner_id: str) -> dict[str, int]:
+    with get_session() as session:
+        rows = session.execute(
+            select(*MATCH_COLUMNS, Lead.estado_envio).where(Lead.owner_id == owner_id).order_by(Lead.id)
+        ).all()
+
+        index = DedupIndex()
+        groups: dict[int, list] = {}
+        for row in rows:
+            survivor = index.find(row._mapping)
+            if survivor is None:
+                index.add(row.id, row._mapping)
+                groups[row.id] = [row]
+            else:
+                groups[survivor].append(row)
+
+        merged_ids: list[int] = []
+        duplicate_groups = 0
+        for survivor_id, members in groups.items():
+            if len(members) == 1:
+                continue
+            duplicate_groups += 1
+            values = dict(members[0]._mapping)
+            for member in members[1:]:
+                _fill_missing(values, member._mapping)
+            # Si alguna copia ya recibio el email, el lead fusionado no debe volver a salir en campanas.
+            status = max((m.estado_envio or "pendiente" for m in members), key=lambda s: STATUS_PRIORITY.get(s, 0))
+            session.execute(
+                update(Lead)
+                .where(Lead.id == survivor_id)
+                .values(**{field: values[field] for field in LEAD_FILL_FIELDS + GEO_FIELDS}, estado_envio=status)
+            )
+            duplicate_ids = [m.id for m in members[1:]]
+            session.execute(update(EmailLog).where(EmailLog.lead_id.in_(duplicate_ids)).values(lead_id=survivor_id))
+            session.execute(
+                update(CampaignTask)
+                .where(CampaignTask.lead_id.in_(duplicate_ids), CampaignTask.estado == "pendiente")
+                .values(estado="omitido", detalle=f"Lead fusionado con {survivor_id}")
+            )
+            merged_ids.extend(duplicate_ids)
+
+        for start in range(0, len(merged_ids), 500):
+            session.execute(delete(Lead).where(Lead.id.in_(merged_ids[start : start + 500])))
+
+    return {"leads": len(rows), "groups": duplicate_groups, "merged": len(merged_ids)}
@@ -0,0 +1,174 @@
+import argparse
+import gzip
+import hashlib
+import json
+import logging
+import os
+import zlib
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, func, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from src.core.config import (
+    EMAIL_LOG_ARCHIVE_DAYS,
+    EMAIL_LOG_ARCHIVE_DIR,
+    EMAIL_LOG_COMPACT_DAYS,
+    EMAIL_LOG_STORAGE,
+)
+from src.core.db import get_session
+from src.core.models import EmailLog, EmailTemplate
+from src.services.template_engine import effective_template, render_email
+
+logger = logging.getLogger("farmareach.email_logs")
+
+RETENTION_CHUNK = 500
+# Cuerpo que se muestra si la plantilla de un log compacto ya no existe.
+MISSING_TEMPLATE_BODY = "[Cuerpo no disponible: plantilla no encontrada]"
+
+
+def template_hash(template_text: str) -> str:
+    return hashlib.sha256(effective_template(template_text).encode("utf-8")).hexdigest()
+
+
+def store_template(session, template_text: str) -> str:
+    # Upsert: varias campanas con la misma plantilla comparten fila. El DO UPDATE de
+    # last_used_at bloquea la fila hasta el commit de los logs que la referencian, asi
+    # que la limpieza de archive_old_logs no puede borrarla entre medias.
+    text = effective_template(template_text)
+    key = template_hash(text)
+    dialect_insert = pg_insert if session.get_bind().dialect.name == "postgresql" else sqlite_insert
+    session.execute(
+        dialect_insert(EmailTemplate)
+        .values(hash=key, template_text=text, last_used_at=func.now())
+        .on_conflict_do_update(index_elements=["hash"], set_={"last_used_at": func.now()})
+    )
+    return key
+
+
+def compress_body(cuerpo: str) -> bytes:
+    return zlib.compress(cuerpo.encode("utf-8"), 9)
+
+
+def log_values(cuerpo: str, context: dict | None = None, template_key: str | None = None) -> dict:
+    # Columnas del cuerpo segun EMAIL_LOG_STORAGE. Sin plantilla o contexto (p. ej. un
+    # log escrito fuera de una campana) el modo "template" cae a comprimido.
+    if EMAIL_LOG_STORAGE == "template" and template_key and context is not None:
+        return {"cuerpo": "", "template_hash": template_key, "contexto": json.dumps(context, separators=(",", ":"))}
+    if EMAIL_LOG_STORAGE in ("template", "compressed"):
+        return {"cuerpo": "", "cuerpo_comprimido": compress_body(cuerpo)}
+    return {"cuerpo": cuerpo}
+
+
+def email_body(log, templates: dict[str, str], placeholder: str | None = None) -> str:
+    if log.cuerpo:
+        return log.cuerpo
+    if log.cuerpo_comprimido is not None:
+        return zlib.decompress(log.cuerpo_comprimido).decode("utf-8")
+    if log.template_hash:
+        template_text = templates.get(log.template_hash)
+        if template_text is None:
+            if placeholder is not None:
+                logger.warning("email log template missing log_id=%s hash=%s", log.id, log.template_hash)
+                return placeholder
+            raise LookupError(f"Plantilla {log.template_hash} no encontrada")
+        return render_email(template_text, json.loads(log.contexto or "{}"))
+    return ""
+
+
+def load_templates(session, logs) -> dict[str, str]:
+    keys = {log.template_hash for log in logs if not log.cuerpo and log.template_hash}
+    if not keys:
+        return {}
+    return dict(session.execute(select(EmailTemplate.hash, EmailTemplate.template_text).where(EmailTemplate.hash.in_(keys))).all())
+
+
+def compact_old_logs(older_than_days: int = EMAIL_LOG_COMPACT_DAYS) -> int:
+    # Comprime el cuerpo de los logs antiguos guardados completos (los de antes del modo
+    # compacto o los de EMAIL_LOG_STORAGE=full). Un lote por transaccion.
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    compacted = 0
+    last_id = 0
+    while True:
+        with get_session() as session:
+            rows = session.execute(
+                select(EmailLog.id, EmailLog.cuerpo)
+                .where(EmailLog.id > last_id, EmailLog.created_at < cutoff, EmailLog.cuerpo != "")
+                .order_by(EmailLog.id)
+                .limit(RETENTION_CHUNK)
+            ).all()
+            if not rows:
+                return compacted
+            session.execute(
+                update(EmailLog),
+                [{"id": log_id, "cuerpo": "", "cuerpo_comprimido": compress_body(cuerpo)} for log_id, cuerpo in rows],
+            )
+        compacted += len(rows)
+        last_id = rows[-1][0]
+
+
+def archive_old_logs(older_than_days: int = EMAIL_LOG_ARCHIVE_DAYS, directory: str = EMAIL_LOG_ARCHIVE_DIR) -> int:
+    # Vuelca los logs antiguos (con el cuerpo ya reconstruido) a un .ndjson.gz y los borra
+    # de la base. Cada lote se escribe y se sincroniza en disco antes de su DELETE.
+    if older_than_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"email_logs_{datetime.utcnow():%Y%m%dT%H%M%S}.ndjson.gz")
+    archived = 0
+    with gzip.open(path, "at", encoding="utf-8") as fh:
+        while True:
+            with get_session() as session:
+                logs = session.execute(
+                    select(EmailLog).where(EmailLog.created_at < cutoff).order_by(EmailLog.id).limit(RETENTION_CHUNK)
+                ).scalars().all()
+                if not logs:
+                    break
+                templates = load_templates(session, logs)
+                for log in logs:
+                    record = {
+                        "id": log.id,
+                        "lead_id": log.lead_id,
+                        "destinatario": log.destinatario,
+                        "asunto": log.asunto,
+                        "cuerpo": email_body(log, templates),
+                        "estado": log.estado,
+                        "detalle": log.detalle,
+                        "created_at": log.created_at.isoformat() if log.created_at else None,
+                    }
+                    fh.write(json.dumps(record, ensure_ascii=False) + "\n")
+                fh.flush()
+                os.fsync(fh.fileno())
+                session.execute(delete(EmailLog).where(EmailLog.id.in_([log.id for log in logs])))
+            archived += len(logs)
+    if not archived:
+        os.remove(path)
+        return 0
+
+    with get_session() as session:
+        # Plantillas que ya no usa ningun log y que nadie ha usado desde el corte.
+        session.execute(
+            delete(EmailTemplate).where(
+                func.coalesce(EmailTemplate.last_used_at, EmailTemplate.created_at) < cutoff,
+                ~exists().where(EmailLog.template_hash == EmailTemplate.hash),
+            )
+        )
+    logger.info("email logs archived count=%s path=%s", archived, path)
+    return archived
+
+
+if __name__ == "__main__":
+    # Tarea de retencion (cron): python -m src.services.email_log_store
+    from src.core.db import init_db
+
+    parser = argparse.ArgumentParser(description="Compacta y archiva email_logs antiguos.")
+    parser.add_argument("--compact-days", type=int, default=EMAIL_LOG_COMPACT_DAYS)
+    parser.add_argument("--archive-days", type=int, default=EMAIL_LOG_ARCHIVE_DAYS)
+    parser.add_argument("--archive-dir", default=EMAIL_LOG_ARCHIVE_DIR)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    init_db()
+    print(f"comprimidos: {compact_old_logs(args.compact_days)}")
+    print(f"archivados: {archive_old_logs(args.archive_days, args.archive_dir)}")
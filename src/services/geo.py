@@ -0,0 +1,99 @@
+import math
+
+# Geohash: celdas rectangulares cuyo prefijo comun implica cercania. Una columna de texto
+# con indice (owner_id, geohash) permite buscar por radio igual en SQLite que en Postgres.
+GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+GEOHASH_PRECISION = 9  # ~5 m
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE_LAT = 111.32
+MAX_COVER_CELLS = 16
+
+
+def valid_coordinates(lat, lon) -> bool:
+    return (
+        isinstance(lat, (int, float))
+        and isinstance(lon, (int, float))
+        and -90 <= lat <= 90
+        and -180 <= lon <= 180
+        and not (lat == 0 and lon == 0)
+    )
+
+
+def encode_geohash(lat: float, lon: float, precision: int = GEOHASH_PRECISION) -> str:
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return "".join(chars)
+
+
+def prefix_upper_bound(cell: str) -> str | None:
+    # Siguiente celda del mismo nivel (con acarreo): [celda, siguiente) abarca toda la celda.
+    # Solo letras minusculas y digitos, que ordenan igual en "C" que en en_US/ICU; un
+    # centinela como "~" queda antes de las letras con esas collations y el rango sale vacio.
+    # None = sin cota superior ("zz..." es la ultima celda).
+    cell = cell.rstrip(GEOHASH_ALPHABET[-1])
+    if not cell:
+        return None
+    return cell[:-1] + GEOHASH_ALPHABET[GEOHASH_ALPHABET.index(cell[-1]) + 1]
+
+
+def cell_size_deg(precision: int) -> tuple[float, float]:
+    # Los bits se reparten alternando lon/lat empezando por lon.
+    total = 5 * precision
+    lon_bits = (total + 1) // 2
+    lat_bits = total // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def bounding_box(lat: float, lon: float, radius_km: float) -> tuple[float, float, float, float]:
+    dlat = radius_km / KM_PER_DEGREE_LAT
+    dlon = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+    return max(-90.0, lat - dlat), max(-180.0, lon - dlon), min(90.0, lat + dlat), min(180.0, lon + dlon)
+
+
+def cover_cells(lat: float, lon: float, radius_km: float) -> list[str]:
+    # Prefijos geohash que cubren el rectangulo del circulo: la precision mas fina que
+    # lo consiga con como mucho MAX_COVER_CELLS celdas (cada una, un rango en el indice).
+    south, west, north, east = bounding_box(lat, lon, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        cell_lat, cell_lon = cell_size_deg(precision)
+        rows = range(math.floor((south + 90) / cell_lat), math.floor((north + 90) / cell_lat) + 1)
+        cols = range(math.floor((west + 180) / cell_lon), math.floor((east + 180) / cell_lon) + 1)
+        if len(rows) * len(cols) > MAX_COVER_CELLS and precision > 1:
+            continue
+        return sorted(
+            {
+                encode_geohash(
+                    min(89.999999, (r + 0.5) * cell_lat - 90), min(179.999999, (c + 0.5) * cell_lon - 180), precision
+                )
+                for r in rows
+                for c in cols
+            }
+        )
+    return [""]
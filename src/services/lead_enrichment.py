@@ -1,12 +1,108 @@
+import html
+import logging
 import re
-from urllib.parse import urljoin, urlparse
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Iterable, Iterator
+from urllib.parse import unquote, urldefrag, urljoin, urlparse
 
 import requests
-from bs4 import BeautifulSoup
 
-from src.core.config import REQUEST_TIMEOUT, USER_AGENT
+from src.core.config import (
+    CACHE_ENABLED,
+    CACHE_TTL_ENRICH_EMPTY,
+    CACHE_TTL_ENRICH_ERROR,
+    CACHE_TTL_ENRICH_FOUND,
+    ENRICH_MAX_PAGE_BYTES,
+    ENRICH_MAX_PAGES_PER_SITE,
+    ENRICH_MAX_WORKERS,
+    ENRICH_PER_HOST_LIMIT,
+)
+from src.core.http_client import http_client
+from src.services.response_cache import cache_key, response_cache
+
+logger = logging.getLogger("farmareach.enrichment")
 
 EMAIL_REGEX = re.compile(r"[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}")
+# Enlaces <a href> sin construir el DOM; (?<![\w-]) descarta atributos como data-href.
+HREF_REGEX = re.compile(r"""<a\s[^>]*?(?<![\w-])href\s*=\s*(?:"([^"]*)"|'([^']*)'|([^\s>"']+))""", re.IGNORECASE)
+CFEMAIL_REGEX = re.compile(r"""data-cfemail\s*=\s*["']?([0-9a-fA-F]+)|/cdn-cgi/l/email-protection#([0-9a-fA-F]+)""")
+AT_MARKER_REGEX = re.compile(r"[\[\(\{]\s*(?:at|arroba)\s*[\]\)\}]", re.IGNORECASE)
+OBFUSCATED_REGEX = re.compile(
+    r"([a-z0-9._%+-]+)\s*[\[\(\{]\s*(?:at|arroba)\s*[\]\)\}]\s*"
+    r"([a-z0-9-]+(?:(?:\s*[\[\(\{]\s*(?:dot|punto)\s*[\]\)\}]\s*|\.)[a-z0-9-]+)+)",
+    re.IGNORECASE,
+)
+DOT_MARKER_REGEX = re.compile(r"\s*[\[\(\{]\s*(?:dot|punto)\s*[\]\)\}]\s*", re.IGNORECASE)
+ASSET_SUFFIXES = (".png", ".jpg", ".jpeg", ".gif", ".svg", ".webp")
+CONTACT_KEYWORDS = ("contact", "contacto", "legal", "aviso", "about")
+# Resultado del rastreo de un dominio -> cuanto tiempo vale en cache.
+OUTCOME_TTLS = {"found": CACHE_TTL_ENRICH_FOUND, "empty": CACHE_TTL_ENRICH_EMPTY, "error": CACHE_TTL_ENRICH_ERROR}
+
+# host -> [semaforo, peticiones que lo usan o esperan]. La entrada se borra al quedar sin
+# uso: en un servidor que rastrea miles de webs el dict no crece sin limite.
+_host_slots: dict[str, list] = {}
+_host_slots_lock = threading.Lock()
+# Un solo pool para todo el proceso: ENRICH_MAX_WORKERS es el tope global de rastreos a la
+# vez aunque lleguen varias peticiones de /leads/enrich-emails simultaneas.
+_crawl_executor = ThreadPoolExecutor(max_workers=ENRICH_MAX_WORKERS, thread_name_prefix="enrich")
+
+
+@contextmanager
+def _host_slot(host: str):
+    # Cortesia con cada web: como mucho ENRICH_PER_HOST_LIMIT peticiones simultaneas por host.
+    with _host_slots_lock:
+        entry = _host_slots.get(host)
+        if entry is None:
+            entry = _host_slots[host] = [threading.BoundedSemaphore(ENRICH_PER_HOST_LIMIT), 0]
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _host_slots_lock:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del _host_slots[host]
+
+
+def _read_capped(resp: requests.Response) -> str:
+    # Se corta en ENRICH_MAX_PAGE_BYTES: el email suele estar en cabecera o pie y asi
+    # una web enorme (o un binario mal etiquetado) no bloquea al worker.
+    chunks = []
+    size = 0
+    for chunk in resp.iter_content(64 * 1024):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= ENRICH_MAX_PAGE_BYTES:
+            break
+    raw = b"".join(chunks)[:ENRICH_MAX_PAGE_BYTES]
+    content_type = resp.headers.get("Content-Type", "").lower()
+    encoding = resp.encoding if "charset" in content_type and resp.encoding else "utf-8"
+    try:
+        return raw.decode(encoding, errors="replace")
+    except LookupError:
+        return raw.decode("utf-8", errors="replace")
+
+
+def _fetch(url: str) -> tuple[str, str] | None:
+    # Devuelve (url final, html) o None si la pagina no se pudo leer.
+    with _host_slot(urlparse(url).netloc):
+        try:
+            resp = http_client.get(url, stream=True, metric_label="enrichment")
+        except requests.RequestException:
+            return None
+        try:
+            content_type = resp.headers.get("Content-Type", "").lower()
+            if not resp.ok or (content_type and "html" not in content_type and "text" not in content_type):
+                return None
+            return resp.url, _read_capped(resp)
+        except requests.RequestException:
+            return None
+        finally:
+            resp.close()
 
 
 def _normalize_url(url: str) -> str:
@@ -17,55 +113,172 @@ def _normalize_url(url: str) -> str:
     return url
 
 
+def _site_domain(url: str) -> str:
+    host = (urlparse(_normalize_url(url)).hostname or "").lower()
+    return host[4:] if host.startswith("www.") else host
+
+
 def _valid_email(email: str) -> bool:
     lowered = email.lower()
     blocked = {"example.com", "test.com"}
     domain = lowered.split("@")[-1] if "@" in lowered else ""
-    return bool(email and domain and domain not in blocked)
+    # "logo@2x.png" y similares son nombres de imagen retina, no emails.
+    return bool(email and domain and domain not in blocked and not lowered.endswith(ASSET_SUFFIXES))
 
 
-def find_email_from_website(website_url: str) -> str:
-    if not website_url:
+def _decode_cfemail(encoded: str) -> str:
+    # Cloudflare Email Obfuscation: el primer byte es la clave XOR del resto.
+    try:
+        data = bytes.fromhex(encoded)
+    except ValueError:
         return ""
+    if len(data) < 2:
+        return ""
+    return bytes(b ^ data[0] for b in data[1:]).decode("utf-8", errors="replace")
 
-    base_url = _normalize_url(website_url)
-    headers = {"User-Agent": USER_AGENT}
 
-    try:
-        resp = requests.get(base_url, headers=headers, timeout=REQUEST_TIMEOUT)
-        resp.raise_for_status()
-    except Exception:
-        return ""
+def _scan_emails(text: str) -> set[str]:
+    # La regex solo se aplica alrededor de cada "@": sobre bloques largos sin arroba
+    # (base64, JSON embebido) un findall sobre toda la pagina es cuadratico.
+    found = set()
+    pos = text.find("@")
+    while pos != -1:
+        for match in EMAIL_REGEX.finditer(text, max(0, pos - 64), pos + 256):
+            # Solo el email de esta arroba; el resto de la ventana puede estar cortado.
+            if match.start() <= pos < match.end():
+                found.add(match.group(0))
+                break
+        pos = text.find("@", pos + 1)
+    return found
 
-    soup = BeautifulSoup(resp.text, "html.parser")
-    candidates = set(EMAIL_REGEX.findall(resp.text))
 
-    contact_keywords = ("contact", "contacto", "legal", "aviso", "about")
-    base_domain = urlparse(base_url).netloc
+def _scan_obfuscated(text: str) -> set[str]:
+    found = set()
+    for marker in AT_MARKER_REGEX.finditer(text):
+        window = text[max(0, marker.start() - 64) : marker.end() + 256]
+        for local, domain in OBFUSCATED_REGEX.findall(window):
+            found.add(f"{local}@{DOT_MARKER_REGEX.sub('.', domain)}")
+    return found
 
-    for a in soup.select("a[href]"):
-        href = a.get("href", "")
-        if href.startswith("mailto:"):
-            candidates.add(href.replace("mailto:", "").strip())
-            continue
 
-        if not any(k in href.lower() for k in contact_keywords):
-            continue
+def extract_page(page_html: str) -> tuple[set[str], list[str]]:
+    # Emails (texto, mailto:, entidades HTML, [at]/[dot], Cloudflare) y enlaces de la pagina.
+    emails: set[str] = set()
+    links: list[str] = []
+    for match in HREF_REGEX.finditer(page_html):
+        href = html.unescape(next(g for g in match.groups() if g is not None)).strip()
+        if href[:7].lower() == "mailto:":
+            address = unquote(href[7:].split("?", 1)[0])
+            emails.update(a.strip() for a in address.split(",") if "@" in a)
+        else:
+            links.append(href)
+
+    for hex_value, fragment_value in CFEMAIL_REGEX.findall(page_html):
+        decoded = _decode_cfemail(hex_value or fragment_value)
+        if EMAIL_REGEX.fullmatch(decoded):
+            emails.add(decoded)
+
+    text = html.unescape(page_html)
+    emails.update(_scan_emails(text))
+    emails.update(_scan_obfuscated(text))
+    return emails, links
 
-        candidate_url = urljoin(base_url, href)
-        if urlparse(candidate_url).netloc != base_domain:
+
+def _crawl_site(website_url: str, max_pages: int) -> tuple[str, str]:
+    base_url = _normalize_url(website_url)
+    page = _fetch(base_url)
+    if page is None:
+        return "error", ""
+
+    final_url, page_html = page
+    candidates, links = extract_page(page_html)
+
+    base_domain = urlparse(base_url).netloc
+    visited = {urldefrag(base_url).url, urldefrag(final_url).url}
+    pages_left = max_pages - 1
+
+    for href in links:
+        if pages_left <= 0:
+            break
+        if not any(k in href.lower() for k in CONTACT_KEYWORDS):
             continue
 
-        try:
-            page = requests.get(candidate_url, headers=headers, timeout=REQUEST_TIMEOUT)
-            if page.ok:
-                candidates.update(EMAIL_REGEX.findall(page.text))
-        except Exception:
+        candidate_url = urldefrag(urljoin(base_url, href)).url
+        if urlparse(candidate_url).netloc != base_domain or candidate_url in visited:
             continue
+        visited.add(candidate_url)
+        pages_left -= 1
+
+        page = _fetch(candidate_url)
+        if page is not None:
+            candidates.update(extract_page(page[1])[0])
 
     valid = [e for e in candidates if _valid_email(e)]
     if not valid:
-        return ""
+        return "empty", ""
 
     valid.sort(key=lambda e: ("info@" not in e.lower(), len(e)))
-    return valid[0]
+    return "found", valid[0]
+
+
+def find_email_from_website(website_url: str, max_pages: int = ENRICH_MAX_PAGES_PER_SITE) -> str:
+    if not website_url:
+        return ""
+    return _crawl_site(website_url, max_pages)[1]
+
+
+def _cached_domain_email(domain: str) -> str | None:
+    # Solo cuentan las entradas frescas: un dominio caducado se vuelve a rastrear en esta pasada.
+    if not CACHE_ENABLED:
+        return None
+    try:
+        cached = response_cache.get("enrich", cache_key(domain))
+    except sqlite3.Error:
+        logger.exception("enrich cache read failed domain=%s", domain)
+        return None
+    if cached is None or not cached[1]:
+        return None
+    return cached[0]["email"]
+
+
+def _crawl_domain(domain: str, website_url: str) -> str:
+    outcome, email = _crawl_site(website_url, ENRICH_MAX_PAGES_PER_SITE)
+    if CACHE_ENABLED:
+        try:
+            response_cache.set("enrich", cache_key(domain), {"outcome": outcome, "email": email}, OUTCOME_TTLS[outcome])
+        except sqlite3.Error:
+            logger.exception("enrich cache write failed domain=%s", domain)
+    return email
+
+
+def enrich_websites(websites: Iterable[str]) -> Iterator[tuple[str, str]]:
+    # Cada dominio se rastrea una sola vez aunque lo compartan varios leads (cadenas con
+    # una web por sucursal) y solo si no hay un resultado vigente en cache, incluido
+    # "sin email" o "error". Los resultados salen segun terminan para guardarlos por lotes.
+    by_domain: dict[str, list[str]] = {}
+    for website in dict.fromkeys(websites):
+        domain = _site_domain(website) if website else ""
+        if domain:
+            by_domain.setdefault(domain, []).append(website)
+
+    pending = {}
+    for domain, group in by_domain.items():
+        email = _cached_domain_email(domain)
+        if email is None:
+            pending[domain] = group
+            continue
+        for website in group:
+            yield website, email
+    if not pending:
+        return
+
+    futures = {_crawl_executor.submit(_crawl_domain, domain, group[0]): domain for domain, group in pending.items()}
+    try:
+        for future in as_completed(futures):
+            email = future.result()
+            for website in pending[futures[future]]:
+                yield website, email
+    finally:
+        # Si la peticion se corta a medias, los dominios aun en cola no se rastrean.
+        for future in futures:
+            future.cancel()
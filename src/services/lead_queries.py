@@ -0,0 +1,83 @@
+from sqlalchemy import and_, lambda_stmt, literal_column, or_, select
+
+from src.core.models import Lead
+from src.services.geo import bounding_box, cover_cells, prefix_upper_bound
+
+# Solo las columnas que necesita LeadResponse: evita cargar notas y el identity map del ORM.
+LEAD_RESPONSE_COLUMNS = (
+    Lead.id,
+    Lead.nombre,
+    Lead.direccion,
+    Lead.zona,
+    Lead.codigo_postal,
+    Lead.telefono,
+    Lead.website,
+    Lead.email,
+    Lead.fuente,
+    Lead.estado_envio,
+    Lead.lat,
+    Lead.lon,
+)
+
+# Literal y no parametro: el planner solo usa el indice parcial ix_leads_owner_con_email
+# si ve la misma condicion "email <> ''" que su WHERE.
+HAS_EMAIL = Lead.email != literal_column("''")
+
+
+def filter_leads(owner_id: str, only_pending: bool, require_email: bool, fuente: str):
+    # lambda_stmt: SQLAlchemy cachea construccion y compilacion por combinacion de filtros;
+    # owner_id, fuente y el cursor viajan como parametros.
+    query = lambda_stmt(lambda: select(*LEAD_RESPONSE_COLUMNS).where(Lead.owner_id == owner_id))
+    if only_pending:
+        query += lambda q: q.where(Lead.estado_envio == "pendiente")
+    if require_email:
+        query += lambda q: q.where(HAS_EMAIL)
+    if fuente:
+        query += lambda q: q.where(Lead.fuente == fuente)
+    return query
+
+
+def lead_page_query(
+    owner_id: str, only_pending: bool, require_email: bool, fuente: str, after_id: int | None, skip: int, limit: int
+):
+    query = filter_leads(owner_id, only_pending, require_email, fuente)
+    if after_id is not None:
+        # Paginacion por cursor: el orden es id desc, asi que la pagina siguiente son ids menores.
+        query += lambda q: q.where(Lead.id < after_id)
+    elif skip:
+        query += lambda q: q.offset(skip)
+    return query + (lambda q: q.order_by(Lead.id.desc()).limit(limit))
+
+
+def geohash_in_cell(cell: str):
+    # Rango del indice (owner_id, geohash) en vez de LIKE 'celda%': vale con cualquier collation.
+    upper = prefix_upper_bound(cell)
+    if upper is None:
+        return Lead.geohash >= cell
+    return and_(Lead.geohash >= cell, Lead.geohash < upper)
+
+
+def nearby_leads_query(owner_id: str, lat: float, lon: float, radius_km: float):
+    # Un rango [celda, celda siguiente) del indice (owner_id, geohash) por cada celda que cubre el
+    # circulo; owner_id va dentro de cada rama para que SQLite y Postgres las resuelvan como
+    # busquedas independientes (MULTI-INDEX OR / BitmapOr). La distancia exacta se filtra despues.
+    south, west, north, east = bounding_box(lat, lon, radius_km)
+    cells = [
+        and_(Lead.owner_id == owner_id, geohash_in_cell(cell))
+        for cell in cover_cells(lat, lon, radius_km)
+    ]
+    return select(*LEAD_RESPONSE_COLUMNS).where(
+        or_(*cells),
+        Lead.lat.between(south, north),
+        Lead.lon.between(west, east),
+    )
+
+
+def existing_leads_query(owner_id: str, names: list[str]):
+    return lambda_stmt(lambda: select(Lead).where(Lead.owner_id == owner_id, Lead.nombre.in_(names)))
+
+
+def enrich_candidates_query(owner_id: str):
+    return lambda_stmt(
+        lambda: select(Lead.id, Lead.website).where(Lead.owner_id == owner_id, Lead.email == "", Lead.website != "")
+    )
@@ -0,0 +1,107 @@
+import re
+
+from sqlalchemy import column, func, literal_column, or_, select, table, text
+
+from src.core.models import Lead
+from src.services.dedup import strip_accents
+from src.services.lead_queries import LEAD_RESPONSE_COLUMNS
+
+SEARCH_COLUMNS = (Lead.nombre, Lead.direccion, Lead.zona, Lead.email)
+MAX_SEARCH_TOKENS = 8
+# Coincidencias (las mas recientes) que se ordenan por relevancia; skip + limit no puede pasar de
+# aqui y con mas coincidencias /leads/search lo indica en X-Search-Truncated.
+# bm25 de FTS5 o un ORDER BY similarity recorren todas las coincidencias de cada termino
+# ("farmacia" esta en todos los leads) y a 1M de filas se van a cientos de ms.
+SEARCH_CANDIDATES = 500
+# Peso de cada columna cuando una palabra empieza por el termino buscado; dentro de una palabra, 1.
+RANK_WEIGHTS = {"nombre": 10, "zona": 4, "email": 3, "direccion": 2}
+
+leads_fts = table("leads_fts", column("rowid"))
+FTS_TABLE = literal_column("leads_fts")
+
+_backends: dict[str, str] = {}
+
+
+def _words(value: str | None) -> list[str]:
+    value = (value or "").lower()
+    if not value.isascii():
+        value = strip_accents(value)
+    return re.sub(r"[^a-z0-9]+", " ", value).split()
+
+
+def search_tokens(q: str) -> list[str]:
+    # Misma normalizacion que unicode61/unaccent: sin tildes, minusculas, corte en lo no alfanumerico.
+    tokens = []
+    for token in _words(q):
+        if token not in tokens:
+            tokens.append(token)
+    return tokens[:MAX_SEARCH_TOKENS]
+
+
+def search_backend(session) -> str:
+    # "fts5", "trigram" o "like" si la migracion 0005 no pudo crear el indice. Se mira una vez por motor.
+    bind = session.get_bind()
+    key = bind.url.render_as_string(hide_password=True)
+    if key not in _backends:
+        if bind.dialect.name == "postgresql":
+            found = session.execute(text("SELECT 1 FROM pg_indexes WHERE indexname = 'ix_leads_search_trgm'")).first()
+            _backends[key] = "trigram" if found else "like"
+        else:
+            found = session.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'leads_fts'")).first()
+            _backends[key] = "fts5" if found else "like"
+    return _backends[key]
+
+
+def _fts_match(owner_id: str, tokens: list[str]) -> str:
+    # Cada termino como prefijo ("lop"* encuentra "Lopez"); owner acota a la cuenta con un solo token.
+    terms = " AND ".join(f'"{token}"*' for token in tokens)
+    return f'owner : "{owner_id.encode("utf-8").hex()}" AND {{nombre direccion zona email}} : ({terms})'
+
+
+def search_candidates_query(backend: str, owner_id: str, tokens: list[str]):
+    query = select(*LEAD_RESPONSE_COLUMNS)
+    if backend == "fts5":
+        # FTS5 recorre las coincidencias en orden de rowid: el LIMIT corta sin materializarlas.
+        hits = (
+            select(leads_fts.c.rowid.label("id"))
+            .where(FTS_TABLE.op("MATCH")(_fts_match(owner_id, tokens)))
+            .order_by(leads_fts.c.rowid.desc())
+            .limit(SEARCH_CANDIDATES + 1)
+            .subquery("hits")
+        )
+        return query.join(hits, hits.c.id == Lead.id).order_by(Lead.id.desc())
+    if backend == "trigram":
+        # La misma expresion que ix_leads_search_trgm para que el GIN sirva los LIKE '%...%'.
+        document = func.farmareach_search_text(*SEARCH_COLUMNS)
+        conditions = [document.like(f"%{token}%") for token in tokens]
+    else:
+        conditions = [or_(*(func.lower(col).like(f"%{token}%") for col in SEARCH_COLUMNS)) for token in tokens]
+    return query.where(Lead.owner_id == owner_id, *conditions).order_by(Lead.id.desc()).limit(SEARCH_CANDIDATES + 1)
+
+
+def rank_score(row, tokens: list[str]) -> int:
+    # " palabra palabra": " token" in texto = alguna palabra empieza por el termino.
+    texts = {key: " " + " ".join(_words(getattr(row, key))) for key in RANK_WEIGHTS}
+    score = 0
+    for token in tokens:
+        best = 0
+        for key, weight in RANK_WEIGHTS.items():
+            if weight > best and " " + token in texts[key]:
+                best = weight
+            elif not best and token in texts[key]:
+                best = 1
+        score += best
+    return score
+
+
+def search_leads(session, owner_id: str, q: str, skip: int, limit: int) -> tuple[list, bool]:
+    # (pagina, truncado): truncado = habia mas de SEARCH_CANDIDATES coincidencias y solo se ordenaron esas.
+    tokens = search_tokens(q)
+    if not tokens:
+        return [], False
+    # Se pide una fila de mas solo para saber si hay mas coincidencias de las que se ordenan.
+    rows = session.execute(search_candidates_query(search_backend(session), owner_id, tokens)).all()
+    truncated = len(rows) > SEARCH_CANDIDATES
+    rows = rows[:SEARCH_CANDIDATES]
+    rows.sort(key=lambda row: (rank_score(row, tokens), row.id), reverse=True)
+    return rows[skip : skip + limit], truncated
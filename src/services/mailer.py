@@ -1,23 +1,166 @@
 import smtplib
+import threading
+import time
 from email.mime.text import MIMEText
 from email.utils import formataddr
 
-from src.core.config import GMAIL_ADDRESS, GMAIL_APP_PASSWORD
+from src.core.config import (
+    GMAIL_ADDRESS,
+    GMAIL_APP_PASSWORD,
+    MAIL_IDLE_CHECK_SECONDS,
+    MAIL_MAX_PER_CONNECTION,
+    MAIL_RATE_PER_MINUTE,
+    REQUEST_TIMEOUT,
+    SMTP_HOST,
+    SMTP_PORT,
+    SMTP_SECURITY,
+)
+from src.core.metrics import smtp_send_duration
 
+NOT_CONFIGURED = "Configura GMAIL_ADDRESS y GMAIL_APP_PASSWORD"
 
-def send_gmail(destinatario: str, asunto: str, cuerpo: str, remitente_nombre: str = "") -> tuple[bool, str]:
-    if not GMAIL_ADDRESS or not GMAIL_APP_PASSWORD:
-        return False, "Configura GMAIL_ADDRESS y GMAIL_APP_PASSWORD"
 
+class RateLimiter:
+    def __init__(self, per_minute: int) -> None:
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot)
+            self._next_slot = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+# El limite es de la cuenta de Gmail, asi que se comparte entre todas las sesiones del proceso.
+account_rate_limiter = RateLimiter(MAIL_RATE_PER_MINUTE)
+
+
+def _build_message(destinatario: str, asunto: str, cuerpo: str, remitente_nombre: str) -> MIMEText:
     msg = MIMEText(cuerpo, "plain", "utf-8")
     msg["Subject"] = asunto
     msg["From"] = formataddr((remitente_nombre, GMAIL_ADDRESS)) if remitente_nombre else GMAIL_ADDRESS
     msg["To"] = destinatario
+    return msg
+
+
+class MailerSession:
+    def __init__(
+        self,
+        rate_limiter: RateLimiter = account_rate_limiter,
+        max_per_connection: int = MAIL_MAX_PER_CONNECTION,
+    ) -> None:
+        self.rate_limiter = rate_limiter
+        self.max_per_connection = max_per_connection
+        self._server: smtplib.SMTP | None = None
+        self._sent_on_connection = 0
+        self._last_used = 0.0
+        self._data_started = False
+
+    def __enter__(self) -> "MailerSession":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
 
-    try:
-        with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
+    def _connect(self) -> smtplib.SMTP:
+        if SMTP_SECURITY == "ssl":
+            server = smtplib.SMTP_SSL(SMTP_HOST, SMTP_PORT, timeout=REQUEST_TIMEOUT)
+        else:
+            server = smtplib.SMTP(SMTP_HOST, SMTP_PORT, timeout=REQUEST_TIMEOUT)
+        try:
+            if SMTP_SECURITY == "starttls":
+                server.starttls()
             server.login(GMAIL_ADDRESS, GMAIL_APP_PASSWORD)
-            server.sendmail(GMAIL_ADDRESS, [destinatario], msg.as_string())
+        except Exception:
+            server.close()
+            raise
+        self._sent_on_connection = 0
+        return server
+
+    def _ensure_connection(self) -> smtplib.SMTP:
+        if self._server is not None and time.monotonic() - self._last_used > MAIL_IDLE_CHECK_SECONDS:
+            # Gmail corta conexiones ociosas; NOOP detecta la caida antes de empezar un envio.
+            try:
+                self._server.noop()
+            except (smtplib.SMTPException, OSError):
+                self.close()
+        if self._server is None:
+            self._server = self._connect()
+        return self._server
+
+    def _drop_connection(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+    def _transmit(self, server: smtplib.SMTP, destinatario: str, message: str) -> None:
+        # sendmail() por pasos para saber si el servidor llego a recibir el DATA.
+        server.ehlo_or_helo_if_needed()
+        code, resp = server.mail(GMAIL_ADDRESS)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPSenderRefused(code, resp, GMAIL_ADDRESS)
+        code, resp = server.rcpt(destinatario)
+        if code not in (250, 251):
+            server.rset()
+            raise smtplib.SMTPRecipientsRefused({destinatario: (code, resp)})
+        self._data_started = True
+        code, resp = server.data(message)
+        if code != 250:
+            server.rset()
+            raise smtplib.SMTPDataError(code, resp)
+
+    def close(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except (smtplib.SMTPException, OSError):
+            self._server.close()
+        self._server = None
+
+    def send(self, destinatario: str, asunto: str, cuerpo: str, remitente_nombre: str = "") -> tuple[bool, str]:
+        if not GMAIL_ADDRESS or not GMAIL_APP_PASSWORD:
+            return False, NOT_CONFIGURED
+
+        msg = _build_message(destinatario, asunto, cuerpo, remitente_nombre)
+        self.rate_limiter.wait()
+        # La espera del rate limiter queda fuera: se mide solo el trabajo contra el servidor.
+        started = time.monotonic()
+        message = msg.as_string()
+        try:
+            for attempt in range(2):
+                self._data_started = False
+                try:
+                    self._transmit(self._ensure_connection(), destinatario, message)
+                    break
+                except OSError as ex:
+                    # SMTPException hereda de OSError: un rechazo del servidor no es un corte.
+                    if isinstance(ex, smtplib.SMTPException) and not isinstance(ex, smtplib.SMTPServerDisconnected):
+                        raise
+                    self._drop_connection()
+                    # Solo se reintenta (una vez, con conexion nueva) si el corte llego antes
+                    # del DATA: despues el mensaje pudo quedar aceptado y se enviaria dos veces.
+                    if attempt or self._data_started:
+                        raise
+        except Exception as ex:
+            smtp_send_duration.observe(time.monotonic() - started, outcome="error")
+            return False, str(ex)
+
+        self._last_used = time.monotonic()
+        smtp_send_duration.observe(self._last_used - started, outcome="ok")
+        self._sent_on_connection += 1
+        if self.max_per_connection and self._sent_on_connection >= self.max_per_connection:
+            self.close()
         return True, "OK"
-    except Exception as ex:
-        return False, str(ex)
+
+
+def send_gmail(destinatario: str, asunto: str, cuerpo: str, remitente_nombre: str = "") -> tuple[bool, str]:
+    with MailerSession() as session:
+        return session.send(destinatario, asunto, cuerpo, remitente_nombre)
@@ -0,0 +1,78 @@
+import json
+import sys
+
+from sqlalchemy import text
+
+from src.core.db import engine, init_db
+from src.services.campaign_jobs import campaign_targets_query
+from src.services.lead_queries import (
+    enrich_candidates_query,
+    existing_leads_query,
+    lead_page_query,
+    nearby_leads_query,
+)
+
+SAMPLE_OWNER = "00000000-0000-0000-0000-000000000000"
+
+# Las consultas calientes tal y como las construyen los endpoints.
+HOT_QUERIES = {
+    "leads_page": lambda: lead_page_query(SAMPLE_OWNER, False, False, "", None, 0, 500),
+    "leads_page_cursor": lambda: lead_page_query(SAMPLE_OWNER, False, False, "", 1000, 0, 500),
+    "leads_pending": lambda: lead_page_query(SAMPLE_OWNER, True, False, "", None, 0, 500),
+    "leads_with_email": lambda: lead_page_query(SAMPLE_OWNER, False, True, "", None, 0, 500),
+    "leads_by_fuente": lambda: lead_page_query(SAMPLE_OWNER, False, False, "openstreetmap", None, 0, 500),
+    "campaign_targets": lambda: campaign_targets_query(SAMPLE_OWNER, True, None),
+    "upsert_lookup": lambda: existing_leads_query(SAMPLE_OWNER, ["Farmacia Sol", "Farmacia Luna"]),
+    "enrich_candidates": lambda: enrich_candidates_query(SAMPLE_OWNER),
+    "leads_nearby": lambda: nearby_leads_query(SAMPLE_OWNER, 40.4168, -3.7038, 2),
+}
+
+
+def _sql(stmt) -> str:
+    return str(stmt.compile(dialect=engine.dialect, compile_kwargs={"literal_binds": True}))
+
+
+def _sqlite_plan(conn, sql: str) -> tuple[bool, list[str]]:
+    details = [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+    # SEARCH = recorrido acotado por indice; SCAN de la tabla o un B-TREE temporal para el ORDER BY no valen.
+    bad = any(d.startswith("SCAN") or "TEMP B-TREE" in d for d in details)
+    uses_index = not bad and any(d.startswith("SEARCH") and "INDEX" in d for d in details)
+    return uses_index, details
+
+
+def _walk(node: dict):
+    yield node
+    for child in node.get("Plans", []):
+        yield from _walk(child)
+
+
+def _postgres_plan(conn, sql: str) -> tuple[bool, list[str]]:
+    # Con tablas pequenas Postgres prefiere Seq Scan aunque haya indice: se desactiva
+    # para comprobar que existe un indice capaz de servir la consulta sin ordenar aparte.
+    conn.execute(text("SET LOCAL enable_seqscan = off"))
+    raw = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    plan = raw if isinstance(raw, list) else json.loads(raw)
+    nodes = list(_walk(plan[0]["Plan"]))
+    details = [f"{n['Node Type']} {n.get('Index Name', n.get('Relation Name', ''))}".strip() for n in nodes]
+    uses_index = not any(n["Node Type"] in ("Seq Scan", "Sort") for n in nodes) and any(
+        "Index" in n["Node Type"] for n in nodes
+    )
+    return uses_index, details
+
+
+def check_query_plans() -> dict[str, tuple[bool, list[str]]]:
+    explain = _postgres_plan if engine.dialect.name == "postgresql" else _sqlite_plan
+    results = {}
+    for name, build in HOT_QUERIES.items():
+        with engine.begin() as conn:
+            results[name] = explain(conn, _sql(build()))
+    return results
+
+
+if __name__ == "__main__":
+    init_db()
+    failed = 0
+    for name, (uses_index, details) in check_query_plans().items():
+        failed += not uses_index
+        print(f"{'OK ' if uses_index else 'ERR'} {name}: {' | '.join(details)}")
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,159 @@
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import Any, Callable
+
+from src.core.config import (
+    CACHE_DB_PATH,
+    CACHE_ENABLED,
+    CACHE_MAX_BYTES,
+    CACHE_STALE_TTL_SECONDS,
+)
+
+logger = logging.getLogger("farmareach.cache")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    PRIMARY KEY (namespace, key)
+);
+CREATE INDEX IF NOT EXISTS ix_responses_accessed_at ON responses (accessed_at);
+"""
+
+
+def normalize_query(value: str) -> str:
+    text = unicodedata.normalize("NFKD", value or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch))
+    return " ".join(text.lower().split())
+
+
+def cache_key(*parts: Any) -> str:
+    raw = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_bytes: int) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._refreshing: set[tuple[str, str]] = set()
+        self._refreshing_lock = threading.Lock()
+        self._ready = False
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            if not self._ready:
+                conn.executescript(_SCHEMA)
+                self._ready = True
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> tuple[Any, bool] | None:
+        # Devuelve (valor, fresco); las entradas caducadas siguen disponibles durante la ventana stale.
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, expires_at FROM responses WHERE namespace = ? AND key = ?",
+            (namespace, key),
+        ).fetchone()
+        if row is None:
+            return None
+        value, expires_at = row
+        if now > expires_at + CACHE_STALE_TTL_SECONDS:
+            return None
+        self._conn().execute(
+            "UPDATE responses SET accessed_at = ? WHERE namespace = ? AND key = ?",
+            (now, namespace, key),
+        )
+        return json.loads(value), now <= expires_at
+
+    def set(self, namespace: str, key: str, value: Any, ttl: float) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        now = time.time()
+        with self._write_lock:
+            conn = self._conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (namespace, key, value, size, created_at, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (namespace, key, payload, len(payload), now, now + ttl, now),
+            )
+            self._evict(conn)
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # Se libera hasta el 90% del limite para no desalojar en cada escritura.
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for namespace, key, size in conn.execute(
+            "SELECT namespace, key, size FROM responses ORDER BY accessed_at"
+        ):
+            victims.append((namespace, key))
+            freed += size
+            if freed >= target:
+                break
+        conn.executemany("DELETE FROM responses WHERE namespace = ? AND key = ?", victims)
+
+    def _refresh_in_background(self, namespace: str, key: str, fetch: Callable[[], Any], ttl: float) -> None:
+        marker = (namespace, key)
+        with self._refreshing_lock:
+            if marker in self._refreshing:
+                return
+            self._refreshing.add(marker)
+
+        def _run() -> None:
+            try:
+                value = fetch()
+                if value is not None:
+                    self.set(namespace, key, value, ttl)
+            except Exception:
+                logger.exception("cache revalidation failed namespace=%s", namespace)
+            finally:
+                with self._refreshing_lock:
+                    self._refreshing.discard(marker)
+
+        threading.Thread(target=_run, name=f"cache-refresh-{namespace}", daemon=True).start()
+
+    def cached_call(self, namespace: str, key_parts: tuple, fetch: Callable[[], Any], ttl: float) -> Any:
+        # fetch devuelve None cuando la llamada falla: ese resultado no se cachea.
+        if not CACHE_ENABLED:
+            return fetch()
+        key = cache_key(*key_parts)
+        try:
+            cached = self.get(namespace, key)
+        except sqlite3.Error:
+            logger.exception("cache read failed namespace=%s", namespace)
+            return fetch()
+
+        if cached is not None:
+            value, fresh = cached
+            if not fresh:
+                self._refresh_in_background(namespace, key, fetch, ttl)
+            return value
+
+        value = fetch()
+        if value is not None:
+            try:
+                self.set(namespace, key, value, ttl)
+            except sqlite3.Error:
+                logger.exception("cache write failed namespace=%s", namespace)
+        return value
+
+
+response_cache = ResponseCache(CACHE_DB_PATH, CACHE_MAX_BYTES)
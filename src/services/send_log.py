@@ -0,0 +1,124 @@
+import logging
+import threading
+import time
+
+from sqlalchemy import insert, update
+
+from src.core.config import SEND_LOG_BATCH_SIZE, SEND_LOG_FLUSH_SECONDS
+from src.core.db import get_session
+from src.core.models import EmailLog, Lead
+from src.services.email_log_store import log_values, store_template
+
+logger = logging.getLogger("farmareach.campaigns")
+
+_writers: set["SendLogWriter"] = set()
+_writers_lock = threading.Lock()
+
+
+class SendLogWriter:
+    # Acumula los EmailLog y el nuevo estado_envio de cada lead y los escribe por lotes,
+    # cada uno en su propia transaccion. Un fallo a mitad de campana ya no deshace el
+    # registro de los emails que salieron antes: como mucho se pierde el lote en curso.
+    def __init__(
+        self,
+        template_text: str,
+        batch_size: int = SEND_LOG_BATCH_SIZE,
+        flush_seconds: float = SEND_LOG_FLUSH_SECONDS,
+    ) -> None:
+        self.template_text = template_text
+        self.batch_size = max(1, batch_size)
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self._rows: list[dict] = []
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def __enter__(self) -> "SendLogWriter":
+        with _writers_lock:
+            _writers.add(self)
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        # Tambien con excepcion: lo que ya se envio tiene que quedar registrado.
+        try:
+            self.flush()
+        except Exception:
+            logger.exception("send log flush failed pending=%s", len(self._rows))
+            raise
+        finally:
+            with _writers_lock:
+                _writers.discard(self)
+
+    def record(
+        self, lead_id: int, destinatario: str, asunto: str, cuerpo: str, context: dict, estado: str, detalle: str
+    ) -> None:
+        with self._lock:
+            self._rows.append(
+                {
+                    "lead_id": lead_id,
+                    "destinatario": destinatario,
+                    "asunto": asunto,
+                    "cuerpo": cuerpo,
+                    "context": context,
+                    "estado": estado,
+                    "detalle": detalle,
+                }
+            )
+            due = len(self._rows) >= self.batch_size or (
+                self.flush_seconds > 0 and time.monotonic() - self._last_flush >= self.flush_seconds
+            )
+        if due:
+            self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            rows, self._rows = self._rows, []
+            self._last_flush = time.monotonic()
+            if not rows:
+                return
+            try:
+                _write_batch(self.template_text, rows)
+            except Exception:
+                # Se devuelven al buffer para reintentar en el siguiente flush.
+                self._rows = rows + self._rows
+                raise
+            self.written += len(rows)
+
+
+def _write_batch(template_text: str, rows: list[dict]) -> None:
+    by_status: dict[str, list[int]] = {}
+    for row in rows:
+        by_status.setdefault(row["estado"], []).append(row["lead_id"])
+    with get_session() as session:
+        template_key = store_template(session, template_text)
+        logs = [
+            {
+                "lead_id": row["lead_id"],
+                "destinatario": row["destinatario"],
+                "asunto": row["asunto"],
+                "estado": row["estado"],
+                "detalle": row["detalle"],
+                **log_values(row["cuerpo"], row["context"], template_key),
+            }
+            for row in rows
+        ]
+        session.execute(insert(EmailLog), logs)
+        # Un UPDATE por estado ("enviado"/"error") en vez de uno por lead.
+        for status, lead_ids in by_status.items():
+            session.execute(
+                update(Lead)
+                .where(Lead.id.in_(lead_ids))
+                .values(estado_envio=status)
+                .execution_options(synchronize_session=False)
+            )
+
+
+def flush_all() -> None:
+    # Al apagar la API: vuelca lo pendiente de las campanas que sigan en curso.
+    with _writers_lock:
+        writers = list(_writers)
+    for writer in writers:
+        try:
+            writer.flush()
+        except Exception:
+            logger.exception("send log flush failed on shutdown pending=%s", len(writer._rows))
@@ -1,4 +1,11 @@
-﻿from jinja2 import Template
+﻿import hashlib
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator
+
+from jinja2 import Environment, Template, TemplateError
+
+from src.core.config import TEMPLATE_CACHE_SIZE
 
 DEFAULT_TEMPLATE = """Hola {{ nombre }},
 
@@ -12,6 +19,61 @@ Un saludo,
 """
 
 
+SAMPLE_CONTEXT = {
+    "nombre": "Farmacia Ejemplo",
+    "zona": "Madrid",
+    "codigo_postal": "28001",
+    "remitente": "Equipo Comercial",
+    "firma": "Tu Empresa",
+    "propuesta_valor": "captacion de pacientes",
+}
+
+_env = Environment()
+_compiled: OrderedDict[str, Template] = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+class InvalidTemplate(ValueError):
+    pass
+
+
+def effective_template(template_text: str) -> str:
+    return template_text.strip() or DEFAULT_TEMPLATE
+
+
+def get_template(template_text: str) -> Template:
+    text = effective_template(template_text)
+    key = hashlib.sha256(text.encode("utf-8")).hexdigest()
+    with _compiled_lock:
+        template = _compiled.get(key)
+        if template is not None:
+            _compiled.move_to_end(key)
+            return template
+
+    template = _env.from_string(text)
+    with _compiled_lock:
+        _compiled[key] = template
+        while len(_compiled) > TEMPLATE_CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return template
+
+
+def validate_template(template_text: str, sample_context: dict | None = None) -> None:
+    # Compila y hace un render de prueba para fallar antes de enviar el primer email.
+    try:
+        get_template(template_text).render(**(sample_context or SAMPLE_CONTEXT))
+    except TemplateError as exc:
+        raise InvalidTemplate(str(exc)) from exc
+    except Exception as exc:
+        # Errores de las expresiones ({{ nombre + 1 }} -> TypeError) tambien son culpa de la plantilla.
+        raise InvalidTemplate(f"{type(exc).__name__}: {exc}") from exc
+
+
 def render_email(template_text: str, context: dict) -> str:
-    text = template_text.strip() if template_text.strip() else DEFAULT_TEMPLATE
-    return Template(text).render(**context)
+    return get_template(template_text).render(**context)
+
+
+def render_many(template_text: str, contexts: Iterable[dict]) -> Iterator[str]:
+    template = get_template(template_text)
+    for context in contexts:
+        yield template.render(**context)
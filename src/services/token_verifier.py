@@ -0,0 +1,189 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+import jwt
+import requests
+
+from src.core.config import (
+    AUTH_CACHE_MAX_ENTRIES,
+    AUTH_CACHE_TTL_SECONDS,
+    AUTH_JWKS_TTL_SECONDS,
+    AUTH_RECHECK_SECONDS,
+    SUPABASE_JWT_SECRET,
+    SUPABASE_URL,
+)
+from src.core.http_client import http_client
+
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256", "EdDSA")
+JWKS_MIN_REFRESH_SECONDS = 30
+SUPABASE_AUDIENCE = "authenticated"
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class TokenCache:
+    def __init__(self, max_entries: int, ttl_seconds: int) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[dict, float, float]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(token: str) -> str:
+        # No guardamos el token en claro como clave del cache.
+        return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+    def get(self, token: str) -> tuple[dict, float] | None:
+        key = self._key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= now:
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0], entry[2]
+
+    def put(self, token: str, user: dict, expires_at: float | None = None, checked_at: float | None = None) -> None:
+        now = time.time()
+        deadline = now + self.ttl_seconds
+        if expires_at:
+            deadline = min(deadline, expires_at)
+        if deadline <= now:
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (user, deadline, checked_at or now)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._entries.pop(self._key(token), None)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries)}
+
+
+class _JwksCache:
+    def __init__(self, ttl_seconds: int) -> None:
+        self.ttl_seconds = ttl_seconds
+        self._keys: dict[str, jwt.PyJWK] = {}
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    def _refresh(self) -> None:
+        url = f"{SUPABASE_URL}/auth/v1/.well-known/jwks.json"
+        res = http_client.get(url)
+        res.raise_for_status()
+        keys = {}
+        for key in jwt.PyJWKSet.from_dict(res.json()).keys:
+            if key.key_id:
+                keys[key.key_id] = key
+        self._keys = keys
+        self._fetched_at = time.time()
+
+    def get(self, kid: str) -> jwt.PyJWK | None:
+        with self._lock:
+            age = time.time() - self._fetched_at
+            # Un kid desconocido puede ser una rotacion de claves, pero limitamos
+            # los refrescos para que tokens basura no disparen peticiones a Supabase.
+            if age > self.ttl_seconds or (kid not in self._keys and age > JWKS_MIN_REFRESH_SECONDS):
+                self._refresh()
+            return self._keys.get(kid)
+
+
+token_cache = TokenCache(AUTH_CACHE_MAX_ENTRIES, AUTH_CACHE_TTL_SECONDS)
+_jwks = _JwksCache(AUTH_JWKS_TTL_SECONDS)
+
+
+def user_from_claims(claims: dict) -> dict:
+    metadata = claims.get("user_metadata") or {}
+    return {
+        "id": claims.get("sub", ""),
+        "email": claims.get("email", ""),
+        "nombre": metadata.get("nombre") or metadata.get("name") or "",
+    }
+
+
+def _signing_key(token: str):
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.PyJWTError as exc:
+        raise InvalidToken(str(exc)) from exc
+
+    alg = header.get("alg", "")
+    if alg == "HS256":
+        return SUPABASE_JWT_SECRET or None, alg
+    if alg in ASYMMETRIC_ALGORITHMS and SUPABASE_URL and header.get("kid"):
+        try:
+            jwk = _jwks.get(header["kid"])
+        except (requests.RequestException, jwt.PyJWTError, ValueError):
+            return None, alg
+        if jwk is None:
+            raise InvalidToken("Clave de firma desconocida")
+        return jwk.key, alg
+    return None, alg
+
+
+# Devuelve None si no hay secreto ni JWKS para verificar en local: toca preguntar a Supabase.
+def verify_locally(token: str) -> dict | None:
+    key, alg = _signing_key(token)
+    if key is None:
+        return None
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[alg],
+            audience=SUPABASE_AUDIENCE,
+            options={"require": ["exp", "sub"]},
+        )
+    except jwt.PyJWTError as exc:
+        raise InvalidToken(str(exc)) from exc
+
+
+def _unverified_expiry(token: str) -> float | None:
+    try:
+        claims = jwt.decode(token, options={"verify_signature": False})
+    except jwt.PyJWTError:
+        return None
+    exp = claims.get("exp")
+    return float(exp) if exp else None
+
+
+# fetch_remote llama a /auth/v1/user y debe lanzar excepcion si Supabase rechaza el token.
+def resolve_user(token: str, fetch_remote) -> dict:
+    now = time.time()
+    cached = token_cache.get(token)
+    if cached is not None:
+        user, checked_at = cached
+        if AUTH_RECHECK_SECONDS <= 0 or now - checked_at < AUTH_RECHECK_SECONDS:
+            return user
+    else:
+        claims = verify_locally(token)
+        if claims is not None:
+            # La verificacion local no detecta revocaciones; el chequeo remoto
+            # se repite cuando pasan AUTH_RECHECK_SECONDS.
+            user = user_from_claims(claims)
+            token_cache.put(token, user, expires_at=float(claims["exp"]), checked_at=now)
+            return user
+
+    try:
+        user = fetch_remote(token)
+    except Exception:
+        token_cache.discard(token)
+        raise
+    token_cache.put(token, user, expires_at=_unverified_expiry(token), checked_at=now)
+    return user
@@ -0,0 +1,7 @@
+import os
+import tempfile
+
+# Antes de importar src: base SQLite temporal y sin cache ni workers de campana.
+os.environ["DB_URL"] = f"sqlite:///{tempfile.mkdtemp()}/test.db"
+os.environ["CACHE_ENABLED"] = "false"
+os.environ["CAMPAIGN_WORKERS"] = "0"
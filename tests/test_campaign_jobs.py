@@ -0,0 +1,58 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import update
+
+from src.core.db import get_session, init_db
+from src.core.models import CampaignJob, CampaignTask, Lead
+from src.services import campaign_jobs
+
+
+def _job_with_claimed_task(nombre: str, claimed_ago: timedelta) -> int:
+    with get_session() as session:
+        lead = Lead(owner_id="jobs-owner", nombre=nombre, direccion="Calle Sol 1", email="a@sol.es", fuente="x")
+        session.add(lead)
+        session.flush()
+        job = CampaignJob(owner_id="jobs-owner", estado="en_curso", asunto="Hola", template_text="Hola", total=1)
+        session.add(job)
+        session.flush()
+        session.add(CampaignTask(job_id=job.id, lead_id=lead.id, estado="enviando"))
+        session.flush()
+        session.execute(
+            update(CampaignTask)
+            .where(CampaignTask.job_id == job.id)
+            .values(updated_at=datetime.utcnow() - claimed_ago)
+        )
+        return job.id
+
+
+def test_stale_task_is_swept_and_closes_the_job():
+    init_db()
+    job_id = _job_with_claimed_task("Farmacia Sol", timedelta(seconds=campaign_jobs.CAMPAIGN_STALE_SECONDS + 60))
+
+    assert campaign_jobs.recover_interrupted_tasks() >= 1
+
+    progress = campaign_jobs.job_progress(job_id, "jobs-owner")
+    assert progress["estado"] == "completado"
+    assert progress["remaining"] == 0
+    assert progress["errors"] == 1
+
+
+def test_recent_task_is_left_for_a_later_sweep():
+    init_db()
+    job_id = _job_with_claimed_task("Farmacia Luna", timedelta(seconds=5))
+
+    campaign_jobs.recover_interrupted_tasks()
+
+    assert campaign_jobs.job_progress(job_id, "jobs-owner")["remaining"] == 1
+
+
+def test_sweep_runs_again_after_the_interval(monkeypatch):
+    monkeypatch.setattr(campaign_jobs, "_last_sweep", None)
+    monkeypatch.setattr(campaign_jobs, "CAMPAIGN_SWEEP_SECONDS", 60)
+    clock = [1000.0]
+    monkeypatch.setattr(campaign_jobs.time, "monotonic", lambda: clock[0])
+
+    assert campaign_jobs._sweep_due()
+    assert not campaign_jobs._sweep_due()
+    clock[0] += 61
+    assert campaign_jobs._sweep_due()
@@ -0,0 +1,121 @@
+import pytest
+
+from src.core.db import get_session, init_db
+from src.core.models import CampaignJob, CampaignTask, Lead
+from src.services.dedup import _trigrams, dedupe_owner_leads, lead_signature, match_score, merge_batch
+from src.services.geo import encode_geohash
+
+MADRID = (40.4168, -3.7038)
+# ~500 m al norte de MADRID.
+MADRID_NORTH = (40.4213, -3.7038)
+
+
+def _lead(nombre, direccion="", codigo_postal="", telefono="", website="", point=None):
+    lead = {
+        "nombre": nombre,
+        "direccion": direccion,
+        "zona": "Madrid",
+        "codigo_postal": codigo_postal,
+        "telefono": telefono,
+        "website": website,
+        "email": "",
+        "fuente": "openstreetmap",
+        "lat": None,
+        "lon": None,
+        "geohash": None,
+    }
+    if point:
+        lead.update(lat=point[0], lon=point[1], geohash=encode_geohash(*point))
+    return lead
+
+
+def _score(a, b):
+    return match_score(lead_signature(a), lead_signature(b))
+
+
+def test_trigrams_of_empty_value_is_empty():
+    assert _trigrams("") == frozenset()
+
+
+def test_stopword_only_names_never_match():
+    a = _lead("Farmacia", codigo_postal="28013", point=MADRID)
+    b = _lead("Farmacia", codigo_postal="28013", point=MADRID_NORTH)
+    assert _score(a, b) == 0.0
+    assert len(merge_batch([a, b])) == 2
+
+
+def test_stopword_only_names_never_match_even_at_same_point():
+    a = _lead("Farmacia", "Calle Mayor 1", "28013", point=MADRID)
+    b = _lead("Farmacia", "Calle Mayor 1", "28013", point=MADRID)
+    assert _score(a, b) == 0.0
+
+
+@pytest.mark.parametrize(
+    "nombre, direccion_a, direccion_b",
+    [
+        ("Farmacia", "Calle Mayor 1", "Calle Mayor 40"),
+        ("Farmacia Lopez", "Calle Mayor 1", "Calle Mayor 45"),
+        ("Farmacia Lopez", "C/ Mayor, 1", "Calle Mayor 10, 28013 Madrid"),
+    ],
+)
+def test_different_house_numbers_are_not_merged(nombre, direccion_a, direccion_b):
+    rows = [_lead(nombre, direccion_a, "28013"), _lead(nombre, direccion_b, "28013")]
+    assert len(merge_batch(rows)) == 2
+
+
+def test_name_and_postcode_do_not_merge_distant_coordinates():
+    a = _lead("Farmacia Lopez", codigo_postal="28013", point=MADRID)
+    b = _lead("Farmacia Lopez", codigo_postal="28013", point=MADRID_NORTH)
+    assert _score(a, b) == 0.0
+
+
+def test_same_pharmacy_from_two_sources_is_merged():
+    a = _lead("Farmacia Lopez", "Calle Mayor 1", "28013", point=MADRID)
+    b = _lead("FARMACIA LÓPEZ", "C/ Mayor, 1", "28013", telefono="+34 910 000 001", point=MADRID)
+    merged = merge_batch([a, b])
+    assert len(merged) == 1
+    assert merged[0]["telefono"] == "+34 910 000 001"
+
+
+def test_dedupe_owner_leads_keeps_distinct_pharmacies():
+    init_db()
+    owner = "dedup-owner"
+    rows = [
+        _lead("Farmacia", "Calle Mayor 1", "28013", point=MADRID),
+        _lead("Farmacia", "Calle Mayor 40", "28013", point=MADRID_NORTH),
+        _lead("Farmacia Lopez", "Calle Mayor 3", "28013"),
+        _lead("Farmacia Lopez", "Calle Mayor 45", "28013"),
+        _lead("Farmacia Sol", "Calle Luna 2", "28013", point=MADRID),
+        _lead("Farmacia del Sol", "C/ Luna 2", "28013", point=MADRID),
+    ]
+    with get_session() as session:
+        session.add_all(Lead(owner_id=owner, **row) for row in rows)
+
+    result = dedupe_owner_leads(owner)
+
+    assert result == {"leads": 6, "groups": 1, "merged": 1}
+    with get_session() as session:
+        assert session.query(Lead).filter_by(owner_id=owner).count() == 5
+
+
+def test_dedupe_keeps_tasks_of_merged_leads_as_skipped():
+    init_db()
+    owner = "dedup-tasks-owner"
+    with get_session() as session:
+        leads = [
+            Lead(owner_id=owner, **_lead("Farmacia Sol", "Calle Luna 2", "28013", point=MADRID)),
+            Lead(owner_id=owner, **_lead("Farmacia del Sol", "C/ Luna 2", "28013", point=MADRID)),
+        ]
+        session.add_all(leads)
+        session.flush()
+        job = CampaignJob(owner_id=owner, estado="pendiente", asunto="Hola", template_text="Hola", total=2)
+        session.add(job)
+        session.flush()
+        session.add_all(CampaignTask(job_id=job.id, lead_id=lead.id, estado="pendiente") for lead in leads)
+        job_id = job.id
+
+    assert dedupe_owner_leads(owner)["merged"] == 1
+
+    with get_session() as session:
+        states = sorted(t.estado for t in session.query(CampaignTask).filter_by(job_id=job_id))
+    assert states == ["omitido", "pendiente"]
@@ -0,0 +1,64 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update
+
+from src.core.db import get_session, init_db
+from src.core.models import EmailLog, EmailTemplate
+from src.services.email_log_store import (
+    MISSING_TEMPLATE_BODY,
+    archive_old_logs,
+    email_body,
+    log_values,
+    store_template,
+    template_hash,
+)
+
+OLD = datetime.utcnow() - timedelta(days=90)
+
+
+def _old_log(session, template_text: str) -> None:
+    key = store_template(session, template_text)
+    session.add(
+        EmailLog(
+            lead_id=1,
+            destinatario="a@sol.es",
+            asunto="Hola",
+            estado="enviado",
+            detalle="",
+            created_at=OLD,
+            **log_values("Hola Sol", {"nombre": "Sol"}, key),
+        )
+    )
+
+
+def _age_template(session, template_text: str) -> None:
+    session.execute(
+        update(EmailTemplate)
+        .where(EmailTemplate.hash == template_hash(template_text))
+        .values(created_at=OLD, last_used_at=OLD)
+    )
+
+
+def test_archive_keeps_templates_used_after_the_cutoff(tmp_path):
+    init_db()
+    stale, reused = "Hola {{ nombre }} (vieja)", "Hola {{ nombre }} (reutilizada)"
+    with get_session() as session:
+        _old_log(session, stale)
+        _old_log(session, reused)
+        _age_template(session, stale)
+        _age_template(session, reused)
+    # Una campana en curso vuelve a registrar la plantilla antes de escribir sus logs.
+    with get_session() as session:
+        store_template(session, reused)
+
+    assert archive_old_logs(30, str(tmp_path)) == 2
+
+    with get_session() as session:
+        remaining = set(session.execute(select(EmailTemplate.hash)).scalars())
+    assert template_hash(reused) in remaining
+    assert template_hash(stale) not in remaining
+
+
+def test_email_body_degrades_when_template_is_missing():
+    log = EmailLog(id=1, cuerpo="", template_hash="0" * 64, contexto="{}")
+    assert email_body(log, {}, placeholder=MISSING_TEMPLATE_BODY) == MISSING_TEMPLATE_BODY
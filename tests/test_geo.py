@@ -0,0 +1,31 @@
+import pytest
+
+from src.services.geo import GEOHASH_ALPHABET, cover_cells, encode_geohash, prefix_upper_bound
+
+
+@pytest.mark.parametrize(
+    "cell, upper",
+    [("ezjm", "ezjn"), ("ezj9", "ezjb"), ("ezjz", "ezk"), ("ezzz", "f"), ("zzz", None)],
+)
+def test_prefix_upper_bound_increments_with_carry(cell, upper):
+    assert prefix_upper_bound(cell) == upper
+
+
+def test_cell_range_contains_exactly_its_geohashes():
+    # Comparacion de cadenas simple: la que usan SQLite y Postgres con collation "C" o en_US
+    # cuando solo hay digitos y letras minusculas.
+    point = encode_geohash(40.4168, -3.7038)
+    for precision in range(1, len(point)):
+        cell = point[:precision]
+        upper = prefix_upper_bound(cell)
+        assert cell <= point and (upper is None or point < upper)
+        for char in GEOHASH_ALPHABET:
+            sibling = cell[:-1] + char + "0" * (len(point) - precision)
+            inside = cell <= sibling and (upper is None or sibling < upper)
+            assert inside == sibling.startswith(cell)
+
+
+def test_cover_cells_contain_the_center():
+    cells = cover_cells(40.4168, -3.7038, 2)
+    point = encode_geohash(40.4168, -3.7038)
+    assert any(point.startswith(cell) for cell in cells)
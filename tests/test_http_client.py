@@ -0,0 +1,74 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from src.core import http_client as http_module
+from src.core.http_client import HttpClient
+from src.core.metrics import external_request_duration
+
+
+class Handler(BaseHTTPRequestHandler):
+    busy_calls = 0
+
+    def do_GET(self):
+        if self.path == "/busy" and Handler.busy_calls == 0:
+            Handler.busy_calls += 1
+            self.send_response(503)
+            self.send_header("Retry-After", "3600")
+        else:
+            self.send_response(200)
+            self.send_header("Set-Cookie", "session=abc; Path=/")
+            self.send_header("X-Cookie-Received", self.headers.get("Cookie", ""))
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope="module")
+def base_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_cookies_are_not_shared_between_requests(base_url):
+    client = HttpClient()
+    client.get(f"{base_url}/login")
+    second = client.get(f"{base_url}/other")
+    assert second.headers["X-Cookie-Received"] == ""
+    assert len(client.session.cookies) == 0
+
+
+def test_retry_after_wait_is_capped(base_url, monkeypatch):
+    monkeypatch.setattr(http_module, "HTTP_RETRY_AFTER_MAX", 0.05)
+    client = HttpClient()
+    started = time.monotonic()
+    response = client.get(f"{base_url}/busy")
+    assert response.status_code == 200
+    assert time.monotonic() - started < 2
+
+
+def test_unknown_hosts_share_one_metric_label(base_url):
+    client = HttpClient()
+    client.get(f"{base_url}/a")
+    client.get(f"{base_url}/b", metric_label="enrichment")
+    hosts = {host for (host,) in external_request_duration.snapshot()}
+    assert "127.0.0.1" not in hosts
+    assert {"other", "enrichment"} <= hosts
+
+
+def test_health_summary_is_capped_to_the_busiest_hosts(base_url):
+    client = HttpClient()
+    client.get(f"{base_url}/a", metric_label="enrichment")
+    client.get(f"{base_url}/b")
+    summary = client.metrics(top=1)
+    everything = client.metrics(top=100)
+    assert len(summary) == 1 and len(everything) >= 2
+    (host, stats), = summary.items()
+    assert stats["requests"] == max(item["requests"] for item in everything.values())
+    assert "buckets" not in stats
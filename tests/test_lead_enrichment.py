@@ -0,0 +1,67 @@
+import threading
+import time
+
+from src.services import lead_enrichment
+
+
+def test_host_slots_are_released_after_use():
+    for idx in range(50):
+        with lead_enrichment._host_slot(f"farmacia{idx}.es"):
+            pass
+    assert lead_enrichment._host_slots == {}
+
+
+def test_host_slot_limits_concurrency_per_host(monkeypatch):
+    monkeypatch.setattr(lead_enrichment, "ENRICH_PER_HOST_LIMIT", 2)
+    inside = []
+    peak = [0]
+    lock = threading.Lock()
+    release = threading.Event()
+
+    def worker():
+        with lead_enrichment._host_slot("farmacia.es"):
+            with lock:
+                inside.append(1)
+                peak[0] = max(peak[0], len(inside))
+            release.wait(1)
+            with lock:
+                inside.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.1)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert peak[0] <= 2
+    assert lead_enrichment._host_slots == {}
+
+
+def test_crawls_share_one_process_wide_pool(monkeypatch):
+    monkeypatch.setattr(lead_enrichment, "_cached_domain_email", lambda domain: None)
+    running = []
+    peak = [0]
+    lock = threading.Lock()
+
+    def crawl(domain, website):
+        with lock:
+            running.append(domain)
+            peak[0] = max(peak[0], len(running))
+        time.sleep(0.02)
+        with lock:
+            running.remove(domain)
+        return f"info@{domain}"
+
+    monkeypatch.setattr(lead_enrichment, "_crawl_domain", crawl)
+    batches = [[f"https://farmacia{req}-{i}.es" for i in range(3 * lead_enrichment.ENRICH_MAX_WORKERS)] for req in range(3)]
+    results = []
+    threads = [threading.Thread(target=lambda b=b: results.extend(lead_enrichment.enrich_websites(b))) for b in batches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(results) == sum(len(b) for b in batches)
+    assert peak[0] <= lead_enrichment.ENRICH_MAX_WORKERS
@@ -0,0 +1,69 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from src.api.main import app, get_current_user
+from src.core.db import get_session
+from src.core.models import Lead
+from src.services.lead_search import SEARCH_CANDIDATES
+
+OWNER = "search-owner"
+
+
+@pytest.fixture(scope="module")
+def client():
+    app.dependency_overrides[get_current_user] = lambda: {"id": OWNER, "email": "a@x.com"}
+    with TestClient(app) as test_client:
+        with get_session() as session:
+            session.add_all(
+                [
+                    Lead(owner_id=OWNER, nombre="Farmacia López", direccion="Calle Ñandú 3", zona="Málaga", fuente="x"),
+                    Lead(owner_id=OWNER, nombre="Farmacia Sol", direccion="Calle Lopez 1", zona="Madrid", fuente="x"),
+                    Lead(owner_id="other-owner", nombre="Farmacia López", direccion="x", zona="Madrid", fuente="x"),
+                ]
+                + [
+                    Lead(owner_id=OWNER, nombre=f"Farmacia Centro {i}", direccion=f"Plaza {i}", zona="Sevilla", fuente="x")
+                    for i in range(SEARCH_CANDIDATES + 10)
+                ]
+                + [
+                    Lead(owner_id=OWNER, nombre=f"Botica {i}", direccion=f"Avenida {i}", zona="Cadiz", fuente="x")
+                    for i in range(SEARCH_CANDIDATES)
+                ]
+            )
+        yield test_client
+    app.dependency_overrides.clear()
+
+
+def _names(client, q, **params):
+    return [lead["nombre"] for lead in client.get("/leads/search", params={"q": q, **params}).json()]
+
+
+def test_search_ignores_accents_and_ranks_name_first(client):
+    assert _names(client, "lopez") == ["Farmacia López", "Farmacia Sol"]
+    assert _names(client, "NANDU mal") == ["Farmacia López"]
+
+
+def test_search_is_scoped_to_owner(client):
+    assert len(_names(client, "lopez")) == 2
+
+
+def test_search_caps_pagination_to_ranked_candidates(client):
+    resp = client.get("/leads/search", params={"q": "centro", "skip": SEARCH_CANDIDATES - 10, "limit": 20})
+    assert resp.status_code == 400
+
+
+def test_search_flags_truncated_results(client):
+    resp = client.get("/leads/search", params={"q": "centro", "limit": 10})
+    assert resp.status_code == 200
+    assert resp.headers.get("X-Search-Truncated") == "true"
+    assert "X-Search-Truncated" not in client.get("/leads/search", params={"q": "lopez"}).headers
+
+
+def test_exactly_the_candidate_window_is_not_truncated(client):
+    resp = client.get("/leads/search", params={"q": "botica", "limit": 10})
+    assert resp.status_code == 200
+    assert "X-Search-Truncated" not in resp.headers
+
+
+def test_truncation_header_is_exposed_to_the_browser(client):
+    resp = client.get("/leads/search", params={"q": "centro", "limit": 10}, headers={"Origin": "http://localhost:5500"})
+    assert "X-Search-Truncated" in resp.headers["Access-Control-Expose-Headers"]
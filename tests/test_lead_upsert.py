@@ -0,0 +1,56 @@
+import pytest
+from sqlalchemy import func, inspect, select
+from sqlalchemy.exc import IntegrityError
+
+from src.api import main
+from src.core.db import engine, get_session, init_db
+from src.core.models import Lead
+
+
+def _batch():
+    return [
+        {"nombre": "Farmacia Alameda", "direccion": "Calle Alameda 4", "telefono": "910000001", "fuente": "openstreetmap"},
+        {"nombre": "Farmacia Bravo", "direccion": "Avenida Bravo 12", "website": "bravo.es", "fuente": "google_maps"},
+        {"nombre": "Farmacia Cisne", "direccion": "", "fuente": "paginas_amarillas"},
+    ]
+
+
+@pytest.mark.parametrize("fuzzy", [True, False])
+def test_capturing_the_same_batch_twice_saves_nothing_new(monkeypatch, fuzzy):
+    init_db()
+    monkeypatch.setattr(main, "DEDUP_FUZZY_ENABLED", fuzzy)
+    owner = f"upsert-owner-{fuzzy}"
+
+    first = main._upsert_leads(_batch(), "Madrid", "28013", owner)
+    second_batch = _batch()
+    second = main._upsert_leads(second_batch, "Madrid", "28013", owner)
+
+    assert first == 3
+    assert second == 0
+    assert len(second_batch) - second == 3  # duplicados
+    with get_session() as session:
+        assert session.execute(select(func.count()).where(Lead.owner_id == owner)).scalar_one() == 3
+
+
+def test_second_capture_fills_missing_fields():
+    init_db()
+    owner = "upsert-fill-owner"
+    main._upsert_leads(_batch(), "Madrid", "28013", owner)
+    again = _batch()
+    again[2]["telefono"] = "910000003"
+    assert main._upsert_leads(again, "Madrid", "28013", owner) == 0
+    with get_session() as session:
+        lead = session.execute(select(Lead).where(Lead.owner_id == owner, Lead.nombre == "Farmacia Cisne")).scalar_one()
+        assert lead.telefono == "910000003"
+
+
+def test_unique_index_rejects_duplicate_lead_key():
+    init_db()
+    indexes = {ix["name"]: ix for ix in inspect(engine).get_indexes("leads")}
+    assert indexes["ux_leads_owner_nombre_direccion"]["unique"]
+    assert indexes["ux_leads_owner_nombre_direccion"]["column_names"] == ["owner_id", "nombre", "direccion"]
+    with pytest.raises(IntegrityError):
+        with get_session() as session:
+            for _ in range(2):
+                session.add(Lead(owner_id="upsert-ix-owner", nombre="Farmacia Dado", direccion="", fuente="x"))
+                session.flush()
@@ -0,0 +1,120 @@
+import smtplib
+
+import pytest
+
+from src.services import mailer
+from src.services.mailer import MailerSession, RateLimiter
+
+
+class FakeSMTP:
+    def __init__(self, fail_on=None, fail_starttls=False):
+        self.fail_on = fail_on
+        self.fail_starttls = fail_starttls
+        self.closed = False
+        self.data_calls = 0
+
+    def starttls(self):
+        if self.fail_starttls:
+            raise smtplib.SMTPNotSupportedError("STARTTLS no disponible")
+
+    def login(self, user, password):
+        pass
+
+    def ehlo_or_helo_if_needed(self):
+        pass
+
+    def _step(self, name):
+        if self.fail_on == name:
+            raise smtplib.SMTPServerDisconnected("conexion cerrada")
+        return 250, b"OK"
+
+    def mail(self, sender):
+        return self._step("mail")
+
+    def rcpt(self, recipient):
+        return self._step("rcpt")
+
+    def data(self, message):
+        self.data_calls += 1
+        return self._step("data")
+
+    def rset(self):
+        pass
+
+    def quit(self):
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def servers(monkeypatch):
+    monkeypatch.setattr(mailer, "GMAIL_ADDRESS", "yo@x.com")
+    monkeypatch.setattr(mailer, "GMAIL_APP_PASSWORD", "secreto")
+    monkeypatch.setattr(mailer, "SMTP_SECURITY", "ssl")
+    queue = []
+    created = []
+
+    def factory(*args, **kwargs):
+        server = queue.pop(0) if queue else FakeSMTP()
+        created.append(server)
+        return server
+
+    monkeypatch.setattr(mailer.smtplib, "SMTP_SSL", factory)
+    monkeypatch.setattr(mailer.smtplib, "SMTP", factory)
+    return queue, created
+
+
+def _send(session):
+    return session.send("farmacia@x.com", "Hola", "Cuerpo")
+
+
+def test_disconnect_before_data_reconnects_and_retries_once(servers):
+    queue, created = servers
+    queue.append(FakeSMTP(fail_on="mail"))
+    with MailerSession(RateLimiter(0)) as session:
+        assert _send(session) == (True, "OK")
+    assert len(created) == 2
+    assert created[0].closed
+    assert created[1].data_calls == 1
+
+
+def test_disconnect_during_data_is_not_retried(servers):
+    queue, created = servers
+    queue.append(FakeSMTP(fail_on="data"))
+    with MailerSession(RateLimiter(0)) as session:
+        ok, error = _send(session)
+    assert not ok and "conexion cerrada" in error
+    assert len(created) == 1
+
+
+def test_second_disconnect_before_data_gives_up(servers):
+    queue, created = servers
+    queue.extend([FakeSMTP(fail_on="rcpt"), FakeSMTP(fail_on="rcpt")])
+    with MailerSession(RateLimiter(0)) as session:
+        ok, _ = _send(session)
+    assert not ok
+    assert len(created) == 2
+
+
+def test_failed_starttls_closes_the_socket(servers, monkeypatch):
+    queue, created = servers
+    monkeypatch.setattr(mailer, "SMTP_SECURITY", "starttls")
+    queue.append(FakeSMTP(fail_starttls=True))
+    with MailerSession(RateLimiter(0)) as session:
+        ok, _ = _send(session)
+    assert not ok
+    assert created[0].closed
+
+
+def test_refused_recipient_is_not_retried(servers):
+    queue, created = servers
+    refused = FakeSMTP()
+    refused.rcpt = lambda recipient: (550, b"No such user")
+    queue.append(refused)
+    with MailerSession(RateLimiter(0)) as session:
+        ok, error = _send(session)
+        assert session._server is refused
+    assert not ok and "No such user" in error
+    assert len(created) == 1
@@ -0,0 +1,24 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from src.services.collectors import openstreetmap_overpass as overpass
+
+
+def test_expired_budget_cancels_queued_tiles(monkeypatch):
+    fetched = []
+
+    def fetch(tile, headers):
+        fetched.append(tile)
+        time.sleep(0.05)
+        return [{"type": "node", "id": len(fetched), "lat": 40.4, "lon": -3.7, "tags": {"name": f"Farmacia {len(fetched)}"}}]
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(overpass, "_tile_executor", pool)
+    monkeypatch.setattr(overpass, "_fetch_tile", fetch)
+    monkeypatch.setattr(overpass, "_split_bbox", lambda *bbox: [(i, 0, i + 1, 1) for i in range(20)])
+
+    leads = overpass.search_openstreetmap_farmacias("", center=(40.4, -3.7, 1.0), timeout=0.12)
+    pool.shutdown(wait=True)
+
+    assert 0 < len(leads) < 20
+    assert len(fetched) < 20
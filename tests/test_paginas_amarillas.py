@@ -0,0 +1,33 @@
+from src.services.collectors import paginas_amarillas
+
+
+def _pages(monkeypatch, per_page=10):
+    loaded = []
+
+    def load(zona, page):
+        loaded.append(page)
+        return [{"nombre": f"Farmacia {page}-{i}", "direccion": f"Calle {i}"} for i in range(per_page)]
+
+    monkeypatch.setattr(paginas_amarillas, "_load_page", load)
+    return loaded
+
+
+def test_no_prefetch_when_the_page_covers_max_items(monkeypatch):
+    loaded = _pages(monkeypatch)
+    leads = paginas_amarillas.search_paginas_amarillas_farmacias("Madrid", max_items=10)
+    assert len(leads) == 10
+    assert loaded == [1]
+
+
+def test_prefetches_while_more_items_are_needed(monkeypatch):
+    loaded = _pages(monkeypatch)
+    leads = paginas_amarillas.search_paginas_amarillas_farmacias("Madrid", max_items=25)
+    assert len(leads) == 25
+    assert loaded == [1, 2, 3]
+
+
+def test_without_max_items_reads_until_max_pages(monkeypatch):
+    loaded = _pages(monkeypatch)
+    leads = list(paginas_amarillas.iter_paginas_amarillas_farmacias("Madrid", max_pages=3))
+    assert len(leads) == 30
+    assert loaded == [1, 2, 3]
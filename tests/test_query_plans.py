@@ -0,0 +1,20 @@
+import pytest
+
+from src.core.db import init_db
+from src.services.query_plans import HOT_QUERIES, check_query_plans
+
+
+@pytest.fixture(scope="module")
+def plans():
+    init_db()
+    return check_query_plans()
+
+
+def test_every_hot_query_is_checked(plans):
+    assert set(plans) == set(HOT_QUERIES)
+
+
+@pytest.mark.parametrize("name", sorted(HOT_QUERIES))
+def test_hot_query_uses_an_index(plans, name):
+    uses_index, details = plans[name]
+    assert uses_index, f"{name}: {' | '.join(details)}"
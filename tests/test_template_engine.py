@@ -0,0 +1,18 @@
+import pytest
+
+from src.services.template_engine import InvalidTemplate, validate_template
+
+
+def test_valid_template_passes():
+    validate_template("Hola {{ nombre }} de {{ zona }}")
+
+
+def test_syntax_error_is_invalid_template():
+    with pytest.raises(InvalidTemplate):
+        validate_template("Hola {{ nombre ")
+
+
+@pytest.mark.parametrize("text", ["Hola {{ nombre + 1 }}", "{{ zona / 0 }}", "{{ nombre.upper(1, 2, 3) }}"])
+def test_expression_errors_are_invalid_template(text):
+    with pytest.raises(InvalidTemplate):
+        validate_template(text)
@@ -0,0 +1,115 @@
+import time
+
+import jwt
+import pytest
+
+from src.services import token_verifier
+from src.services.token_verifier import InvalidToken, TokenCache, resolve_user, verify_locally
+
+SECRET = "test-jwt-secret-with-enough-length-for-hs256"
+
+
+@pytest.fixture(autouse=True)
+def local_secret(monkeypatch):
+    monkeypatch.setattr(token_verifier, "SUPABASE_JWT_SECRET", SECRET)
+    monkeypatch.setattr(token_verifier, "AUTH_RECHECK_SECONDS", 60)
+    monkeypatch.setattr(token_verifier, "token_cache", TokenCache(16, 300))
+
+
+def _token(secret=SECRET, **claims):
+    payload = {"sub": "user-1", "email": "a@x.com", "aud": "authenticated", "exp": int(time.time()) + 3600}
+    payload.update(claims)
+    return jwt.encode({k: v for k, v in payload.items() if v is not None}, secret, algorithm="HS256")
+
+
+class Remote:
+    def __init__(self, fail=False):
+        self.calls = 0
+        self.fail = fail
+
+    def __call__(self, token):
+        self.calls += 1
+        if self.fail:
+            raise InvalidToken("rechazado por Supabase")
+        return {"id": "user-1", "email": "a@x.com", "nombre": ""}
+
+
+def test_valid_hs256_token_is_verified_locally():
+    remote = Remote()
+    user = resolve_user(_token(), remote)
+    assert user["id"] == "user-1"
+    assert remote.calls == 0
+
+
+def test_expired_token_is_rejected():
+    with pytest.raises(InvalidToken):
+        verify_locally(_token(exp=int(time.time()) - 10))
+
+
+def test_wrong_signature_is_rejected():
+    with pytest.raises(InvalidToken):
+        verify_locally(_token(secret="otro-secreto-distinto-con-longitud-suficiente"))
+
+
+def test_wrong_audience_is_rejected():
+    with pytest.raises(InvalidToken):
+        verify_locally(_token(aud="otra-app"))
+
+
+def test_anon_key_is_rejected():
+    # La anon key de Supabase es un JWT HS256 con role=anon, sin sub ni aud "authenticated".
+    anon = _token(sub=None, email=None, aud=None, role="anon", iss="supabase")
+    with pytest.raises(InvalidToken):
+        resolve_user(anon, Remote())
+
+
+def test_cache_hit_skips_remote_call(monkeypatch):
+    # Sin secreto local cada token nuevo va a Supabase; el segundo uso sale del cache.
+    monkeypatch.setattr(token_verifier, "SUPABASE_JWT_SECRET", "")
+    remote = Remote()
+    token = _token()
+    resolve_user(token, remote)
+    resolve_user(token, remote)
+    assert remote.calls == 1
+    assert token_verifier.token_cache.stats()["hits"] == 1
+
+
+def test_remote_recheck_after_interval(monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(token_verifier.time, "time", lambda: clock[0])
+    remote = Remote()
+    token = _token()
+
+    resolve_user(token, remote)
+    clock[0] += 30
+    resolve_user(token, remote)
+    assert remote.calls == 0
+
+    clock[0] += 31
+    resolve_user(token, remote)
+    assert remote.calls == 1
+
+
+def test_remote_rejection_evicts_cached_token(monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(token_verifier.time, "time", lambda: clock[0])
+    token = _token()
+    resolve_user(token, Remote())
+    assert token_verifier.token_cache.stats()["size"] == 1
+
+    clock[0] += 61
+    with pytest.raises(InvalidToken):
+        resolve_user(token, Remote(fail=True))
+    assert token_verifier.token_cache.stats()["size"] == 0
+
+
+def test_cache_entry_does_not_outlive_token_expiry(monkeypatch):
+    clock = [time.time()]
+    monkeypatch.setattr(token_verifier.time, "time", lambda: clock[0])
+    monkeypatch.setattr(token_verifier, "SUPABASE_JWT_SECRET", "")
+    remote = Remote()
+    token = _token(exp=int(clock[0]) + 10)
+
+    resolve_user(token, remote)
+    clock[0] += 11
+    assert token_verifier.token_cache.get(token) is None